@@ -0,0 +1,90 @@
+"""Overlay apply/switch/show latency, run against a real (or virtual, Xvfb) X display.
+
+Invoked by run_benchmarks.py with DISPLAY pointing at an Xvfb server whose screen matches the
+resolution under test. Prints a JSON object of metrics (milliseconds) to stdout.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import tkinter as tk # noqa: E402
+
+import crosshair_overlay as co # noqa: E402
+from benchmarks.synthetic import make_reticle # noqa: E402
+
+
+def _median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def wait_until(predicate, timeout=2.0):
+    """Pumps the Tk loop until predicate() is true; returns the elapsed seconds."""
+    start = time.perf_counter()
+    while not predicate():
+        co.root.update()
+        if time.perf_counter() - start > timeout:
+            break
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    co.root = tk.Tk()
+    co.root.withdraw()
+    width, height = co.get_screen_resolution()
+    co.AUTO_RESOLVE_VARIANTS = False # The images already match the screen
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i, colour in enumerate([(237, 28, 36, 255), (34, 177, 76, 255)]):
+            path = os.path.join(tmp, f"reticle{i}.png")
+            make_reticle(width, height, colour).save(path)
+            paths.append(path)
+
+        cold, warm, show, hide = [], [], [], []
+        for _ in range(args.repeat):
+            co.crosshair_cache.clear()
+            start = time.perf_counter()
+            co.create_or_update_overlay(paths[0])
+            co.root.update_idletasks()
+            cold.append(time.perf_counter() - start)
+
+        co.create_or_update_overlay(paths[1]) # Both images are cached from here on
+        for i in range(args.repeat):
+            start = time.perf_counter()
+            co.create_or_update_overlay(paths[i % 2])
+            co.root.update_idletasks()
+            warm.append(time.perf_counter() - start)
+
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            co.toggle_overlay()
+            wait_until(lambda: co.overlay_window.winfo_viewable())
+            show.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            co.toggle_overlay()
+            wait_until(lambda: not co.overlay_window.winfo_viewable())
+            hide.append(time.perf_counter() - start)
+
+        co.overlay_window.destroy()
+    co.root.destroy()
+
+    print(json.dumps({
+        "screen": f"{width}x{height}",
+        "apply_cold_ms": _median(cold) * 1000,
+        "switch_cached_ms": _median(warm) * 1000,
+        "show_to_mapped_ms": _median(show) * 1000,
+        "hide_to_unmapped_ms": _median(hide) * 1000,
+    }))
+
+
+if __name__ == "__main__":
+    main()
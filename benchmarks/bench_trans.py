@@ -0,0 +1,65 @@
+"""Compares trans.py's array keying engine against the original per-pixel loop.
+
+Usage: python benchmarks/bench_trans.py [--sizes 1920x1080,3840x2160] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import trans # noqa: E402
+from benchmarks.synthetic import make_scan # noqa: E402
+
+
+def legacy_white_to_transparent(img):
+    """The original trans.py loop, kept here as the baseline."""
+    img = img.convert("RGBA")
+    warnings.simplefilter("ignore", DeprecationWarning) # getdata() is what the old loop used
+    new_data = []
+    for item in img.getdata():
+        if item[0] > 200 and item[1] > 200 and item[2] > 200:
+            new_data.append((255, 255, 255, 0))
+        else:
+            new_data.append(item)
+    img.putdata(new_data)
+    return img
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1920x1080,3840x2160")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-legacy", action="store_true", help="Only time the array engine")
+    args = parser.parse_args(argv)
+
+    print(f"{'size':>11} {'engine':>8} {'seconds':>9} {'MP/s':>8}")
+    for size in args.sizes.split(","):
+        width, height = (int(v) for v in size.split("x"))
+        scan = make_scan(width, height)
+        megapixels = width * height / 1e6
+
+        expected = None
+        if not args.skip_legacy:
+            legacy_seconds = best_of(lambda: legacy_white_to_transparent(scan.copy()), args.repeat)
+            expected = legacy_white_to_transparent(scan.copy())
+            print(f"{size:>11} {'legacy':>8} {legacy_seconds:9.3f} {megapixels / legacy_seconds:8.1f}")
+
+        array_seconds = best_of(lambda: trans.key_image(scan), args.repeat)
+        print(f"{size:>11} {'array':>8} {array_seconds:9.3f} {megapixels / array_seconds:8.1f}")
+        if expected is not None and expected.tobytes() != trans.key_image(scan).tobytes():
+            print(f"{size:>11} WARNING: array output differs from the legacy loop")
+
+
+if __name__ == "__main__":
+    main()
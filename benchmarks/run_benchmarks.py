@@ -0,0 +1,231 @@
+"""Headless benchmark suite for the reticle tools and the overlay.
+
+Times keying throughput (trans.py), pyramid generation (view.py), folder listing of large
+reticle libraries, overlay module import (startup) cost and overlay apply/switch/show latency. Overlay numbers are measured under a
+virtual X server (Xvfb) per resolution when it is available, or on the current display with
+--use-display; otherwise they are reported as skipped.
+
+Results are written as JSON ({"meta": ..., "metrics": {name: value}}) so runs can be compared:
+
+    python benchmarks/run_benchmarks.py -o before.json
+    ... change something ...
+    python benchmarks/run_benchmarks.py -o after.json --compare before.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np # noqa: E402
+import PIL # noqa: E402
+
+import trans # noqa: E402
+import view # noqa: E402
+from benchmarks.synthetic import RESOLUTIONS, make_reticle, make_scan # noqa: E402
+
+SUITES = ("keying", "pyramid", "listing", "startup", "overlay")
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+# --- Suites ---
+
+def bench_keying(metrics, repeat):
+    for label, (width, height) in RESOLUTIONS.items():
+        scan = make_scan(width, height)
+        seconds = best_of(lambda: trans.key_image(scan), repeat)
+        metrics[f"keying.{label}.ms"] = seconds * 1000
+        metrics[f"keying.{label}.mp_per_s"] = width * height / 1e6 / seconds
+
+
+def bench_pyramid(metrics, repeat, sources=8, workers=None):
+    with tempfile.TemporaryDirectory() as tmp:
+        source_dir = os.path.join(tmp, "src")
+        os.makedirs(source_dir)
+        reticle = make_reticle(*RESOLUTIONS["1080p"])
+        for i in range(sources):
+            reticle.save(os.path.join(source_dir, f"scope{i:03d}.png"))
+        paths = view.find_source_images(source_dir, view.target_resolutions)
+        jobs = [(path, dict(view.target_resolutions)) for path in paths]
+
+        def build(worker_count):
+            out_dir = tempfile.mkdtemp(dir=tmp)
+            for _ in view.build_all(jobs, out_dir, worker_count):
+                pass
+
+        for name, worker_count in (("serial", 1), ("parallel", workers)):
+            seconds = best_of(lambda: build(worker_count), repeat)
+            metrics[f"pyramid.{name}.s"] = seconds
+            metrics[f"pyramid.{name}.sources_per_s"] = sources / seconds
+
+
+def bench_listing(metrics, repeat, counts=(100, 1000, 5000)):
+    import crosshair_overlay # Deferred: pulls in tkinter and the optional keyboard hook
+    buf = tempfile.SpooledTemporaryFile()
+    make_reticle(64, 36).save(buf, format="PNG")
+    buf.seek(0)
+    png_bytes = buf.read()
+    for count in counts:
+        with tempfile.TemporaryDirectory() as tmp:
+            for i in range(count):
+                with open(os.path.join(tmp, f"scope{i:05d}.png"), "wb") as f:
+                    f.write(png_bytes)
+            seconds = best_of(lambda: crosshair_overlay.load_image_list(tmp), repeat)
+            metrics[f"listing.{count}_files.ms"] = seconds * 1000
+
+
+def bench_startup(metrics, skipped, repeat):
+    """Import cost of crosshair_overlay in a fresh interpreter (what runs before any window exists)."""
+    code = ("import time; t = time.perf_counter(); import crosshair_overlay; "
+            "print((time.perf_counter() - t) * 1000)")
+    samples = []
+    for _ in range(max(3, repeat)):
+        result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+        if result.returncode != 0:
+            # e.g. no tkinter in this Python: record it like the overlay suite instead of failing the run
+            skipped["startup"] = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "import failed"
+            return
+        samples.append(float(result.stdout.strip().splitlines()[-1]))
+    samples.sort()
+    metrics["startup.import_overlay.ms"] = samples[len(samples) // 2]
+
+
+def _run_overlay_bench(env, repeat):
+    result = subprocess.run([sys.executable, os.path.join(ROOT, "benchmarks", "bench_overlay.py"),
+                             "--repeat", str(repeat)],
+                            env=env, cwd=ROOT, capture_output=True, text=True, timeout=600)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def bench_overlay(metrics, skipped, repeat, use_display=False):
+    if use_display:
+        if not os.environ.get("DISPLAY") and sys.platform.startswith("linux"):
+            skipped["overlay"] = "--use-display given but DISPLAY is not set"
+            return
+        values = _run_overlay_bench(dict(os.environ), repeat)
+        for key, value in values.items():
+            if key != "screen":
+                metrics[f"overlay.{values['screen']}.{key}"] = value
+        return
+
+    xvfb = shutil.which("Xvfb")
+    if xvfb is None:
+        skipped["overlay"] = "Xvfb not found (install xvfb, or pass --use-display)"
+        return
+    for number, (label, (width, height)) in enumerate(RESOLUTIONS.items(), start=91):
+        display = f":{number}"
+        server = subprocess.Popen([xvfb, display, "-screen", "0", f"{width}x{height}x24", "-nolisten", "tcp"],
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            time.sleep(0.5) # Give the server time to accept connections
+            env = dict(os.environ, DISPLAY=display)
+            values = _run_overlay_bench(env, repeat)
+            for key, value in values.items():
+                if key != "screen":
+                    metrics[f"overlay.{label}.{key}"] = value
+        except Exception as e:
+            skipped[f"overlay.{label}"] = str(e)
+        finally:
+            server.terminate()
+            server.wait()
+
+
+# --- Reporting ---
+
+def metadata():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "pillow": PIL.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(current, baseline):
+    """Prints metrics side by side. For rates (per_s) higher is better, otherwise lower is."""
+    print(f"\n{'metric':<44}{'baseline':>12}{'current':>12}{'change':>9}")
+    for name in sorted(set(current) | set(baseline)):
+        old, new = baseline.get(name), current.get(name)
+        if old is None or new is None:
+            old_text = "-" if old is None else f"{old:.3f}"
+            new_text = "-" if new is None else f"{new:.3f}"
+            print(f"{name:<44}{old_text:>12}{new_text:>12}")
+            continue
+        change = (new - old) / old * 100 if old else 0.0
+        better = change > 0 if name.endswith("per_s") else change < 0
+        marker = "+" if better and abs(change) >= 5 else ("-" if abs(change) >= 5 else " ")
+        print(f"{name:<44}{old:>12.3f}{new:>12.3f}{change:>8.1f}%{marker}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-o", "--output", help="Write results as JSON to this file")
+    parser.add_argument("--compare", help="Baseline results JSON to compare against")
+    parser.add_argument("--only", default=",".join(SUITES), help=f"Comma-separated subset of {', '.join(SUITES)}")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (best is kept)")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="Workers for the parallel pyramid run")
+    parser.add_argument("--use-display", action="store_true", help="Run the overlay bench on the current display instead of Xvfb")
+    args = parser.parse_args(argv)
+
+    suites = [s.strip() for s in args.only.split(",") if s.strip()]
+    metrics, skipped = {}, {}
+    for suite in suites:
+        start = time.perf_counter()
+        if suite == "keying":
+            bench_keying(metrics, args.repeat)
+        elif suite == "pyramid":
+            bench_pyramid(metrics, args.repeat, workers=args.workers)
+        elif suite == "listing":
+            bench_listing(metrics, args.repeat)
+        elif suite == "startup":
+            bench_startup(metrics, skipped, args.repeat)
+        elif suite == "overlay":
+            bench_overlay(metrics, skipped, max(5, args.repeat), args.use_display)
+        else:
+            parser.error(f"unknown suite '{suite}'")
+        print(f"[{suite}] done in {time.perf_counter() - start:.1f}s")
+
+    print(f"\n{'metric':<44}{'value':>12}")
+    for name, value in sorted(metrics.items()):
+        print(f"{name:<44}{value:>12.3f}")
+    for name, reason in skipped.items():
+        print(f"{name:<44}{'skipped':>12}  ({reason})")
+
+    results = {"meta": metadata(), "metrics": metrics, "skipped": skipped}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+        print(f"\nResults written to '{args.output}'.")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(metrics, json.load(f)["metrics"])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
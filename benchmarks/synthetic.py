@@ -0,0 +1,47 @@
+"""Synthetic reticle images for the benchmarks, scaled with the screen height like real scopes."""
+from PIL import Image, ImageDraw
+
+RESOLUTIONS = {
+    "1080p": (1920, 1080),
+    "1440p": (2560, 1440),
+    "2160p": (3840, 2160),
+}
+
+
+def _draw_reticle(draw, width, height, colour):
+    scale = height / 1080
+    cx, cy = width // 2, height // 2
+    line = max(1, round(scale))
+    # Crosshair with a gap in the middle
+    gap, arm = round(20 * scale), round(300 * scale)
+    draw.line([(cx - arm, cy), (cx - gap, cy)], fill=colour, width=line)
+    draw.line([(cx + gap, cy), (cx + arm, cy)], fill=colour, width=line)
+    draw.line([(cx, cy + gap), (cx, cy + arm)], fill=colour, width=line)
+    # Mil ticks with range numerals
+    step = round(25 * scale)
+    for i in range(1, 12):
+        y = cy + i * step
+        tick = round((12 if i % 2 else 24) * scale)
+        draw.line([(cx - tick, y), (cx + tick, y)], fill=colour, width=line)
+        if i % 2 == 0:
+            draw.text((cx + tick + 4 * scale, y - 6 * scale), str(i * 100), fill=colour)
+    # Stadia ring
+    r = round(120 * scale)
+    draw.ellipse([(cx - r, cy - r), (cx + r, cy + r)], outline=colour, width=line)
+
+
+def make_reticle(width, height, colour=(237, 28, 36, 255)):
+    """A transparent RGBA reticle like the ones in img/."""
+    img = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+    _draw_reticle(ImageDraw.Draw(img), width, height, colour)
+    return img
+
+
+def make_scan(width, height):
+    """A white 'scanned' reticle (the input trans.py keys), including a grey gradient band."""
+    img = Image.new("RGB", (width, height), (255, 255, 255))
+    draw = ImageDraw.Draw(img)
+    _draw_reticle(draw, width, height, (0, 0, 0))
+    for i in range(256):
+        draw.line([(i * width // 256, height - 40), (i * width // 256, height)], fill=(i, i, i))
+    return img
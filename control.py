@@ -0,0 +1,316 @@
+"""Local control channel: drive the overlay from other processes over a loopback TCP socket.
+
+Every connection starts by authenticating with the shared token the overlay writes to
+TOKEN_FILE (readable by the current user only, regenerated each time the server starts):
+
+    auth 3f9c...                             {"cmd": "auth", "token": "3f9c..."}
+
+After that the protocol is one command per line, either plain text or JSON:
+
+    apply M1REV.png                          {"cmd": "apply", "target": "M1REV.png", "id": 7}
+    toggle | next | prev | status            {"cmd": "next"}
+
+and every command is answered with one JSON line:
+
+    {"id": 7, "ok": true, "result": {...}, "queue_ms": 0.4, "handler_ms": 3.1, "total_ms": 3.6}
+
+queue_ms is the time from receiving the line to the Tk loop picking it up, handler_ms the
+time spent in the handler. Like hotkeys.HotkeyDispatcher, the socket threads never touch Tk:
+they queue commands, and pump() runs them on the Tk loop via root.after. Commands from one
+connection are handled in order, one at a time; open several connections to run in parallel.
+
+The server only listens on the loopback interface, and the overlay only starts it when asked
+to (--control-port). Command line client (reads the token from TOKEN_FILE):
+
+    python control.py status
+    python control.py apply tanks.rpak/M1REV
+    python control.py --replay commands.txt --repeat 20     # load test, prints latencies
+"""
+import argparse
+import hmac
+import json
+import os
+import queue
+import secrets
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+import perf
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 47810
+# How often (ms) the Tk loop checks for commands; bounds command-to-handler latency
+DEFAULT_POLL_MS = 10
+# After a command it checks every BURST_POLL_MS for BURST_SECONDS, so scripted streams of
+# commands aren't each delayed by a full idle poll interval
+BURST_POLL_MS = 1
+BURST_SECONDS = 0.5
+COMMANDS = ("apply", "toggle", "next", "prev", "status")
+TOKEN_FILE = os.path.join(os.path.expanduser("~"), ".squad_front_sight_control_token")
+
+
+def write_token(path=TOKEN_FILE):
+    """Writes a new random token to path, readable and writable by the current user only."""
+    token = secrets.token_hex(16)
+    # mkstemp creates the file with mode 0600; replacing atomically means no one can pre-create
+    # or symlink the token file to read the new token
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".control_token.")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(token)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return token
+
+
+def read_token(path=TOKEN_FILE):
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read().strip()
+
+
+def parse_auth(line):
+    """The token of an 'auth' line, or None if the line is something else."""
+    line = line.strip()
+    if line.startswith("{"):
+        try:
+            request = json.loads(line)
+        except ValueError:
+            return None
+        if isinstance(request, dict) and request.get("cmd") == "auth":
+            return str(request.get("token", ""))
+        return None
+    cmd, _, token = line.partition(" ")
+    return token.strip() if cmd == "auth" else None
+
+
+def parse_command(line):
+    """A request line -> {"cmd", "target", "id"}. Raises ValueError for malformed lines."""
+    line = line.strip()
+    if line.startswith("{"):
+        request = json.loads(line)
+        if not isinstance(request, dict):
+            raise ValueError("JSON commands must be objects")
+    else:
+        cmd, _, target = line.partition(" ")
+        request = {"cmd": cmd, "target": target.strip() or None}
+    if request.get("cmd") not in COMMANDS:
+        raise ValueError(f"Unknown command '{request.get('cmd')}' (expected one of {', '.join(COMMANDS)})")
+    target = request.get("target")
+    # JSON true/false are ints to isinstance(); they must not select entry 1 or 0
+    if isinstance(target, bool) or not isinstance(target, (str, int, type(None))):
+        raise ValueError("target must be a crosshair name or a list index")
+    if request["cmd"] == "apply" and target in (None, ""):
+        raise ValueError("apply needs a target")
+    return request
+
+
+class _Pending:
+    __slots__ = ("request", "received", "done", "response")
+
+    def __init__(self, request, received):
+        self.request = request
+        self.received = received
+        self.done = threading.Event()
+        self.response = None
+
+
+class ControlServer:
+    """
+    handlers: {command: fn(target) -> result}; the result (JSON-serialisable) is sent back,
+    an exception is reported as {"ok": false, "error": ...}. Connections whose first line is
+    not 'auth <token>' are answered with an error and closed.
+    """
+
+    def __init__(self, root, handlers, token, host=DEFAULT_HOST, port=DEFAULT_PORT, poll_ms=DEFAULT_POLL_MS):
+        if not token:
+            raise ValueError("The control socket needs a token")
+        self.root = root
+        self.handlers = handlers
+        self.token = token
+        self.poll_ms = poll_ms
+        self._queue = queue.SimpleQueue()
+        self._after_id = None
+        self._last_command = 0.0 # perf_counter() of the last command handled
+        self._stopped = threading.Event()
+        # perf_counter() of when the command being handled was received, None outside pump()
+        self.command_start = None
+        self._socket = socket.create_server((host, port))
+        self.address = self._socket.getsockname()
+
+    # --- Socket threads ---
+
+    def start(self):
+        threading.Thread(target=self._accept, name="control", daemon=True).start()
+        if self._after_id is None:
+            self._after_id = self.root.after(self.poll_ms, self.pump)
+
+    def stop(self):
+        self._stopped.set()
+        self._socket.close()
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+
+    def _accept(self):
+        while not self._stopped.is_set():
+            try:
+                connection, _ = self._socket.accept()
+            except OSError:
+                return # Closed by stop()
+            threading.Thread(target=self._serve, args=(connection,), name="control-client", daemon=True).start()
+
+    def _authenticate(self, connection, reader):
+        for line in reader:
+            if not line.strip():
+                continue
+            token = parse_auth(line.decode("utf-8", "replace"))
+            ok = token is not None and hmac.compare_digest(token.encode("utf-8"), self.token.encode("utf-8"))
+            response = {"ok": True} if ok else {"ok": False, "error": "not authorized"}
+            try:
+                connection.sendall(json.dumps(response).encode("utf-8") + b"\n")
+            except OSError:
+                return False
+            return ok
+        return False
+
+    def _serve(self, connection):
+        with connection, connection.makefile("rb") as reader:
+            if not self._authenticate(connection, reader):
+                return
+            for line in reader:
+                received = time.perf_counter()
+                if not line.strip():
+                    continue
+                try:
+                    request = parse_command(line.decode("utf-8"))
+                except ValueError as e: # json.JSONDecodeError included
+                    response = {"ok": False, "error": str(e)}
+                else:
+                    pending = _Pending(request, received)
+                    self._queue.put(pending)
+                    while not pending.done.wait(0.5):
+                        if self._stopped.is_set():
+                            return
+                    response = pending.response
+                try:
+                    connection.sendall(json.dumps(response).encode("utf-8") + b"\n")
+                except OSError:
+                    return
+
+    # --- Tk loop side ---
+
+    def pump(self):
+        try:
+            while True:
+                try:
+                    pending = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                self._run(pending)
+                self._last_command = time.perf_counter()
+        finally:
+            if not self._stopped.is_set():
+                busy = time.perf_counter() - self._last_command < BURST_SECONDS
+                self._after_id = self.root.after(BURST_POLL_MS if busy else self.poll_ms, self.pump)
+
+    def _run(self, pending):
+        request = pending.request
+        picked_up = time.perf_counter()
+        response = {"ok": True}
+        if "id" in request:
+            response["id"] = request["id"]
+        self.command_start = pending.received
+        try:
+            response["result"] = self.handlers[request["cmd"]](request.get("target"))
+        except Exception as e:
+            response.update(ok=False, error=str(e))
+        finally:
+            self.command_start = None
+        finished = time.perf_counter()
+        response.update(queue_ms=round((picked_up - pending.received) * 1000, 3),
+                        handler_ms=round((finished - picked_up) * 1000, 3),
+                        total_ms=round((finished - pending.received) * 1000, 3))
+        pending.response = response
+        pending.done.set()
+
+
+# --- Client ---
+
+def send(lines, host=DEFAULT_HOST, port=DEFAULT_PORT, token=None, timeout=10.0):
+    """
+    Sends command lines over one connection, one at a time. Yields (line, response, round trip ms).
+    token defaults to the one in TOKEN_FILE; raises PermissionError if the overlay rejects it.
+    """
+    if token is None:
+        token = read_token()
+    with socket.create_connection((host, port), timeout=timeout) as connection, \
+            connection.makefile("rb") as reader:
+        connection.sendall(f"auth {token}\n".encode("utf-8"))
+        response = json.loads(reader.readline() or "{}")
+        if not response.get("ok"):
+            raise PermissionError(response.get("error", "connection closed"))
+        for line in lines:
+            start = time.perf_counter()
+            connection.sendall(line.rstrip("\n").encode("utf-8") + b"\n")
+            response = json.loads(reader.readline())
+            yield line, response, (time.perf_counter() - start) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Send commands to a running crosshair overlay.")
+    parser.add_argument("command", nargs="*", help=f"One of {', '.join(COMMANDS)}, e.g. 'apply M1REV.png'")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--token-file", default=TOKEN_FILE, help="File holding the overlay's control token")
+    parser.add_argument("--replay", help="File with one command per line to send (load test)")
+    parser.add_argument("--repeat", type=int, default=1, help="Replay the file this many times")
+    args = parser.parse_args(argv)
+
+    if args.replay:
+        with open(args.replay, "r", encoding="utf-8") as f:
+            lines = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+        lines *= args.repeat
+    elif args.command:
+        lines = [" ".join(args.command)]
+    else:
+        parser.error("give a command or --replay")
+
+    try:
+        token = read_token(args.token_file)
+    except OSError as e:
+        print(f"Could not read the control token ({e}); is the overlay running with --control-port?")
+        return 1
+    try:
+        round_trips, handler_times, failed = [], [], 0
+        for line, response, round_trip in send(lines, args.host, args.port, token):
+            round_trips.append(round_trip)
+            handler_times.append(response.get("handler_ms", 0.0))
+            if not response.get("ok"):
+                failed += 1
+            if not args.replay or not response.get("ok"):
+                print(f"{line}: {json.dumps(response)}")
+    except PermissionError as e:
+        print(f"The overlay at {args.host}:{args.port} rejected the token: {e}")
+        return 1
+    except OSError as e:
+        print(f"Could not reach the overlay at {args.host}:{args.port}: {e}")
+        return 1
+    if args.replay and round_trips:
+        round_trips.sort()
+        handler_times.sort()
+        print(f"{len(round_trips)} commands, {failed} failed. Round trip p50 {perf.percentile(round_trips, 0.5):.2f} ms, "
+              f"p95 {perf.percentile(round_trips, 0.95):.2f} ms, max {round_trips[-1]:.2f} ms; "
+              f"handler p50 {perf.percentile(handler_times, 0.5):.2f} ms, max {handler_times[-1]:.2f} ms")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
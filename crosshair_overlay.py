@@ -1,147 +1,384 @@
+import time
+STARTUP_TIME = time.perf_counter() # Reference point for the startup timing report
 import tkinter as tk
 from tkinter import ttk, messagebox, PhotoImage, filedialog # Import filedialog
-from PIL import Image, ImageTk
+import argparse
+import bisect
+import control
+import json
 import os
 import sys
-# Note: 'keyboard' library might require administrator privileges on some systems
-# If you have issues with the hotkey, try running the script as admin.
-try:
-    import keyboard # Use 'pip install keyboard'
-    # Check if running in a standard environment where keyboard can hook
-    if not sys.stdout.isatty():
-         print("Warning: Hotkey functionality may be limited when not run from a standard terminal.")
-except ImportError:
-    keyboard = None
-    print("Warning: 'keyboard' library not found. Hotkey functionality is disabled.")
-except Exception as e:
-     keyboard = None
-     print(f"Warning: Failed to import or initialize 'keyboard' library: {e}\nHotkey functionality is disabled.")
+import threading
+import folder_index
+import hotkeys
+import image_cache
+import perf
+import prekey
+import reticle_layers
+import reticle_pack
+import thumbnails
+import variants
+import vector_reticle
+# Pillow (PIL.ImageTk) and 'keyboard' are imported on first use, so the overlay can be on
+# screen before those modules have finished loading. See ensure_photo() and load_keyboard().
+keyboard = None
 
 
 # --- Configuration ---
 # We'll start with a default, but the user can select a different folder
 DEFAULT_IMG_DIR = "./img"
 TOGGLE_HOTKEY = "f10"
+# Cycle through the scopes of the current folder without leaving the game. Off (None) by default:
+# these keys are suppressed, so the game and other applications no longer receive them once set,
+# e.g. NEXT_SCOPE_HOTKEY = "f11", PREV_SCOPE_HOTKEY = "f9"
+NEXT_SCOPE_HOTKEY = None
+PREV_SCOPE_HOTKEY = None
+# Direct selection: hotkey -> index in the list (0-based) or file name,
+# e.g. {"ctrl+1": 0, "ctrl+2": "t90REV.png"}
+SELECT_SCOPE_HOTKEYS = {}
+# Dynamic layers drawn over the crosshair and moved in place (see reticle_layers.py):
+# hotkey -> (layer action, amount). "nudge" shifts the whole crosshair by (dx, dy) screen pixels
+# (remembered per crosshair), "range" shows/steps the range bar, "mark" cycles the highlighted
+# mil mark, "reset" hides the layers, moves the range bar back to its first stop and clears the
+# nudge of the current crosshair.
+# Off by default. These keys are not suppressed, so the game and other applications still get
+# them; pick combinations they don't use, e.g.
+# {"ctrl+up": ("nudge", (0, -1)), "ctrl+down": ("nudge", (0, 1)),
+#  "ctrl+left": ("nudge", (-1, 0)), "ctrl+right": ("nudge", (1, 0)),
+#  "ctrl+page up": ("range", -1), "ctrl+page down": ("range", 1),
+#  "ctrl+m": ("mark", 1), "ctrl+shift+m": ("mark", -1), "ctrl+0": ("reset", 1)}
+LAYER_HOTKEYS = {}
+# Range bar stops: [(label, pixels below the aim point at 1080p)], e.g. [("200", 0), ("400", 6)];
+# empty for a freely movable bar that steps RANGE_STEP_PX (1080p) pixels per press
+RANGE_MARKS = []
+RANGE_STEP_PX = 1
+# Mil marks that "mark" cycles through: [(x, y)] in pixels from the aim point at 1080p
+MIL_MARKS = []
+LAYER_COLOR = 'red'
+# Hotkey events are queued by the keyboard hook and handled on the Tk loop every HOTKEY_POLL_MS;
+# repeats of one key within HOTKEY_DEBOUNCE_MS (auto-repeat while held) are ignored
+HOTKEY_POLL_MS = hotkeys.DEFAULT_POLL_MS
+HOTKEY_DEBOUNCE_MS = hotkeys.DEFAULT_DEBOUNCE_MS
+# Other processes (macro pads, scripts, test harnesses) can apply/toggle/step crosshairs through a
+# loopback TCP socket on this port (see control.py). Off (None) unless set here or enabled with
+# --control-port; clients authenticate with the token written to CONTROL_TOKEN_FILE at startup
+CONTROL_PORT = None
+CONTROL_TOKEN_FILE = control.TOKEN_FILE
+CONTROL_POLL_MS = control.DEFAULT_POLL_MS
 # A color unlikely to be in your crosshair PNGs, used for transparency keying
 # If your crosshairs use bright green, choose a different color like 'magenta'
 TRANSPARENT_COLOR = 'lime green'
+# PNGs are converted once (and cached in <library>/.cache/keyed) into images whose transparent
+# area is a key colour instead of alpha, so Tk never blends anti-aliased edges into
+# TRANSPARENT_COLOR fringes: "threshold" keeps pixels with alpha >= PREKEY_THRESHOLD as they
+# are, "matte" also blends them over PREKEY_MATTE. None shows the PNG's alpha as before.
+PREKEY_MODE = "threshold"
+PREKEY_THRESHOLD = prekey.DEFAULT_THRESHOLD
+PREKEY_MATTE = (0, 0, 0)
+# Number of decoded crosshairs kept in memory. Entries are cropped to the crosshair's opaque
+# bounding box, so each usually costs far less than a full-screen width*height*4 bytes.
+CACHE_SIZE = image_cache.DEFAULT_CAPACITY
+# Pick (or resample and cache) the variant of a reticle matching the screen resolution,
+# so e.g. M1REV.png applied on a 2560x1440 screen shows M1REV_2k.png
+AUTO_RESOLVE_VARIANTS = True
+# Record per-stage timings of apply/toggle/list into a ring buffer (see the "Timing Stats" panel).
+# Can also be switched on at runtime from the panel; costs next to nothing while off.
+PERF_ENABLED = False
+PERF_BUFFER_SIZE = perf.DEFAULT_CAPACITY
+# How often (ms) the Tk loop turns preloaded images into PhotoImages while a preload runs
+PRELOAD_POLL_MS = 50
+# The crosshair list is kept up to date by a background index of the folder (including
+# subfolders up to INDEX_MAX_DEPTH levels, 0 for the folder only), polled every INDEX_INTERVAL
+# seconds; the GUI picks up its changes every INDEX_UI_POLL_MS. While AUTO_RESOLVE_VARIANTS is
+# on, view.py's output folders (2k/, 4k/, 3440x1440/ ...) are not listed: applying the source
+# reticle already shows the variant for the screen
+INDEX_MAX_DEPTH = folder_index.DEFAULT_MAX_DEPTH
+INDEX_INTERVAL = folder_index.DEFAULT_INTERVAL
+INDEX_UI_POLL_MS = 100
+# Gallery picker: thumbnails per row, thumbnail background (should contrast with the reticles)
+# and how often (ms) it picks up finished thumbnails
+GALLERY_COLUMNS = 6
+GALLERY_BACKGROUND = 'gray50'
+GALLERY_POLL_MS = 50
+# Last folder/crosshair are saved here and re-applied at the next start
+SESSION_FILE = os.path.join(os.path.expanduser("~"), ".squad_front_sight_session.json")
+RESTORE_LAST_SESSION = True
 
 
 # --- Global Variables ---
 root = None
 overlay_window = None
-overlay_label = None
+overlay_canvas = None # Holds the crosshair (image item or vector items) and the dynamic layers
+overlay_layers = None # reticle_layers.LayerCanvas drawing layer_state on overlay_canvas
+overlay_frame = None # Screen box (left, top, right, bottom) covered by overlay_canvas, before the nudge
+layer_state = reticle_layers.LayerState(RANGE_MARKS, MIL_MARKS, RANGE_STEP_PX)
+crosshair_offsets = {} # absolute crosshair path -> (dx, dy) nudge, saved in the session
+overlay_key_color = None # Current see-through colour of the overlay window
+transparent_rgb = prekey.DEFAULT_KEY_COLOR # TRANSPARENT_COLOR as (r, g, b), set by create_root
 overlay_photo = None # Keep a reference to avoid garbage collection
 overlay_visible = False
 current_image_path = None
 current_img_dir = DEFAULT_IMG_DIR # Use a variable for the current image directory
+crosshair_cache = image_cache.ImageCache(CACHE_SIZE)
+variant_index = None # variants.VariantIndex for the library containing current_img_dir
+open_packs = {} # absolute path -> reticle_pack.ReticlePack, reopened when the file changes
+# Guards variant_index and open_packs, which the preloader thread reaches through crosshair_source
+source_lock = threading.Lock()
+hotkey_dispatcher = None # hotkeys.HotkeyDispatcher, created by setup_hotkey
+control_server = None # control.ControlServer, created by setup_control
+control_error = None # Last error reported while a control command was handled (see show_error)
+pending_map_span = None # perf span finished when the window manager maps the overlay
+preloader = None # Background thread warming crosshair_cache for the current folder
+preload_polling = False # True while finish_preloaded_photos is scheduled on the Tk loop
+image_index = None # folder_index.FolderIndex of current_img_dir
+listed_crosshairs = [] # Sorted entries of image_combo, updated from image_index's deltas
+awaiting_listing = False # True until the first listing of a newly indexed folder arrives
+pending_selection = None # Entry to select once it does
 
 # GUI elements we need to access from functions
 folder_entry = None
 image_combo = None
+cache_status_label = None
+stats_window = None
+gallery_window = None
+gallery_loader = None # thumbnails.ThumbnailLoader filling the open gallery
+startup_reported = False
 
 
 # --- Functions ---
 
+def load_keyboard():
+    """Imports the optional 'keyboard' library on first use. Returns None if it is unavailable."""
+    global keyboard
+    if keyboard is not None:
+        return keyboard
+    # Note: 'keyboard' library might require administrator privileges on some systems
+    # If you have issues with the hotkey, try running the script as admin.
+    try:
+        import keyboard as keyboard_module # Use 'pip install keyboard'
+        keyboard = keyboard_module
+        # Check if running in a standard environment where keyboard can hook
+        if not sys.stdout.isatty():
+             print("Warning: Hotkey functionality may be limited when not run from a standard terminal.")
+    except ImportError:
+        print("Warning: 'keyboard' library not found. Hotkey functionality is disabled.")
+    except Exception as e:
+         print(f"Warning: Failed to import or initialize 'keyboard' library: {e}\nHotkey functionality is disabled.")
+    return keyboard
+
+def load_session():
+    """Returns the saved session ({"img_dir", "image", "offsets"}) or an empty dict."""
+    try:
+        with open(SESSION_FILE, "r", encoding="utf-8") as f:
+            session = json.load(f)
+        return session if isinstance(session, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+def save_session():
+    """Remembers the current folder and crosshair for the next start."""
+    session = {"img_dir": os.path.abspath(current_img_dir)}
+    if current_image_path:
+        session["image"] = os.path.abspath(current_image_path)
+    offsets = {path: list(offset) for path, offset in crosshair_offsets.items() if offset != (0, 0)}
+    if offsets:
+        session["offsets"] = offsets
+    try:
+        with open(SESSION_FILE, "w", encoding="utf-8") as f:
+            json.dump(session, f)
+    except OSError as e:
+        print(f"Could not save session: {e}")
+
+def create_root():
+    """Creates the application's single Tk root (hidden until the selector GUI is shown)."""
+    global root, transparent_rgb
+    if root is None:
+        root = tk.Tk()
+        root.withdraw()
+        transparent_rgb = tuple(v // 257 for v in root.winfo_rgb(TRANSPARENT_COLOR))
+    return root
+
 def get_screen_resolution():
     """Gets the primary screen resolution using Tkinter."""
-    # Create a temporary root window if none exists yet for screen info
-    temp_root = None
-    # Check if default_root exists (means mainloop is running or root created)
-    # or if root is explicitly created but not yet mainlooping
-    if not tk._default_root and root is None:
-        temp_root = tk.Tk()
-        temp_root.withdraw() # Hide the temp window
+    # Always ask the application's own root; creating it here (instead of a throwaway
+    # temporary Tk instance) means the interpreter is only ever initialised once
+    source_widget = root if root is not None else create_root()
+    return source_widget.winfo_screenwidth(), source_widget.winfo_screenheight()
+
+
+def is_crosshair_file(filename):
+    """PNG images and vector reticles (*.reticle.json) can be applied."""
+    return filename.lower().endswith('.png') or vector_reticle.is_vector_reticle(filename)
+
+def open_pack(pack_path):
+    """The memory-mapped reticle pack at pack_path, mapped once and remapped if the file changes."""
+    abs_path = os.path.abspath(pack_path)
+    with source_lock:
+        pack = open_packs.get(abs_path)
+        if pack is None or pack.mtime_ns != os.stat(abs_path).st_mtime_ns:
+            pack = open_packs[abs_path] = reticle_pack.ReticlePack(abs_path)
+    return pack
+
+def pack_members(directory, filename):
+    """List entries ('tanks.rpak/M1REV') for the reticles in a pack; none if it can't be read."""
+    try:
+        names = open_pack(os.path.join(directory, filename)).names()
+    except (OSError, ValueError) as e:
+        print(f"Skipping reticle pack '{filename}': {e}")
+        return []
+    return [reticle_pack.member_path(filename, name) for name in names]
 
+def crosshair_exists(image_path):
+    """Like os.path.isfile, but also accepts members of reticle packs."""
+    pack_path, name = reticle_pack.split_pack_path(image_path)
+    if pack_path is None:
+        return os.path.isfile(image_path)
     try:
-        # Use tk._default_root if available (after root.mainloop() starts implicitly)
-        # or use the explicitly created root if mainloop hasn't started yet
-        source_widget = tk._default_root if tk._default_root else root
-        if source_widget:
-             width = source_widget.winfo_screenwidth()
-             height = source_widget.winfo_screenheight()
-             return width, height
-        else:
-             # Fallback if somehow neither is available (shouldn't happen in normal flow)
-             print("Warning: Could not get screen resolution from Tkinter sources.")
-             # Provide a default or raise error
-             return 1920, 1080 # Just an example fallback
-    finally:
-        if temp_root:
-            temp_root.destroy()
+        return name in open_pack(pack_path).reticles
+    except (OSError, ValueError):
+        return False
+
+def crosshair_folder(image_path):
+    """The folder whose list contains image_path (for pack members, the folder holding the pack)."""
+    pack_path, _ = reticle_pack.split_pack_path(image_path)
+    return os.path.dirname(pack_path or image_path) or "."
 
+def list_name(image_path):
+    """The entry of image_path in the crosshair list of current_img_dir ('2k/M1REV_2k.png')."""
+    try:
+        rel_path = os.path.relpath(os.path.abspath(image_path), os.path.abspath(current_img_dir))
+    except ValueError: # Different drive
+        return os.path.basename(image_path)
+    return rel_path.replace(os.sep, "/")
+
+def crosshair_entries(folder, filename):
+    """List entries a file contributes: itself for crosshairs, its reticles for packs."""
+    if is_crosshair_file(filename):
+        return [filename]
+    if reticle_pack.is_pack(filename):
+        return pack_members(folder, filename)
+    return []
+
+def is_listed_folder(name):
+    return not (AUTO_RESOLVE_VARIANTS and variants.is_variant_folder(name))
+
+def new_image_index(directory):
+    return folder_index.FolderIndex(directory, crosshair_entries, max_depth=INDEX_MAX_DEPTH,
+                                    interval=INDEX_INTERVAL, skip_folder=lambda name: not is_listed_folder(name))
 
 def load_image_list(directory):
-    """Loads PNG files from the specified directory."""
+    """
+    Loads PNG files, vector reticles and the contents of reticle packs from the specified
+    directory and its subfolders, synchronously (the GUI uses a background index instead).
+    """
     if not os.path.isdir(directory):
         # print(f"Image directory '{directory}' not found or not a directory.") # Suppress error message here, handle in select_folder/create_gui
         return []
     try:
+        span = perf.begin("list", detail=directory)
         # Use absolute path to avoid issues if the current working directory changes
         abs_dir = os.path.abspath(directory)
-        files = [f for f in os.listdir(abs_dir) if f.lower().endswith('.png')]
+        index = new_image_index(abs_dir)
+        index.scan()
+        span.stage("listdir")
         # Sort files alphabetically for consistent ordering
-        files.sort()
-        print(f"Loaded {len(files)} PNG files from '{abs_dir}'.")
+        files = index.names()
+        span.stage("sort")
+        span.end()
+        print(f"Loaded {len(files)} crosshair files from '{abs_dir}'.")
         return files
     except Exception as e:
         messagebox.showerror("Error", f"Failed to read image directory '{directory}':\n{e}")
         return []
 
 def create_or_update_overlay(image_path):
-    """Creates or updates the overlay window with the given image."""
-    global overlay_window, overlay_label, overlay_photo, current_image_path, overlay_visible
+    """Creates or updates the overlay window with the given image or vector reticle."""
+    global overlay_window, overlay_canvas, overlay_layers, overlay_frame, overlay_photo, current_image_path, overlay_visible, overlay_key_color
 
     try:
-        # Load image with Pillow
-        pil_image = Image.open(image_path)
-        img_width, img_height = pil_image.size
-
+        span = perf.begin("apply", detail=os.path.basename(image_path))
         # Get screen resolution
         screen_width, screen_height = get_screen_resolution()
 
-        # --- Resolution Check ---
-        # We allow images smaller than the screen, but not larger, and check for mismatch
-        if img_width > screen_width or img_height > screen_height:
-             messagebox.showerror("Resolution Mismatch",
-                                 f"Image dimensions ({img_width}x{img_height}) are larger than "
-                                 f"screen resolution ({screen_width}x{screen_height}).\n"
-                                 "Images must be equal to or smaller than screen resolution.")
-             pil_image.close() # Close the image file
-             return False
-        # Check for exact match if that's a strict requirement
-        # if img_width != screen_width or img_height != screen_height:
-        #    messagebox.showwarning("Resolution Warning",
-        #                         f"Image dimensions ({img_width}x{img_height}) do not exactly match "
-        #                         f"screen resolution ({screen_width}x{screen_height}).\n"
-        #                         "The image will be displayed at its original size, centered.")
-            # If we allow smaller images, we'll need to center the label in the window
-
-        # --- Load image for Tkinter ---
-        # Keep a reference to prevent garbage collection!
-        overlay_photo = ImageTk.PhotoImage(pil_image)
-        current_image_path = image_path # Store path for potential re-application
-        pil_image.close() # Close the image file as ImageTk.PhotoImage has the necessary data
+        if vector_reticle.is_vector_reticle(image_path):
+            # Vector reticles are drawn natively at the current resolution; nothing to decode
+            base_rect, vector_items = vector_reticle.layout(
+                vector_reticle.load_reticle(image_path), screen_width, screen_height)
+            overlay_photo = None
+            key_color = TRANSPARENT_COLOR
+            span.stage("layout")
+        else:
+            vector_items = None
+            key, load = crosshair_source(image_path, (screen_width, screen_height))
+            span.stage("resolve")
+            # Reuse a cached decode (and PhotoImage) when the file and resolution are unchanged
+            entry = crosshair_cache.get(key)
+            if entry is None:
+                # Load image with Pillow (or map it from a reticle pack)
+                entry = load()
+                span.stage("decode")
+            else:
+                span.stage("cache")
+            img_width, img_height = entry.size
+
+            # --- Resolution Check ---
+            # We allow images smaller than the screen, but not larger, and check for mismatch
+            if img_width > screen_width or img_height > screen_height:
+                 show_error("Resolution Mismatch",
+                            f"Image dimensions ({img_width}x{img_height}) are larger than "
+                            f"screen resolution ({screen_width}x{screen_height}).\n"
+                            "Images must be equal to or smaller than screen resolution.")
+                 update_cache_status()
+                 return False
+            # Check for exact match if that's a strict requirement
+            # if img_width != screen_width or img_height != screen_height:
+            #    messagebox.showwarning("Resolution Warning",
+            #                         f"Image dimensions ({img_width}x{img_height}) do not exactly match "
+            #                         f"screen resolution ({screen_width}x{screen_height}).\n"
+            #                         "The image will be displayed at its original size, centered.")
+                # If we allow smaller images, we'll need to center the label in the window
+
+            # --- Load image for Tkinter ---
+            # Keep a reference to prevent garbage collection!
+            ensure_photo(entry)
+            crosshair_cache.put(key, entry)
+            overlay_photo = entry.photo
+            span.stage("photo")
+            update_cache_status()
+
+            # The window only covers the opaque part of the (centered) image
+            base_rect = overlay_rect(entry, screen_width, screen_height)
+            key_color = entry.key_color or TRANSPARENT_COLOR
 
+        current_image_path = image_path # Store path for potential re-application
+        layer_state.nudge = crosshair_offsets.get(os.path.abspath(image_path), (0, 0))
+        # The window covers the crosshair; fit_overlay_to_layers grows it for visible layers
+        overlay_frame = base_rect
+        geometry = frame_geometry(overlay_frame)
 
         if overlay_window is None or not overlay_window.winfo_exists():
             # --- Create Overlay Window ---
             overlay_window = tk.Toplevel(root)
             overlay_window.overrideredirect(True)  # No border, title bar, etc.
-            # Set geometry to screen resolution
-            overlay_window.geometry(f"{screen_width}x{screen_height}+0+0") # Fullscreen, top-left corner
+            # Size and position the window to the crosshair's bounding box
+            overlay_window.geometry(geometry)
             overlay_window.lift()
             overlay_window.wm_attributes("-topmost", True) # Keep on top
 
             # --- Make window background transparent ---
             overlay_window.config(bg=TRANSPARENT_COLOR)
             overlay_window.wm_attributes("-transparentcolor", TRANSPARENT_COLOR)
-
-            # --- Create Label to hold the image ---
-            # The label background must also match the transparent color
-            overlay_label = tk.Label(overlay_window, image=overlay_photo, bg=TRANSPARENT_COLOR)
-            # Use place to center the image if it's smaller than the screen
-            overlay_label.place(relx=0.5, rely=0.5, anchor=tk.CENTER)
+            overlay_key_color = TRANSPARENT_COLOR
+
+            # --- Create Canvas (crosshair and dynamic layers) ---
+            # Its background must also match the transparent color.
+            # No border, so the content starts exactly at the window origin.
+            overlay_canvas = tk.Canvas(overlay_window, bg=TRANSPARENT_COLOR,
+                                       borderwidth=0, highlightthickness=0)
+            overlay_canvas.place(x=0, y=0)
+            overlay_layers = reticle_layers.LayerCanvas(overlay_canvas, layer_state, LAYER_COLOR)
+            # Timing: completes the "show" span once the window manager has mapped the window
+            overlay_window.bind("<Map>", on_overlay_mapped)
 
             # Hide initially, toggle will show it
             overlay_window.withdraw()
@@ -150,30 +387,208 @@ def create_or_update_overlay(image_path):
 
         else:
             # --- Update Existing Overlay Window ---
-            overlay_label.config(image=overlay_photo)
-            # Ensure geometry is still correct (though it shouldn't change if res matches)
-            overlay_window.geometry(f"{screen_width}x{screen_height}+0+0")
-            # Re-center the label in case the new image size is different
-            overlay_label.place(relx=0.5, rely=0.5, anchor=tk.CENTER)
+            # Move/resize the window to the new crosshair's bounding box
+            overlay_window.geometry(geometry)
             print("Overlay image updated.")
+        set_overlay_key_color(key_color)
+        span.stage("window")
+
+        # Full redraw: the crosshair, then the layers on top of it
+        overlay_canvas.delete("all")
+        overlay_canvas.config(width=overlay_frame[2] - overlay_frame[0], height=overlay_frame[3] - overlay_frame[1])
+        base_x, base_y = base_rect[0] - overlay_frame[0], base_rect[1] - overlay_frame[1]
+        if vector_items is None:
+            overlay_canvas.create_image(base_x, base_y, image=overlay_photo, anchor="nw")
+        else:
+            vector_reticle.draw_on_canvas(overlay_canvas, vector_items)
+            overlay_canvas.move("all", base_x, base_y) # Items are relative to the reticle's bbox
+        overlay_layers.reset(overlay_frame[:2], (screen_width, screen_height))
+        fit_overlay_to_layers()
+        overlay_layers.draw()
+        span.stage("content")
+        span.end()
 
         return True # Indicate success
 
     except FileNotFoundError:
-         messagebox.showerror("Error", f"Image file not found:\n{image_path}")
+         show_error("Error", f"Image file not found:\n{image_path}")
          return False
     except Exception as e:
-        messagebox.showerror("Error", f"Failed to load or display image:\n{e}")
+        show_error("Error", f"Failed to load or display image:\n{e}")
         # Clean up potentially broken overlay
         if overlay_window and overlay_window.winfo_exists():
             overlay_window.destroy()
         overlay_window = None
-        overlay_label = None
+        overlay_canvas = None
+        overlay_layers = None
         overlay_photo = None
         overlay_visible = False
         current_image_path = None # Clear the path of the failed image
         return False
 
+def crosshair_source(image_path, screen_size):
+    """
+    (cache key, load) for a crosshair at screen_size; load() returns its image_cache.CacheEntry.
+    Pack members are mapped from their pack, PNGs go through variant resolution and pre-keying.
+    """
+    pack_path, name = reticle_pack.split_pack_path(image_path)
+    if pack_path is not None:
+        pack = open_pack(pack_path)
+        key = (pack.path, pack.mtime_ns, name, tuple(screen_size))
+        return key, lambda: pack.entry(name, screen_size)
+    display_path = resolve_variant(image_path, screen_size)
+    if not PREKEY_MODE:
+        return image_cache.file_source(display_path, screen_size)
+    key = image_cache.cache_key(display_path, screen_size) + (PREKEY_MODE,)
+    return key, lambda: load_prekeyed(display_path)
+
+def load_prekeyed(image_path):
+    """Pre-keyed cache entry for a PNG (keyed now if not cached yet); the plain PNG if that fails."""
+    try:
+        keyed_path = prekey.ensure_prekeyed(image_path, PREKEY_MODE, PREKEY_THRESHOLD, PREKEY_MATTE, transparent_rgb)
+        return prekey.load_entry(keyed_path)
+    except Exception as e:
+        print(f"Pre-keying failed for '{os.path.basename(image_path)}', using its alpha: {e}")
+        return image_cache.CacheEntry(image_cache.decode_image(image_path))
+
+def set_overlay_key_color(color):
+    """Makes color the see-through colour of the overlay window and its widgets."""
+    global overlay_key_color
+    if overlay_window.winfo_rgb(color) == overlay_window.winfo_rgb(overlay_key_color):
+        return
+    overlay_window.config(bg=color)
+    overlay_window.wm_attributes("-transparentcolor", color)
+    overlay_canvas.config(bg=color)
+    overlay_key_color = color
+
+def resolve_variant(image_path, screen_size):
+    """
+    Maps a chosen crosshair to the file to display at screen_size: the variant of the same
+    reticle with the exact resolution, or one resampled on demand and cached on disk.
+    """
+    global variant_index
+    if not AUTO_RESOLVE_VARIANTS:
+        return image_path
+    root_dir = variants.library_root(os.path.dirname(image_path) or ".")
+    with source_lock:
+        if variant_index is None or variant_index.root != root_dir:
+            variant_index = variants.VariantIndex(root_dir)
+        index = variant_index
+    try:
+        return variants.resolve(index, image_path, screen_size)
+    except Exception as e:
+        print(f"Variant resolution failed for '{os.path.basename(image_path)}': {e}")
+        return image_path
+
+def overlay_rect(entry, screen_width, screen_height):
+    """
+    Screen box (left, top, right, bottom) of the opaque bounding box of entry, with the full
+    image centered on the screen as the old full-screen overlay did.
+    """
+    left, upper, right, lower = entry.bbox
+    offset_x = (screen_width - entry.size[0]) // 2
+    offset_y = (screen_height - entry.size[1]) // 2
+    return offset_x + left, offset_y + upper, offset_x + right, offset_y + lower
+
+def frame_geometry(frame, size=True):
+    """Tk geometry string placing the overlay window over frame, shifted by the current nudge."""
+    left, top, right, bottom = frame
+    position = f"+{left + layer_state.nudge[0]}+{top + layer_state.nudge[1]}"
+    return f"{right - left}x{bottom - top}{position}" if size else position
+
+def fit_overlay_to_layers():
+    """
+    Grows the overlay window (it is not shrunk before the next apply) when a visible layer lies
+    outside it, shifting the existing canvas items so they stay put on screen. Returns True if
+    the window geometry was changed.
+    """
+    global overlay_frame
+    layers_rect = overlay_layers.layers_rect()
+    if layers_rect is None or reticle_layers.contains(overlay_frame, layers_rect):
+        return False
+    overlay_frame = reticle_layers.union(overlay_frame, layers_rect)
+    overlay_layers.move_origin(overlay_frame[:2])
+    overlay_canvas.config(width=overlay_frame[2] - overlay_frame[0], height=overlay_frame[3] - overlay_frame[1])
+    overlay_window.geometry(frame_geometry(overlay_frame))
+    return True
+
+def adjust_layer(action, amount, presses=1):
+    """
+    Hotkey handler for the dynamic layers; amount is summed over `presses` coalesced presses.
+    Only the changed layer's canvas items are moved or re-labelled (a nudge just moves the
+    window); the crosshair image is never re-uploaded.
+    """
+    span = perf.begin("layer", detail=action,
+                      start=input_start())
+    if action == "nudge":
+        layer_state.move_nudge(*amount)
+    elif action == "range":
+        layer_state.step_range(amount, presses)
+    elif action == "mark":
+        layer_state.cycle_mark(amount)
+    elif action == "reset":
+        layer_state.reset()
+    else:
+        print(f"Unknown layer action '{action}'.")
+        return
+    if current_image_path:
+        crosshair_offsets[os.path.abspath(current_image_path)] = layer_state.nudge
+    if overlay_window is None or not overlay_window.winfo_exists() or overlay_frame is None:
+        span.end()
+        return
+    span.stage("state")
+    if not fit_overlay_to_layers() and action in ("nudge", "reset"):
+        overlay_window.geometry(frame_geometry(overlay_frame, size=False))
+    span.stage("window")
+    overlay_layers.draw()
+    span.stage("layers")
+    span.end()
+
+def ensure_photo(entry):
+    """Builds the Tk PhotoImage for a cache entry (Tk thread only) and drops the Pillow copy."""
+    if entry.photo is None:
+        from PIL import ImageTk
+        entry.photo = ImageTk.PhotoImage(entry.image)
+        entry.image.close() # ImageTk.PhotoImage has the necessary data
+        entry.image = None
+    return entry.photo
+
+def start_preload(image_files):
+    """Warms the crosshair cache for the current folder on a background thread."""
+    global preloader, preload_polling
+    if preloader is not None:
+        preloader.cancel()
+    paths = [os.path.join(current_img_dir, f) for f in image_files if not vector_reticle.is_vector_reticle(f)]
+    preloader = image_cache.Preloader(crosshair_cache, paths, get_screen_resolution(), source=crosshair_source)
+    preloader.start()
+    if not preload_polling:
+        preload_polling = True
+        root.after(PRELOAD_POLL_MS, finish_preloaded_photos)
+
+def finish_preloaded_photos():
+    """
+    Runs on the Tk loop while a preload is active: converts one decoded image per tick into a
+    PhotoImage, so applying any warmed crosshair is just a label swap.
+    """
+    global preload_polling
+    pending = crosshair_cache.entries_without_photo()
+    if pending:
+        ensure_photo(pending[0])
+    update_cache_status()
+    if len(pending) > 1 or (preloader is not None and preloader.is_alive()):
+        root.after(PRELOAD_POLL_MS if not pending else 1, finish_preloaded_photos)
+    else:
+        preload_polling = False
+
+def update_cache_status():
+    """Shows cache fill level and hit/miss counters in the GUI."""
+    if cache_status_label is None:
+        return
+    stats = crosshair_cache.stats()
+    cache_status_label.config(text=f"Cache: {stats['size']}/{stats['capacity']}  "
+                                   f"hits {stats['hits']}  misses {stats['misses']}  "
+                                   f"evicted {stats['evictions']}")
+
 def apply_crosshair():
     """Called when the 'Apply Crosshair' button is clicked."""
     global overlay_visible # Need to modify overlay_visible if we show the window
@@ -187,6 +602,7 @@ def apply_crosshair():
     full_path = os.path.join(current_img_dir, selected_image)
 
     if create_or_update_overlay(full_path):
+        save_session()
         messagebox.showinfo("Success", f"Crosshair '{selected_image}' applied.\nPress {TOGGLE_HOTKEY.upper()} to toggle visibility.")
         # Make sure it's visible after applying, unless it was already visible
         if overlay_window and not overlay_visible:
@@ -194,7 +610,7 @@ def apply_crosshair():
 
 def toggle_overlay():
     """Shows or hides the overlay window."""
-    global overlay_window, overlay_visible
+    global overlay_window, overlay_visible, pending_map_span
     if overlay_window is None or not overlay_window.winfo_exists():
         print("Toggle ignored: Overlay window does not exist.")
         # Optionally try to re-apply the last known good image if desired
@@ -209,43 +625,320 @@ def toggle_overlay():
                 print("Recreation failed.")
         return
 
+    # When triggered by a hotkey or control command, time from the key press rather than from this call
+    hotkey_start = input_start()
+    span = perf.begin("hide" if overlay_visible else "show", start=hotkey_start)
+    if hotkey_start is not None:
+        span.stage("queue")
+
     if overlay_visible:
         overlay_window.withdraw() # Hide the window
         overlay_visible = False
+        span.stage("withdraw")
+        span.end()
         # print(f"{TOGGLE_HOTKEY.upper()} pressed: Overlay hidden.") # Avoid flooding console on rapid presses
     else:
         overlay_window.deiconify() # Show the window
+        span.stage("deiconify")
         # Bring to front - may need system-specific adjustments for games
         overlay_window.lift()
         overlay_window.wm_attributes("-topmost", True) # Re-assert topmost
         overlay_visible = True
+        span.stage("raise")
+        if span:
+            pending_map_span = span # on_overlay_mapped adds the "map" stage and records it
         # print(f"{TOGGLE_HOTKEY.upper()} pressed: Overlay shown.") # Avoid flooding console
 
+def on_overlay_mapped(event):
+    """<Map> handler of the overlay window: the point at which it is actually visible."""
+    global pending_map_span, startup_reported
+    if event.widget is not overlay_window:
+        return
+    if not startup_reported:
+        startup_reported = True
+        print(f"Startup: crosshair visible {(time.perf_counter() - STARTUP_TIME) * 1000:.0f} ms after launch.")
+    if pending_map_span is not None:
+        pending_map_span.stage("map")
+        pending_map_span.end()
+        pending_map_span = None
+
+def show_error(title, message):
+    """
+    messagebox.showerror, except while a hotkey or control command is handled: then the error is
+    printed (and sent back over the socket for a control command) instead of popping up a modal
+    dialog over the game.
+    """
+    global control_error
+    if control_server is not None and control_server.command_start is not None:
+        print(f"{title}: {message}")
+        control_error = message.replace("\n", " ")
+        return
+    if hotkey_dispatcher is not None and hotkey_dispatcher.burst_start is not None:
+        print(f"{title}: {message}")
+        return
+    messagebox.showerror(title, message)
+
+def input_start():
+    """perf_counter() of the key press or control command being handled, None outside their handlers."""
+    if hotkey_dispatcher is not None and hotkey_dispatcher.burst_start is not None:
+        return hotkey_dispatcher.burst_start
+    if control_server is not None:
+        return control_server.command_start
+    return None
+
+def show_scope(index):
+    """
+    Applies the scope at index in the image list and makes sure the overlay is visible (hotkey
+    path, no dialogs). Returns True if it was applied.
+    """
+    image_files = list(image_combo['values'])
+    if not image_files:
+        return False
+    index %= len(image_files)
+    image_combo.current(index)
+    if not create_or_update_overlay(os.path.join(current_img_dir, image_files[index])):
+        return False
+    save_session()
+    if overlay_window and not overlay_visible:
+        toggle_overlay()
+    return True
+
+def step_scope(offset):
+    """Moves offset entries forward/backward through the image list, wrapping around."""
+    image_files = list(image_combo['values'])
+    if not image_files:
+        return False
+    current = image_combo.current()
+    return show_scope(offset if current < 0 else current + offset)
+
+def select_scope(target):
+    """Direct selection by list index or file name."""
+    image_files = list(image_combo['values'])
+    if isinstance(target, int):
+        if 0 <= target < len(image_files):
+            return show_scope(target)
+    elif target in image_files:
+        return show_scope(image_files.index(target))
+    print(f"Scope '{target}' is not in the current folder.")
+    return False
+
 def setup_hotkey():
-    """Sets up the global hotkey listener."""
-    if keyboard is None:
+    """Sets up the global hotkey listeners; events are dispatched onto the Tk loop."""
+    global hotkey_dispatcher
+    if load_keyboard() is None:
         print("Hotkey setup skipped: 'keyboard' library not available.")
         return
 
+    hotkey_dispatcher = hotkeys.HotkeyDispatcher(
+        root,
+        {hotkeys.TOGGLE: toggle_overlay, hotkeys.STEP: step_scope, hotkeys.SELECT: select_scope,
+         hotkeys.LAYER: adjust_layer},
+        poll_ms=HOTKEY_POLL_MS, debounce_ms=HOTKEY_DEBOUNCE_MS)
+    # (hotkey, action, value, description, suppress); suppress=True prevents the key event from
+    # being passed to other applications. Layer keys are modifier combinations that editors and
+    # games use too, so they are passed through.
+    bindings = [(TOGGLE_HOTKEY, hotkeys.TOGGLE, None, "toggle the crosshair overlay", True),
+                (NEXT_SCOPE_HOTKEY, hotkeys.STEP, 1, "show the next crosshair", True),
+                (PREV_SCOPE_HOTKEY, hotkeys.STEP, -1, "show the previous crosshair", True)]
+    bindings += [(key, hotkeys.SELECT, target, f"show '{target}'", True) for key, target in SELECT_SCOPE_HOTKEYS.items()]
+    bindings += [(key, hotkeys.LAYER, tuple(layer), f"{layer[0]} {layer[1]}", False)
+                 for key, layer in LAYER_HOTKEYS.items()]
+
+    for hotkey, action, value, description, suppress in bindings:
+        if not hotkey:
+            continue
+        try:
+            # The callback only enqueues the event; Tk is never touched from the hook thread
+            keyboard.add_hotkey(hotkey, hotkey_dispatcher.callback(action, value, hotkey), suppress=suppress)
+            print(f"Hotkey '{hotkey.upper()}' registered. Press it to {description}.")
+            # Note: keyboard library might need admin rights to capture global keys.
+        except Exception as e:
+             messagebox.showerror("Hotkey Error",
+                                  f"Failed to register hotkey '{hotkey.upper()}'.\n"
+                                  f"Error: {e}\n\n"
+                                  "Try running the script as an administrator.")
+             print(f"Hotkey registration failed: {e}")
+    hotkey_dispatcher.start()
+
+# --- Control channel ---
+
+def overlay_status(target=None):
+    """The 'status' control command: what is shown and where it comes from."""
+    return {"image": list_name(current_image_path) if current_image_path else None,
+            "path": os.path.abspath(current_image_path) if current_image_path else None,
+            "visible": overlay_visible,
+            "folder": os.path.abspath(current_img_dir),
+            "index": image_combo.current() if image_combo is not None else -1,
+            "count": len(listed_crosshairs)}
+
+def control_command(handler):
+    """Wraps a control handler so errors reported through show_error fail the command."""
+    def run(target):
+        global control_error
+        control_error = None
+        try:
+            result = handler(target)
+            if control_error:
+                raise RuntimeError(control_error)
+            return result
+        finally:
+            control_error = None
+    return run
+
+def control_apply(target):
+    """
+    The 'apply' control command: an entry of the crosshair list (e.g. '2k/M1REV_2k.png') or its
+    index. Only listed crosshairs can be applied, never arbitrary paths.
+    """
+    if not (isinstance(target, int) or target in listed_crosshairs):
+        raise ValueError(f"Crosshair '{target}' is not in the list of '{os.path.abspath(current_img_dir)}'")
+    if not select_scope(target):
+        raise RuntimeError(control_error or f"Could not apply '{target}'")
+    return overlay_status()
+
+def control_step(offset):
+    def step(target):
+        if not step_scope(offset):
+            raise RuntimeError(control_error or ("No crosshair to step to" if not listed_crosshairs
+                                                 else "Could not apply the crosshair"))
+        return overlay_status()
+    return step
+
+def control_toggle(target):
+    toggle_overlay()
+    return overlay_status()
+
+def setup_control(port=None):
+    """
+    Starts the control socket (see control.py) if port (or CONTROL_PORT) is set, with a fresh
+    token in CONTROL_TOKEN_FILE; commands are dispatched onto the Tk loop.
+    """
+    global control_server
+    port = CONTROL_PORT if port is None else port
+    if not port:
+        return
+    handlers = {"apply": control_apply, "toggle": control_toggle, "next": control_step(1),
+                "prev": control_step(-1), "status": overlay_status}
+    handlers = {name: control_command(handler) for name, handler in handlers.items()}
     try:
-        # Use lambda to avoid issues with arguments if toggle_overlay expected none
-        # suppress=True prevents the key event from being passed to other applications
-        keyboard.add_hotkey(TOGGLE_HOTKEY, lambda: toggle_overlay(), suppress=True)
-        print(f"Hotkey '{TOGGLE_HOTKEY.upper()}' registered. Press it to toggle the crosshair overlay.")
-        # Add a note about admin rights if detection fails later or is common
-        # Note: keyboard library might need admin rights to capture global keys.
-    except Exception as e:
-         messagebox.showerror("Hotkey Error",
-                              f"Failed to register hotkey '{TOGGLE_HOTKEY.upper()}'.\n"
-                              f"Error: {e}\n\n"
-                              "Try running the script as an administrator.")
-         # Optionally, disable hotkey functionality or exit
-         print(f"Hotkey registration failed: {e}")
+        token = control.write_token(CONTROL_TOKEN_FILE)
+        control_server = control.ControlServer(root, handlers, token, port=port, poll_ms=CONTROL_POLL_MS)
+    except OSError as e:
+        print(f"Control socket disabled: could not listen on port {port}: {e}")
+        return
+    control_server.start()
+    print(f"Control socket listening on {control_server.address[0]}:{control_server.address[1]} "
+          f"(token in '{CONTROL_TOKEN_FILE}').")
 
 
+def open_stats_window():
+    """Small panel with p50/p95/max per stage, a recording switch and JSON export."""
+    global stats_window
+    if stats_window is not None and stats_window.winfo_exists():
+        stats_window.lift()
+        return
+    stats_window = tk.Toplevel(root)
+    stats_window.title("Timing Stats")
+
+    recording = tk.BooleanVar(value=perf.enabled)
+    text = tk.Text(stats_window, width=60, height=18, font=("Courier", 9))
+
+    def refresh():
+        text.config(state='normal')
+        text.delete("1.0", tk.END)
+        text.insert(tk.END, perf.format_summary())
+        if hotkey_dispatcher is not None:
+            count, last_ms, max_ms = hotkey_dispatcher.latency_summary()
+            text.insert(tk.END, f"\n\nHotkey to handler: {count} bursts, last {last_ms:.2f} ms, max {max_ms:.2f} ms")
+        text.config(state='disabled')
+
+    def save_json():
+        path = filedialog.asksaveasfilename(title="Save timings", defaultextension=".json",
+                                            filetypes=[("JSON", "*.json")])
+        if path:
+            perf.dump_json(path)
+            print(f"Timings saved to '{path}'.")
+
+    def clear():
+        perf.clear()
+        refresh()
+
+    controls = ttk.Frame(stats_window, padding=5)
+    controls.pack(fill=tk.X)
+    ttk.Checkbutton(controls, text="Record timings", variable=recording,
+                    command=lambda: perf.set_enabled(recording.get())).pack(side=tk.LEFT)
+    ttk.Button(controls, text="Refresh", command=refresh).pack(side=tk.LEFT, padx=5)
+    ttk.Button(controls, text="Clear", command=clear).pack(side=tk.LEFT)
+    ttk.Button(controls, text="Save JSON...", command=save_json).pack(side=tk.LEFT, padx=5)
+    text.pack(fill=tk.BOTH, expand=True, padx=5, pady=(0, 5))
+    refresh()
+
+def open_gallery_window():
+    """Thumbnail grid of the crosshair list; clicking a thumbnail applies that crosshair."""
+    global gallery_window, gallery_loader
+    if gallery_window is not None and gallery_window.winfo_exists():
+        gallery_window.lift()
+        return
+    names = list(image_combo['values'])
+    gallery_window = tk.Toplevel(root)
+    gallery_window.title(f"Crosshair Gallery - {os.path.abspath(current_img_dir)}")
+
+    canvas = tk.Canvas(gallery_window, bg=GALLERY_BACKGROUND, highlightthickness=0)
+    scrollbar = ttk.Scrollbar(gallery_window, orient=tk.VERTICAL, command=canvas.yview)
+    canvas.configure(yscrollcommand=scrollbar.set)
+    grid = tk.Frame(canvas, bg=GALLERY_BACKGROUND)
+    canvas.create_window((0, 0), window=grid, anchor="nw")
+    grid.bind("<Configure>", lambda e: canvas.configure(scrollregion=canvas.bbox("all"),
+                                                        width=grid.winfo_reqwidth()))
+    canvas.bind("<MouseWheel>", lambda e: canvas.yview_scroll(-1 if e.delta > 0 else 1, "units"))
+    scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+    canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+    # Every cell gets a blank placeholder of the final size so the grid doesn't reflow
+    placeholder = tk.PhotoImage(width=thumbnails.THUMB_SIZE, height=thumbnails.THUMB_SIZE)
+    photos = {"": placeholder} # Keep references to avoid garbage collection
+    buttons = {}
+    for i, name in enumerate(names):
+        label = os.path.splitext(name)[0].replace(".reticle", "")
+        button = tk.Button(grid, image=placeholder, text=label, compound="top", bg=GALLERY_BACKGROUND,
+                           wraplength=thumbnails.THUMB_SIZE + 20, relief="flat",
+                           command=lambda name=name: select_scope(name))
+        button.grid(row=i // GALLERY_COLUMNS, column=i % GALLERY_COLUMNS, padx=4, pady=4, sticky="n")
+        button.bind("<MouseWheel>", lambda e: canvas.yview_scroll(-1 if e.delta > 0 else 1, "units"))
+        buttons[name] = button
+    canvas.configure(height=min(4, len(names) // GALLERY_COLUMNS + 1) * (thumbnails.THUMB_SIZE + 40))
+
+    if gallery_loader is not None:
+        gallery_loader.cancel()
+    gallery_loader = thumbnails.ThumbnailLoader(current_img_dir, names)
+    gallery_loader.start()
+
+    def poll(loader):
+        if loader is not gallery_loader or not gallery_window.winfo_exists():
+            return
+        alive = loader.is_alive() # Checked before draining so the last results aren't missed
+        for name, path in loader.results():
+            if path is None:
+                continue
+            try:
+                photos[name] = tk.PhotoImage(file=path) # Tk decodes the small PNG natively
+                buttons[name].config(image=photos[name])
+            except tk.TclError as e:
+                print(f"Could not show thumbnail of '{name}': {e}")
+        if alive:
+            gallery_window.after(GALLERY_POLL_MS, poll, loader)
+
+    def close():
+        gallery_loader.cancel()
+        gallery_window.destroy()
+
+    gallery_window.protocol("WM_DELETE_WINDOW", close)
+    poll(gallery_loader)
+
 def on_close():
     """Cleanup actions when the main GUI window is closed."""
     print("Closing application...")
+    save_session()
     try:
         if keyboard:
             print("Unhooking keyboard listener...")
@@ -254,6 +947,16 @@ def on_close():
         print(f"Error unhooking keyboard: {e}") # Log error but continue closing
 
     global overlay_window
+    if hotkey_dispatcher is not None:
+        hotkey_dispatcher.stop()
+    if control_server is not None:
+        control_server.stop()
+    if preloader is not None:
+        preloader.cancel()
+    if image_index is not None:
+        image_index.stop()
+    if gallery_loader is not None:
+        gallery_loader.cancel()
     if overlay_window and overlay_window.winfo_exists():
         print("Destroying overlay window...")
         overlay_window.destroy()
@@ -284,27 +987,64 @@ def select_folder():
     else:
         print("Folder selection cancelled.")
 
-def refresh_image_list_in_gui():
-    """Loads images from the current directory and updates the combobox."""
-    global image_combo # Need to access the global combobox
-    image_files = load_image_list(current_img_dir)
-    image_combo['values'] = image_files
-    if image_files:
-         image_combo.current(0) # Select the first image
-         # Enable apply button if it was potentially disabled
-         # apply_button.config(state='normal') # Assuming an apply button exists and is accessible
-    else:
-        image_combo.set('No PNG files found') # Or just ''
-        # Disable apply button if no files are found
-        # apply_button.config(state='disabled') # Assuming an apply button exists and is accessible
-        print(f"No PNG files found in '{current_img_dir}'.")
+def refresh_image_list_in_gui(selected=None):
+    """
+    Starts indexing the current directory in the background; the combobox is filled (and
+    kept up to date) by apply_index_changes.
+    """
+    global image_index, listed_crosshairs, awaiting_listing, pending_selection
+    if image_index is not None:
+        image_index.stop()
+    listed_crosshairs = []
+    awaiting_listing = True
+    pending_selection = selected
+    image_combo['values'] = []
+    image_combo.set('Loading...')
+    image_index = new_image_index(current_img_dir)
+    image_index.start()
+    root.after(INDEX_UI_POLL_MS, apply_index_changes, image_index)
+
+def apply_index_changes(index):
+    """Runs on the Tk loop: merges the index's deltas into the combobox without a full rescan."""
+    global awaiting_listing
+    if index is not image_index:
+        return # The folder has changed since; that index has been stopped
+    changes = index.changes()
+    if changes:
+        span = perf.begin("list", detail=current_img_dir)
+        selected_image = image_combo.get()
+        for added, removed in changes:
+            for name in removed:
+                position = bisect.bisect_left(listed_crosshairs, name)
+                if position < len(listed_crosshairs) and listed_crosshairs[position] == name:
+                    del listed_crosshairs[position]
+            for name in added:
+                bisect.insort(listed_crosshairs, name)
+        image_combo['values'] = listed_crosshairs
+        span.stage("merge")
+        if listed_crosshairs:
+            if awaiting_listing:
+                # Select the given file (e.g. the restored crosshair), otherwise the first image
+                target = pending_selection if pending_selection in listed_crosshairs else listed_crosshairs[0]
+                image_combo.current(listed_crosshairs.index(target))
+                print(f"Loaded {len(listed_crosshairs)} crosshair files from '{os.path.abspath(current_img_dir)}'.")
+            elif selected_image not in listed_crosshairs:
+                image_combo.current(0) # The selected file was deleted
+            start_preload(listed_crosshairs)
+        else:
+            image_combo.set('No crosshair files found') # Or just ''
+            print(f"No PNG or vector reticle files found in '{current_img_dir}'.")
+        awaiting_listing = False
+        span.stage("combo")
+        span.end()
+    root.after(INDEX_UI_POLL_MS, apply_index_changes, index)
 
 
 # --- GUI Setup ---
-def create_gui():
-    global root, folder_entry, image_combo # Make GUI elements accessible globally
+def create_gui(show=True):
+    global root, folder_entry, image_combo, cache_status_label # Make GUI elements accessible globally
 
-    root = tk.Tk()
+    create_root()
     root.title("Crosshair Selector")
     # root.geometry("400x200") # Optional: Set initial size, adjust as needed
 
@@ -340,6 +1080,16 @@ def create_gui():
     apply_button = ttk.Button(image_frame, text="Apply Crosshair", command=apply_crosshair)
     apply_button.pack(pady=(0, 5)) # Add some space below the button
 
+    # Cache statistics (filled in by update_cache_status)
+    cache_status_label = ttk.Label(image_frame, text="", foreground="gray")
+    cache_status_label.pack(pady=(5, 0))
+
+    gallery_button = ttk.Button(image_frame, text="Gallery", command=open_gallery_window)
+    gallery_button.pack(pady=(5, 0))
+
+    stats_button = ttk.Button(image_frame, text="Timing Stats", command=open_stats_window)
+    stats_button.pack(pady=(5, 0))
+
 
     # --- Initial State Setup ---
     # Set the initial folder path in the entry
@@ -348,7 +1098,7 @@ def create_gui():
     folder_entry.config(state='readonly')
 
     # Load the initial list of images for the combobox
-    refresh_image_list_in_gui()
+    refresh_image_list_in_gui(list_name(current_image_path) if current_image_path else None)
 
 
     # --- Hotkey and Close Protocol ---
@@ -356,19 +1106,48 @@ def create_gui():
 
 
     # --- Center the window ---
-    # Needs update_idletasks to calculate correct window size
-    root.update_idletasks()
-    screen_w, screen_h = get_screen_resolution()
-    window_size = tuple(int(_) for _ in root.geometry().split('+')[0].split('x'))
-    x = screen_w/2 - window_size[0]/2
-    y = screen_h/2 - window_size[1]/2
-    root.geometry("+%d+%d" % (x, y))
+    # Deferred to the first idle moment: the layout pass it needs would otherwise delay
+    # startup (and an overlay applied from the command line) before the main loop even runs
+    if show:
+        root.after_idle(center_and_show_gui)
 
     return root
 
+def center_and_show_gui():
+    """Centers the selector window on screen and shows it."""
+    root.update_idletasks() # Needed to calculate the correct window size
+    screen_w, screen_h = get_screen_resolution()
+    window_w, window_h = root.winfo_reqwidth(), root.winfo_reqheight()
+    root.geometry("+%d+%d" % (screen_w/2 - window_w/2, screen_h/2 - window_h/2))
+    root.deiconify()
+
+def show_startup_crosshair(image_path):
+    """Applies a crosshair given on the command line or restored from the session and shows it."""
+    if not crosshair_exists(image_path):
+        print(f"Crosshair '{image_path}' not found; starting without one.")
+        return
+    if create_or_update_overlay(image_path) and not overlay_visible:
+        toggle_overlay()
+        print(f"Crosshair '{os.path.basename(image_path)}' applied. Press {TOGGLE_HOTKEY.upper()} to toggle visibility.")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Show a transparent crosshair overlay on top of the screen.")
+    parser.add_argument("--image", help="Crosshair PNG, .reticle.json or pack member (tanks.rpak/M1REV) to show immediately")
+    parser.add_argument("--dir", help=f"Crosshair folder (default: {DEFAULT_IMG_DIR}, or the folder of --image)")
+    parser.add_argument("--hotkey", help=f"Toggle hotkey (default: {TOGGLE_HOTKEY})")
+    parser.add_argument("--no-gui", action="store_true",
+                        help="Don't show the selector window; use hotkeys only (close with Ctrl+C)")
+    parser.add_argument("--no-restore", action="store_true", help="Don't re-apply the crosshair from the last session")
+    parser.add_argument("--control-port", type=int, nargs="?", const=control.DEFAULT_PORT, default=None,
+                        help=f"Enable the local control socket (off by default), on this port "
+                             f"(default: {control.DEFAULT_PORT}); 0 disables it")
+    parser.add_argument("--timing", action="store_true", help="Record per-stage timings from startup (see Timing Stats)")
+    return parser.parse_args(argv)
+
 
 # --- Main Execution ---
 if __name__ == "__main__":
+    args = parse_args()
 
     # Basic check if running as admin (Windows only check here for simplicity)
     is_admin = False
@@ -385,17 +1164,43 @@ if __name__ == "__main__":
         # messagebox.showwarning("Admin Rights", "Run this script as an administrator for the F10 hotkey to work reliably.")
 
 
-    # Create the main GUI
-    main_window = create_gui()
+    perf.set_capacity(PERF_BUFFER_SIZE)
+    perf.set_enabled(PERF_ENABLED or args.timing)
+    if args.hotkey:
+        TOGGLE_HOTKEY = args.hotkey
+
+    # Work out which crosshair to show straight away: --image, else the last session's
+    saved_session = load_session()
+    crosshair_offsets.update((path, tuple(offset)) for path, offset in saved_session.get("offsets", {}).items())
+    session = saved_session if RESTORE_LAST_SESSION and not args.no_restore else {}
+    startup_image = args.image or session.get("image")
+    if args.dir:
+        current_img_dir = args.dir
+    elif args.image:
+        current_img_dir = crosshair_folder(args.image)
+    elif session.get("img_dir") and os.path.isdir(session["img_dir"]):
+        current_img_dir = session["img_dir"]
+
+    # Single Tk root; the overlay goes up before the selector widgets are built
+    create_root()
+    if startup_image:
+        show_startup_crosshair(startup_image)
+
+    # Create the main GUI (kept hidden with --no-gui; hotkeys still use its crosshair list)
+    main_window = create_gui(show=not args.no_gui)
 
     # Setup the hotkey *after* the GUI is created but before mainloop starts
     # This ensures Tkinter's internal setup is done first
     setup_hotkey()
+    setup_control(args.control_port)
 
     # Start the Tkinter event loop
     print("Starting GUI main loop...")
-    main_window.mainloop()
+    try:
+        main_window.mainloop()
+    except KeyboardInterrupt:
+        on_close()
 
     # The script will pause here until the main window is closed.
     # The on_close function handles cleanup before the script fully exits.
-    print("Application finished.")
\ No newline at end of file
+    print("Application finished.")
@@ -0,0 +1,163 @@
+"""Background, incremental index of the crosshairs in a folder tree, reported as deltas.
+
+FolderIndex lists the tree once and then polls it on a daemon thread. A folder is re-listed
+only when its modification time changes (a file was created, deleted or renamed in it, which
+also catches files replaced atomically), and the files already known are re-stat'ed every
+`stat_every` polls to catch files rewritten in place (e.g. a rebuilt reticle pack whose
+members changed). Polling keeps this dependency-free and works the same on Windows, Linux
+and network shares, where change notifications are unreliable.
+
+Changes are queued as (added, removed) lists of names and drained by the GUI with changes(),
+so the index thread never touches Tk. Names are paths relative to the root with '/' as the
+separator ('M1REV.png', '2k/M1REV_2k.png', 'tanks.rpak/M1REV').
+"""
+import os
+import queue
+import threading
+
+DEFAULT_INTERVAL = 1.0 # Seconds between polls
+DEFAULT_STAT_EVERY = 5 # Re-stat known files every this many polls
+DEFAULT_MAX_DEPTH = 3 # Subfolder levels below the root that are indexed
+
+
+def join(rel_dir, name):
+    return f"{rel_dir}/{name}" if rel_dir else name
+
+
+class _Folder:
+    __slots__ = ("mtime_ns", "files", "subdirs")
+
+    def __init__(self, mtime_ns, files, subdirs):
+        self.mtime_ns = mtime_ns
+        self.files = files
+        self.subdirs = subdirs
+
+
+class FolderIndex(threading.Thread):
+    """
+    list_entries(folder, filename) -> names (relative to folder) that a file contributes to
+    the list: [] for unrelated files, [filename] for a crosshair, several for a pack. It runs
+    on the index thread. Hidden files and folders (such as .cache) are ignored, and so are
+    subfolders for which skip_folder(name) is true.
+    """
+
+    def __init__(self, root, list_entries, recursive=True, interval=DEFAULT_INTERVAL,
+                 stat_every=DEFAULT_STAT_EVERY, max_depth=DEFAULT_MAX_DEPTH, skip_folder=None):
+        super().__init__(name="folder-index", daemon=True)
+        self.root = os.path.abspath(root)
+        self.list_entries = list_entries
+        self.skip_folder = skip_folder
+        self.max_depth = max_depth if recursive else 0
+        self.interval = interval
+        self.stat_every = max(1, stat_every)
+        self._folders = {} # rel dir -> _Folder
+        self._files = {} # rel file -> (mtime_ns, size, names)
+        self._changes = queue.SimpleQueue()
+        self._stopped = threading.Event()
+        self.scans = 0
+
+    # --- Index thread side ---
+
+    def run(self):
+        while not self._stopped.is_set():
+            added, removed = self.scan()
+            # The first scan is always reported so the GUI knows the initial listing is complete
+            if added or removed or self.scans == 1:
+                self._changes.put((added, removed))
+            self._stopped.wait(self.interval)
+
+    def stop(self):
+        self._stopped.set()
+
+    def scan(self):
+        """One incremental pass. Returns (added, removed) names."""
+        added, removed = [], []
+        check_files = self.scans % self.stat_every == 0
+        self.scans += 1
+        self._scan_folder("", 0, added, removed, check_files)
+        return added, removed
+
+    def names(self):
+        """Sorted names of everything indexed so far (index thread or after a synchronous scan())."""
+        return sorted(name for _, _, names in self._files.values() for name in names)
+
+    def _scan_folder(self, rel_dir, depth, added, removed, check_files):
+        path = os.path.join(self.root, rel_dir)
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            self._forget_folder(rel_dir, removed)
+            return
+        known = self._folders.get(rel_dir)
+        if known is None or known.mtime_ns != mtime_ns:
+            files, subdirs = {}, set()
+            try:
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        if entry.name.startswith("."):
+                            continue
+                        if entry.is_dir():
+                            if depth < self.max_depth and not (self.skip_folder and self.skip_folder(entry.name)):
+                                subdirs.add(entry.name)
+                        else:
+                            files[entry.name] = entry
+            except OSError:
+                pass
+            old_files = known.files if known else set()
+            old_subdirs = known.subdirs if known else set()
+            for name in old_files - files.keys():
+                self._forget_file(join(rel_dir, name), removed)
+            for name in old_subdirs - subdirs:
+                self._forget_folder(join(rel_dir, name), removed)
+            for name, entry in files.items():
+                # Known files are checked too: atomic rewrites (write + rename) also change the
+                # folder. DirEntry.stat() is free on Windows, where scandir already has the data
+                self._index_file(rel_dir, path, name, entry.stat, added, removed)
+            known = self._folders[rel_dir] = _Folder(mtime_ns, set(files), subdirs)
+        elif check_files:
+            for name in known.files:
+                self._index_file(rel_dir, path, name, None, added, removed)
+        for name in sorted(known.subdirs):
+            self._scan_folder(join(rel_dir, name), depth + 1, added, removed, check_files)
+
+    def _index_file(self, rel_dir, path, name, stat, added, removed):
+        """(Re-)indexes one file of the folder at path, if new or changed since it was last seen."""
+        rel_path = join(rel_dir, name)
+        try:
+            st = stat() if stat is not None else os.stat(os.path.join(path, name))
+        except OSError:
+            self._forget_file(rel_path, removed)
+            return
+        previous = self._files.get(rel_path)
+        if previous is not None and previous[:2] == (st.st_mtime_ns, st.st_size):
+            return
+        names = [join(rel_dir, n) for n in self.list_entries(path, name)]
+        old_names = previous[2] if previous else []
+        removed.extend(n for n in old_names if n not in names)
+        added.extend(n for n in names if n not in old_names)
+        self._files[rel_path] = (st.st_mtime_ns, st.st_size, names)
+
+    def _forget_file(self, rel_path, removed):
+        previous = self._files.pop(rel_path, None)
+        if previous is not None:
+            removed.extend(previous[2])
+
+    def _forget_folder(self, rel_dir, removed):
+        folder = self._folders.pop(rel_dir, None)
+        if folder is None:
+            return
+        for name in folder.files:
+            self._forget_file(join(rel_dir, name), removed)
+        for name in folder.subdirs:
+            self._forget_folder(join(rel_dir, name), removed)
+
+    # --- GUI side ---
+
+    def changes(self):
+        """Drains pending deltas. Returns a list of (added, removed), oldest first."""
+        pending = []
+        while True:
+            try:
+                pending.append(self._changes.get_nowait())
+            except queue.Empty:
+                return pending
@@ -0,0 +1,136 @@
+"""Marshals global hotkey events from the keyboard hook thread onto the Tk event loop.
+
+The `keyboard` library invokes callbacks on its own hook thread, where touching Tk widgets is
+unsafe. HotkeyDispatcher.post() only enqueues an event; pump() runs on the Tk loop via
+root.after, drains everything that arrived since the last tick and coalesces it:
+
+  toggle          an even number of presses cancels out, an odd number toggles once
+  next / prev     summed into one net step through the scope list
+  select          only the last direct selection in the burst is applied
+  layer           (name, amount) events are summed per name, e.g. four nudges become one, and
+                  passed on with the number of presses they came from
+
+so a burst of key presses costs at most one window update, and the delay between a key press
+and its handler is bounded by the poll interval.
+"""
+import queue
+import time
+from collections import deque
+
+TOGGLE = "toggle"
+STEP = "step"
+SELECT = "select"
+LAYER = "layer"
+
+# How often (ms) the Tk loop checks for hotkey events; bounds hotkey-to-handler latency
+DEFAULT_POLL_MS = 10
+# Repeats of the same binding within this window are dropped (keyboard auto-repeat, bouncy keys).
+# Layer bindings are exempt: holding a nudge or range key is meant to repeat, and coalescing
+# already makes a burst of them cost one redraw.
+DEFAULT_DEBOUNCE_MS = 120
+
+
+class HotkeyDispatcher:
+    """
+    handlers: {TOGGLE: fn(), STEP: fn(offset), SELECT: fn(target), LAYER: fn(name, amount, presses)}.
+    Latencies from the first event of a burst to the end of its handlers are kept in
+    `latencies` (seconds).
+    """
+
+    def __init__(self, root, handlers, poll_ms=DEFAULT_POLL_MS, debounce_ms=DEFAULT_DEBOUNCE_MS):
+        self.root = root
+        self.handlers = handlers
+        self.poll_ms = poll_ms
+        self.debounce = debounce_ms / 1000.0
+        self.latencies = deque(maxlen=200)
+        self._queue = queue.SimpleQueue()
+        self._last_post = {} # binding -> perf_counter() of its last accepted event
+        self._after_id = None
+        # perf_counter() of the first event of the burst being handled, None outside pump();
+        # lets handlers measure latency from the key press rather than from the Tk tick
+        self.burst_start = None
+
+    # --- Hook thread side ---
+
+    def post(self, action, value=None, binding=None):
+        """Thread-safe; called from the keyboard hook. Never touches Tk."""
+        now = time.perf_counter()
+        if action != LAYER:
+            binding = binding or (action, value)
+            last = self._last_post.get(binding)
+            if last is not None and now - last < self.debounce:
+                return
+            self._last_post[binding] = now
+        self._queue.put((action, value, now))
+
+    def callback(self, action, value=None, binding=None):
+        """A zero-argument function suitable for keyboard.add_hotkey."""
+        return lambda: self.post(action, value, binding)
+
+    # --- Tk loop side ---
+
+    def start(self):
+        if self._after_id is None:
+            self._after_id = self.root.after(self.poll_ms, self.pump)
+
+    def stop(self):
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+
+    def drain(self):
+        """
+        Returns (toggle_count, net_step, last_select, layer_amounts, first_timestamp) for pending
+        events; layer_amounts maps each layer action name to (summed amount, number of presses), in
+        arrival order.
+        """
+        toggles, step, select, layers, first = 0, 0, None, {}, None
+        while True:
+            try:
+                action, value, stamp = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            first = stamp if first is None else first
+            if action == TOGGLE:
+                toggles += 1
+            elif action == STEP:
+                step += value
+            elif action == SELECT:
+                select = value
+            elif action == LAYER:
+                name, amount = value
+                previous, presses = layers.get(name, (None, 0))
+                if isinstance(amount, tuple):
+                    amount = tuple(a + b for a, b in zip(previous, amount)) if previous else amount
+                else:
+                    amount = (previous or 0) + amount
+                layers[name] = (amount, presses + 1)
+        return toggles, step, select, layers, first
+
+    def pump(self):
+        try:
+            toggles, step, select, layers, first = self.drain()
+            if first is not None:
+                self.burst_start = first
+                # Pick the scope first so a toggle in the same burst shows the new one
+                if select is not None and SELECT in self.handlers:
+                    self.handlers[SELECT](select)
+                if step and STEP in self.handlers:
+                    self.handlers[STEP](step)
+                if layers and LAYER in self.handlers:
+                    for name, (amount, presses) in layers.items():
+                        self.handlers[LAYER](name, amount, presses)
+                if toggles % 2 and TOGGLE in self.handlers:
+                    self.handlers[TOGGLE]()
+                self.latencies.append(time.perf_counter() - first)
+        except Exception as e:
+            print(f"Hotkey handler error: {e}")
+        finally:
+            self.burst_start = None
+            self._after_id = self.root.after(self.poll_ms, self.pump)
+
+    def latency_summary(self):
+        """(count, last_ms, max_ms) of recorded hotkey-to-handler latencies."""
+        if not self.latencies:
+            return 0, 0.0, 0.0
+        return len(self.latencies), self.latencies[-1] * 1000, max(self.latencies) * 1000
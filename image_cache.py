@@ -0,0 +1,175 @@
+"""Bounded LRU cache of decoded crosshair images for the overlay, plus a background preloader.
+
+File entries are keyed by (absolute path, mtime_ns, screen resolution) so an edited PNG or a
+resolution change never serves a stale image; other sources (e.g. reticle packs) supply their
+own keys. Decoding happens on any thread; the Tk
+PhotoImage for an entry must be created on the Tk thread and is attached later.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+DEFAULT_CAPACITY = 6
+
+
+def opaque_bbox(image):
+    """
+    (left, upper, right, lower) of the non-transparent pixels, the whole image if it has no
+    alpha, or a 1x1 box at the origin if it is fully transparent.
+    """
+    if image.mode == "P" and "transparency" in image.info:
+        image = image.convert("RGBA")
+    if image.mode in ("RGBA", "LA", "PA"):
+        return image.getchannel("A").getbbox() or (0, 0, 1, 1)
+    return 0, 0, image.width, image.height
+
+
+class CacheEntry:
+    """
+    A decoded crosshair cropped to its opaque bounding box. `size` is the full image size and
+    `bbox` locates the crop inside it. `image` is dropped once `photo` exists to avoid holding
+    two copies. `key_color` is set for pre-keyed images (see prekey.py) whose transparent
+    area is that colour rather than alpha.
+    """
+    __slots__ = ("image", "photo", "size", "bbox", "key_color")
+
+    def __init__(self, image):
+        self.size = image.size
+        self.bbox = opaque_bbox(image)
+        if self.bbox != (0, 0, image.width, image.height):
+            cropped = image.crop(self.bbox)
+            image.close()
+            image = cropped
+        self.image = image
+        self.photo = None
+        self.key_color = None
+
+    @classmethod
+    def from_crop(cls, image, size, bbox):
+        """An entry for an image that is already cropped to bbox of a size-sized frame."""
+        entry = cls.__new__(cls)
+        entry.image = image
+        entry.photo = None
+        entry.size = tuple(size)
+        entry.bbox = tuple(bbox)
+        entry.key_color = None
+        return entry
+
+
+def cache_key(image_path, screen_size):
+    """Raises FileNotFoundError if image_path does not exist."""
+    abs_path = os.path.abspath(image_path)
+    return abs_path, os.stat(abs_path).st_mtime_ns, tuple(screen_size)
+
+
+def decode_image(image_path):
+    """Opens and fully decodes a PNG; Pillow releases the file handle once a single-frame image is loaded."""
+    from PIL import Image # Deferred so importing the overlay stays fast
+    img = Image.open(image_path)
+    img.load()
+    if img.mode not in ("RGBA", "RGB"):
+        # Palette + tRNS PNGs (see png_optimize.py): ImageTk would drop their transparency
+        converted = img.convert("RGBA")
+        img.close()
+        img = converted
+    return img
+
+
+def file_source(image_path, screen_size):
+    """(key, load) for a PNG: load() decodes it into a CacheEntry. Raises FileNotFoundError."""
+    key = cache_key(image_path, screen_size)
+    return key, lambda: CacheEntry(decode_image(image_path))
+
+
+class ImageCache:
+    """Thread-safe LRU mapping of cache_key() -> CacheEntry with hit/miss counters."""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = max(1, capacity)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Returns the entry and marks it most recently used, counting a hit or miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def put(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    def entries_without_photo(self):
+        with self._lock:
+            return [entry for entry in self._entries.values() if entry.photo is None]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class Preloader(threading.Thread):
+    """
+    Decodes image_paths into the cache on a daemon thread. Stops early when cancel() is
+    called (e.g. the user picked another folder). Images larger than the screen are skipped,
+    as the overlay would reject them anyway.
+
+    source(path, screen_size) -> (key, load) maps a path to its cache key and a function
+    returning its CacheEntry; it defaults to file_source and is where the overlay plugs in
+    variant resolution and reticle packs.
+    """
+
+    def __init__(self, cache, image_paths, screen_size, source=file_source):
+        super().__init__(name="crosshair-preload", daemon=True)
+        self.cache = cache
+        self.image_paths = list(image_paths)[:cache.capacity]
+        self.screen_size = tuple(screen_size)
+        self.source = source
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def run(self):
+        for path in self.image_paths:
+            if self._cancelled.is_set():
+                return
+            try:
+                key, load = self.source(path, self.screen_size)
+                if key in self.cache:
+                    continue
+                entry = load()
+            except Exception as e:
+                print(f"Preload skipped '{os.path.basename(path)}': {e}")
+                continue
+            if entry.size[0] > self.screen_size[0] or entry.size[1] > self.screen_size[1]:
+                continue
+            if not self._cancelled.is_set():
+                self.cache.put(key, entry)
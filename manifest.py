@@ -0,0 +1,72 @@
+"""Build manifest used by view.py to skip up-to-date outputs and prune stale ones.
+
+The manifest is a small JSON file stored in the output base folder:
+
+    {"version": 1,
+     "sources": {"M1REV.png": {"mtime_ns": ..., "size": ..., "sha256": "...",
+                               "outputs": {"2k": {"path": "2k/M1REV_2k.png", "config": "2560x1440:LANCZOS"}}}}}
+
+Source keys and output paths are relative to the folder holding the manifest, so the
+whole tree can be moved or synced without invalidating it.
+"""
+import hashlib
+import json
+import os
+
+MANIFEST_NAME = ".view_manifest.json"
+MANIFEST_VERSION = 1
+
+
+def manifest_path(output_base):
+    return os.path.join(output_base, MANIFEST_NAME)
+
+
+def load_manifest(path):
+    """Returns the manifest dict, or an empty one if missing, unreadable or from another version."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") == MANIFEST_VERSION and isinstance(data.get("sources"), dict):
+            return data
+    except (OSError, ValueError):
+        pass
+    return {"version": MANIFEST_VERSION, "sources": {}}
+
+
+def save_manifest(path, data):
+    """Writes the manifest atomically so an interrupted run never leaves a truncated file."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_fingerprint(path, previous=None):
+    """
+    Returns {"mtime_ns", "size", "sha256"} for path.
+    The file is only re-hashed when its mtime or size differ from the previous entry.
+    """
+    st = os.stat(path)
+    if previous and previous.get("mtime_ns") == st.st_mtime_ns and previous.get("size") == st.st_size:
+        digest = previous["sha256"]
+    else:
+        digest = file_sha256(path)
+    return {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "sha256": digest}
+
+
+def recorded_outputs(data, base):
+    """Absolute, normalised paths of every output recorded in the manifest."""
+    outputs = set()
+    for entry in data["sources"].values():
+        for output in entry.get("outputs", {}).values():
+            outputs.add(os.path.normcase(os.path.abspath(os.path.join(base, output["path"]))))
+    return outputs
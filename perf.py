@@ -0,0 +1,136 @@
+"""Optional per-stage timing of the overlay hot paths, kept in a ring buffer.
+
+Usage:
+
+    span = perf.begin("apply")      # a shared no-op object while recording is disabled
+    ... decode ...
+    span.stage("decode")            # time since begin() / the previous stage
+    ... build PhotoImage ...
+    span.stage("photo")
+    span.end()                      # appends the record to the ring buffer
+
+Spans may be started with an earlier timestamp (e.g. when the hotkey was pressed) and may be
+finished later from an event handler (e.g. when the window manager maps the window).
+Recording is off by default; when off, begin() costs one attribute check.
+"""
+import json
+import time
+from collections import deque
+
+DEFAULT_CAPACITY = 500
+
+enabled = False
+records = deque(maxlen=DEFAULT_CAPACITY)
+
+
+class Span:
+    __slots__ = ("op", "start", "last", "stages", "detail")
+
+    def __init__(self, op, start=None, detail=None):
+        now = time.perf_counter()
+        self.op = op
+        self.start = now if start is None else start
+        self.last = self.start
+        self.stages = []
+        self.detail = detail
+
+    def stage(self, name):
+        now = time.perf_counter()
+        self.stages.append((name, (now - self.last) * 1000))
+        self.last = now
+
+    def end(self):
+        records.append({
+            "op": self.op,
+            "time": time.time(),
+            "detail": self.detail,
+            "stages": dict(self.stages),
+            "total_ms": (self.last - self.start) * 1000,
+        })
+
+    def __bool__(self):
+        return True
+
+
+class _NullSpan:
+    """Returned by begin() while disabled, so call sites need no checks of their own."""
+    __slots__ = ()
+
+    def stage(self, name):
+        pass
+
+    def end(self):
+        pass
+
+    def __bool__(self):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+def begin(op, start=None, detail=None):
+    if not enabled:
+        return NULL_SPAN
+    return Span(op, start, detail)
+
+
+def set_enabled(value):
+    global enabled
+    enabled = bool(value)
+
+
+def set_capacity(capacity):
+    global records
+    records = deque(records, maxlen=max(1, capacity))
+
+
+def clear():
+    records.clear()
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an ascending list; shared with the control client's report."""
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summary():
+    """{op: {stage or 'total': {"count", "p50", "p95", "max"}}} in milliseconds."""
+    samples = {}
+    for record in records:
+        stages = samples.setdefault(record["op"], {})
+        for name, ms in record["stages"].items():
+            stages.setdefault(name, []).append(ms)
+        stages.setdefault("total", []).append(record["total_ms"])
+    result = {}
+    for op, stages in samples.items():
+        result[op] = {}
+        for name, values in stages.items():
+            values.sort()
+            result[op][name] = {
+                "count": len(values),
+                "p50": percentile(values, 0.50),
+                "p95": percentile(values, 0.95),
+                "max": values[-1],
+            }
+    return result
+
+
+def format_summary():
+    """Plain-text table of summary() for the stats panel and console."""
+    lines = [f"{'operation / stage':<28}{'n':>5}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}"]
+    for op, stages in sorted(summary().items()):
+        # Operation total first, then its stages indented below it
+        for name in ["total"] + [n for n in stages if n != "total"]:
+            s = stages[name]
+            label = op if name == "total" else f"  {name}"
+            lines.append(f"{label:<28}{s['count']:>5}{s['p50']:>9.2f}{s['p95']:>9.2f}{s['max']:>9.2f}")
+    if len(lines) == 1:
+        lines.append("(no samples recorded)")
+    return "\n".join(lines)
+
+
+def dump_json(path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"records": list(records), "summary": summary()}, f, indent=1)
@@ -0,0 +1,236 @@
+"""Smaller, faster-to-decode PNGs for reticles.
+
+Reticles use a handful of colours, yet are saved as 32-bit RGBA with default zlib settings.
+optimize_image() re-encodes one:
+
+  1. losslessly as an 8-bit (or 1/2/4-bit) palette image with a tRNS chunk for the alpha
+     values, when it has at most 256 distinct RGBA colours;
+  2. otherwise, if quantize is set, after reducing it to `colors` colours (lossy, no dither);
+  3. otherwise as RGBA, saved once with Pillow's defaults;
+
+palette images at compress level 9 with every zlib strategy in STRATEGIES, keeping the smallest
+result. Resampled RGBA output (LANCZOS edges) has thousands of colours; for it the strategy
+search saved under 1% and tripled view.py's build time, so it isn't tried there.
+Pillow has no per-row PNG filter option (it filters adaptively, or not at all for palette
+images below 8 bits), so the zlib strategy is the encoder knob tuned here.
+
+    python png_optimize.py img/4k            # rewrite in place, lossless only
+    python png_optimize.py img -o out -q     # write to out/, quantize images with > 256 colours
+"""
+import argparse
+import io
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+DEFAULT_COMPRESS_LEVEL = 9
+# zlib strategies passed to Pillow as compress_type: Z_DEFAULT_STRATEGY, Z_FILTERED, Z_RLE
+STRATEGIES = (0, 1, 3)
+DEFAULT_COLORS = 256
+# Output modes offered by view.py and trans.py: plain Pillow defaults, lossless palette
+# reduction, or lossless with quantization as the fallback for images with too many colours
+MODES = ("none", "lossless", "quantize")
+
+
+def palette_order(colours):
+    """
+    Palette for colours (sorted unique RGBA pixels as uint32): (entries, remap, translucent),
+    with entries an (N, 4) RGBA array and remap[i] the palette index of colours[i].
+    """
+    entries = colours.view(np.uint8).reshape(-1, 4)
+    # Non-opaque entries first, so the tRNS chunk can stop at the last of them
+    order = np.argsort(entries[:, 3] == 255, kind="stable")
+    remap = np.empty(len(order), dtype=np.uint8)
+    remap[order] = np.arange(len(order), dtype=np.uint8)
+    return entries[order], remap, int((entries[:, 3] < 255).sum())
+
+
+def palette_image(img):
+    """The image as a palette + tRNS image if it has at most 256 RGBA colours, else None (lossless)."""
+    rgba_img = img if img.mode == "RGBA" else img.convert("RGBA")
+    # getcolors() gives up as soon as it sees a 257th colour, so images that need no palette
+    # (e.g. LANCZOS-resampled edges) are rejected without sorting every pixel
+    counts = rgba_img.getcolors(256)
+    if counts is None:
+        return None
+    colours = np.sort(np.array([colour for _, colour in counts], dtype=np.uint8).view(np.uint32).reshape(-1))
+    packed = np.ascontiguousarray(np.asarray(rgba_img)).view(np.uint32).reshape(-1)
+    indices = np.searchsorted(colours, packed)
+    entries, remap, translucent = palette_order(colours)
+    pal = Image.frombytes("P", img.size, remap[indices].tobytes())
+    pal.putpalette(entries[:, :3].tobytes(), "RGB")
+    if translucent:
+        pal.info["transparency"] = entries[:translucent, 3].tobytes()
+    return pal
+
+
+def quantized_image(img, colors=DEFAULT_COLORS):
+    """Lossy reduction to at most `colors` colours (alpha included), as a palette image."""
+    quantized = img.convert("RGBA").quantize(colors, method=Image.Quantize.FASTOCTREE,
+                                             dither=Image.Dither.NONE)
+    return palette_image(quantized.convert("RGBA"))
+
+
+def encode(img, compress_level=DEFAULT_COMPRESS_LEVEL, strategies=STRATEGIES):
+    """Smallest PNG encoding of img over the given zlib strategies."""
+    best = None
+    for strategy in strategies:
+        buf = io.BytesIO()
+        img.save(buf, format="PNG", compress_level=compress_level, compress_type=strategy)
+        if best is None or buf.tell() < len(best):
+            best = buf.getvalue()
+    return best
+
+
+def encode_default(img):
+    """PNG bytes with Pillow's default settings (what mode "none" writes)."""
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def optimize_image(img, quantize=False, colors=DEFAULT_COLORS, compress_level=DEFAULT_COMPRESS_LEVEL,
+                   strategies=STRATEGIES):
+    """Returns (png bytes, description) of the best encoding allowed by the options."""
+    candidate = palette_image(img)
+    kind = "palette"
+    if candidate is None and quantize:
+        candidate, kind = quantized_image(img, colors), f"quantized {colors}"
+    if candidate is None:
+        return encode_default(img if img.mode == "RGBA" else img.convert("RGBA")), "rgba"
+    kind += f" {len(candidate.getpalette()) // 3}"
+    return encode(candidate, compress_level, strategies), kind
+
+
+def write_png(data, path):
+    """Writes PNG bytes to path atomically."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def save_optimized(img, path, **options):
+    """Writes optimize_image() output to path atomically. Returns the description."""
+    data, kind = optimize_image(img, **options)
+    write_png(data, path)
+    return kind
+
+
+def compare_with_default(img, data, kind, repeat=1):
+    """
+    Size and decode time of the encoding data (described by kind) against Pillow's default
+    encoding of img, as {"kind", "before_bytes", "after_bytes", "before_ms", "after_ms"}.
+    """
+    default = data if kind == "rgba" else encode_default(img if img.mode == "RGBA" else img.convert("RGBA"))
+    after_ms = decode_ms(data, repeat)
+    before_ms = after_ms if default is data else decode_ms(default, repeat)
+    return {"kind": kind, "before_bytes": len(default), "after_bytes": len(data),
+            "before_ms": before_ms, "after_ms": after_ms}
+
+
+def save_png(img, path, mode="lossless", report=False):
+    """
+    Saves img as a PNG using one of MODES. Returns the description of the encoding, or with
+    report=True compare_with_default() of it; just {"kind": "rgba"} when the output is Pillow's
+    default encoding anyway, so nothing is decoded to measure a zero change.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown PNG output mode '{mode}' (expected one of {', '.join(MODES)})")
+    if mode == "none":
+        data, kind = encode_default(img), "rgba"
+    else:
+        data, kind = optimize_image(img, quantize=mode == "quantize")
+    write_png(data, path)
+    if not report:
+        return kind
+    return {"kind": kind} if kind == "rgba" else compare_with_default(img, data, kind)
+
+
+def decode_ms(data, repeat=5):
+    """Best-of-repeat time (ms) to open and fully decode PNG bytes to RGBA, as the overlay does."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with Image.open(io.BytesIO(data)) as img:
+            img.convert("RGBA")
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def optimize_file(job):
+    """(source, output, options) -> report dict; output may equal source."""
+    source, output, options = job
+    report = {"source": source, "output": output}
+    try:
+        with open(source, "rb") as f:
+            original = f.read()
+        with Image.open(io.BytesIO(original)) as img:
+            img.load()
+            data, kind = optimize_image(img, **options)
+        if len(data) >= len(original):
+            data, kind = original, "unchanged" # Never make a file bigger
+        report.update(kind=kind, before_bytes=len(original), after_bytes=len(data),
+                      before_ms=decode_ms(original), after_ms=decode_ms(data))
+        if output != source or data is not original:
+            os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+            write_png(data, output)
+    except Exception as e:
+        report["error"] = str(e)
+    return report
+
+
+def format_report(report):
+    if "error" in report:
+        return f"Failed: {report['source']}: {report['error']}"
+    return (f"{report['source']}: {report['kind']:<14} {report['before_bytes']:>9} -> {report['after_bytes']:>9} bytes "
+            f"({report['after_bytes'] / report['before_bytes'] - 1:+.0%}), decode "
+            f"{report['before_ms']:.2f} -> {report['after_ms']:.2f} ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-encode reticle PNGs as small palette PNGs and report the gains.")
+    parser.add_argument("input", help="PNG file or folder (subfolders such as 2k/ and 4k/ included)")
+    parser.add_argument("-o", "--output", help="Output file or folder (default: rewrite in place when smaller)")
+    parser.add_argument("-q", "--quantize", action="store_true", help="Quantize images with more than --colors colours (lossy)")
+    parser.add_argument("--colors", type=int, default=DEFAULT_COLORS, help="Palette size for --quantize")
+    parser.add_argument("--level", type=int, default=DEFAULT_COMPRESS_LEVEL, help="zlib compression level")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="Worker processes for folders")
+    args = parser.parse_args(argv)
+
+    options = {"quantize": args.quantize, "colors": args.colors, "compress_level": args.level}
+    if os.path.isdir(args.input):
+        jobs = []
+        for folder, subfolders, filenames in os.walk(args.input):
+            subfolders[:] = sorted(d for d in subfolders if not d.startswith("."))
+            for filename in sorted(filenames):
+                if filename.lower().endswith(".png"):
+                    source = os.path.join(folder, filename)
+                    output = os.path.join(args.output, os.path.relpath(source, args.input)) if args.output else source
+                    jobs.append((source, output, options))
+    else:
+        jobs = [(args.input, args.output or args.input, options)]
+
+    if args.workers == 1 or len(jobs) <= 1:
+        reports = [optimize_file(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            reports = list(pool.map(optimize_file, jobs))
+    for report in reports:
+        print(format_report(report))
+    done = [r for r in reports if "error" not in r]
+    if done:
+        before, after = sum(r["before_bytes"] for r in done), sum(r["after_bytes"] for r in done)
+        before_ms, after_ms = sum(r["before_ms"] for r in done), sum(r["after_ms"] for r in done)
+        print(f"Total: {before} -> {after} bytes ({after / before - 1:+.0%}), "
+              f"decode {before_ms:.1f} -> {after_ms:.1f} ms")
+    return 1 if len(done) != len(reports) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
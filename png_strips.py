@@ -0,0 +1,497 @@
+"""Strip-by-strip PNG processing with bounded memory, for very large source images.
+
+trans.py and view.py normally decode a whole image, process it and encode it, which for an 8K
+scan costs several full-size copies at once. Here an image flows through in strips of `rows`
+rows instead:
+
+  StripReader     decodes a PNG strip by strip: IDAT data is inflated incrementally and each
+                  strip is unfiltered by Pillow's own decoder, fed the previous (already
+                  unfiltered) row as an unfiltered first row
+  StripResizer    Pillow's separable resampling, strip by strip: the horizontal pass is done by
+                  Pillow on each strip, the vertical pass with Pillow's fixed-point coefficients
+                  over a sliding window of rows, so the result is bit-identical to
+                  Image.resize()
+  StripSink       encodes strips the way png_optimize.save_png() would (palette + tRNS trying
+                  each zlib strategy when the image has at most 256 colours, else RGBA with
+                  zlib's defaults). Choosing the palette needs every colour first, so processed
+                  strips are spooled to a temporary file (disk, not memory) and encoded in a
+                  second pass.
+
+Output pixels are identical to the whole-image path; the PNG bytes may differ because filters
+are chosen here rather than by Pillow's encoder. Memory use is a few strips plus the resampling
+window. Inputs this reader can't stream (other formats, interlaced or 16-bit PNGs) are decoded
+whole and then cut into strips, and "quantize" output of images with more than 256 colours
+needs the whole image as well.
+"""
+import math
+import os
+import struct
+import tempfile
+import zlib
+
+import numpy as np
+from PIL import Image
+
+import png_optimize
+
+DEFAULT_STRIP_ROWS = 64
+# Images with more pixels than this are streamed automatically (4K UHD)
+AUTO_STRIP_PIXELS = 3840 * 2160
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# (bit depth, colour type) -> (mode, rawmode) of the PNGs the reader streams
+STREAMABLE = {(8, 0): ("L", "L"), (8, 2): ("RGB", "RGB"), (1, 3): ("P", "P;1"), (2, 3): ("P", "P;2"),
+              (4, 3): ("P", "P;4"), (8, 3): ("P", "P"), (8, 4): ("LA", "LA"), (8, 6): ("RGBA", "RGBA")}
+PRECISION_BITS = 32 - 8 - 2 # Pillow's fixed-point precision for 8-bit resampling
+IDAT_SIZE = 1 << 16
+
+
+def use_strips(size, strip_rows=None):
+    """Whether to stream an image of size: strip_rows 0 never, > 0 always, None above AUTO_STRIP_PIXELS."""
+    if strip_rows is None:
+        return size[0] * size[1] > AUTO_STRIP_PIXELS
+    return strip_rows > 0
+
+
+def image_size(path):
+    with Image.open(path) as img:
+        return img.size
+
+
+# --- Reading ---
+
+class StripReader:
+    """Iterates over (top row, HxWx4 uint8 RGBA array) strips of the image at path."""
+
+    def __init__(self, path, rows=DEFAULT_STRIP_ROWS):
+        self.path = path
+        self.rows = rows
+        self.size = None
+        self.streamed = False
+        self._file = open(path, "rb")
+        try:
+            self._read_header()
+        except Exception:
+            self._file.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._file.close()
+
+    def _chunk_header(self):
+        header = self._file.read(8)
+        if len(header) < 8:
+            raise ValueError(f"{self.path}: truncated PNG")
+        return struct.unpack(">I4s", header)
+
+    def _read_header(self):
+        if self._file.read(8) != PNG_SIGNATURE:
+            self.size = image_size(self.path)
+            return
+        length, _ = self._chunk_header()
+        ihdr = self._file.read(length + 4)[:length]
+        width, height, depth, colour_type, _, _, interlace = struct.unpack(">IIBBBBB", ihdr)
+        self.size = (width, height)
+        if interlace or (depth, colour_type) not in STREAMABLE:
+            return
+        self.mode, self.rawmode = STREAMABLE[(depth, colour_type)]
+        self.stride = (width * depth * {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}[colour_type] + 7) // 8
+        self.palette = None
+        self.transparency = None
+        while True:
+            length, kind = self._chunk_header()
+            if kind == b"IDAT":
+                self._first_idat = length
+                break
+            if kind == b"IEND":
+                raise ValueError(f"{self.path}: no image data")
+            data = self._file.read(length + 4)[:length] # CRCs aren't checked, as in Pillow's decoder
+            if kind == b"PLTE":
+                self.palette = data
+            elif kind == b"tRNS":
+                # Same interpretation as Pillow's PNG plugin, so the RGBA conversion matches
+                if self.mode == "P":
+                    simple = data.replace(b"\xff", b"") == b"\x00"
+                    self.transparency = data.index(b"\x00") if simple else data
+                elif self.mode == "L":
+                    self.transparency = struct.unpack(">H", data[:2])[0]
+                elif self.mode == "RGB":
+                    self.transparency = struct.unpack(">HHH", data[:6])
+        self.streamed = True
+
+    def _idat(self):
+        """The concatenated IDAT payloads, in pieces of at most IDAT_SIZE bytes."""
+        length, kind = self._first_idat, b"IDAT"
+        while kind != b"IEND":
+            if kind == b"IDAT":
+                while length:
+                    data = self._file.read(min(length, IDAT_SIZE))
+                    if not data:
+                        return
+                    length -= len(data)
+                    yield data
+                self._file.read(4)
+            else:
+                self._file.seek(length + 4, os.SEEK_CUR)
+            length, kind = self._chunk_header()
+
+    def __iter__(self):
+        if not self.streamed:
+            yield from self._whole_image_strips()
+            return
+        width, height = self.size
+        inflate = zlib.decompressobj()
+        compressed = self._idat()
+        pending = b""
+        previous = None # Unfiltered bytes of the row above the strip
+        for top in range(0, height, self.rows):
+            count = min(self.rows, height - top)
+            needed = count * (self.stride + 1)
+            filtered = bytearray()
+            while len(filtered) < needed:
+                if not pending:
+                    pending = next(compressed, b"")
+                    if not pending and not inflate.unconsumed_tail:
+                        raise ValueError(f"{self.path}: image data is truncated")
+                data = inflate.unconsumed_tail + pending if pending else inflate.unconsumed_tail
+                filtered += inflate.decompress(data, needed - len(filtered))
+                pending = b""
+            if previous is not None:
+                filtered[:0] = b"\x00" + previous
+            lines = count + (previous is not None)
+            strip = Image.frombytes(self.mode, (width, lines), zlib.compress(bytes(filtered), 0), "zip",
+                                    self.rawmode)
+            if previous is not None:
+                strip = strip.crop((0, 1, width, lines))
+            previous = strip.crop((0, count - 1, width, count)).tobytes("raw", self.rawmode)
+            yield top, self._to_rgba(strip)
+
+    def _to_rgba(self, strip):
+        if self.palette is not None and self.mode == "P":
+            strip.putpalette(self.palette, "RGB")
+        if self.transparency is not None:
+            strip.info["transparency"] = self.transparency
+        return np.asarray(strip.convert("RGBA"))
+
+    def _whole_image_strips(self):
+        with Image.open(self.path) as img:
+            rgba = np.asarray(img.convert("RGBA"))
+        for top in range(0, rgba.shape[0], self.rows):
+            yield top, rgba[top:top + self.rows]
+
+
+# --- Resampling ---
+
+def _sinc(x):
+    if x == 0.0:
+        return 1.0
+    x = x * math.pi
+    return math.sin(x) / x
+
+
+def _bicubic(x, a=-0.5):
+    x = abs(x)
+    if x < 1.0:
+        return ((a + 2.0) * x - (a + 3.0)) * x * x + 1
+    if x < 2.0:
+        return (((x - 5) * x + 8) * x - 4) * a
+    return 0.0
+
+
+def _hamming(x):
+    x = abs(x)
+    if x == 0.0:
+        return 1.0
+    if x >= 1.0:
+        return 0.0
+    x = x * math.pi
+    return math.sin(x) / x * (0.54 + 0.46 * math.cos(x))
+
+
+# Pillow's resampling filters (Resample.c): resample -> (filter, support)
+FILTERS = {
+    Image.Resampling.BOX: (lambda x: 1.0 if -0.5 < x <= 0.5 else 0.0, 0.5),
+    Image.Resampling.BILINEAR: (lambda x: max(0.0, 1.0 - abs(x)), 1.0),
+    Image.Resampling.HAMMING: (_hamming, 1.0),
+    Image.Resampling.BICUBIC: (_bicubic, 2.0),
+    Image.Resampling.LANCZOS: (lambda x: _sinc(x) * _sinc(x / 3) if -3.0 <= x < 3.0 else 0.0, 3.0),
+}
+
+
+def resample_coefficients(in_size, out_size, resample):
+    """
+    Pillow's fixed-point coefficients for resampling in_size rows to out_size: (first input row,
+    number of input rows, (out_size, ksize) int64 coefficients), per output row.
+    """
+    kernel, kernel_support = FILTERS[resample]
+    scale = in_size / out_size
+    filterscale = max(scale, 1.0)
+    support = kernel_support * filterscale
+    ss = 1.0 / filterscale
+    ksize = int(math.ceil(support)) * 2 + 1
+    first = np.zeros(out_size, dtype=np.int64)
+    count = np.zeros(out_size, dtype=np.int64)
+    coefficients = np.zeros((out_size, ksize), dtype=np.int64)
+    for xx in range(out_size):
+        # Same double arithmetic, in the same order, as precompute_coeffs()
+        center = (xx + 0.5) * scale
+        xmin = max(int(center - support + 0.5), 0)
+        xmax = min(int(center + support + 0.5), in_size) - xmin
+        weights = [kernel((x + xmin - center + 0.5) * ss) for x in range(xmax)]
+        total = 0.0
+        for w in weights:
+            total += w
+        if total != 0.0:
+            weights = [w / total for w in weights]
+        first[xx], count[xx] = xmin, xmax
+        coefficients[xx, :xmax] = [int(-0.5 + w * (1 << PRECISION_BITS)) if w < 0
+                                   else int(0.5 + w * (1 << PRECISION_BITS)) for w in weights]
+    return first, count, coefficients
+
+
+def resizable(source_size, target_size, resample):
+    """Whether StripResizer reproduces Image.resize() for these sizes and filter."""
+    # Pillow resamples very tall images vertically first, which this doesn't emulate
+    tall = source_size[1] > source_size[0] * 100 and target_size[1] < source_size[1]
+    return resample in FILTERS and not tall
+
+
+class StripResizer:
+    """
+    Image.resize(target_size, resample) of an RGBA image fed in strips, top to bottom.
+    feed() and flush() return the output strips that became complete (RGBA arrays).
+    """
+
+    def __init__(self, source_size, target_size, resample=Image.Resampling.LANCZOS):
+        if not resizable(source_size, target_size, resample):
+            raise ValueError(f"Resampling {source_size} to {target_size} with {Image.Resampling(resample).name} "
+                             "can't be done in strips")
+        self.source_size = source_size
+        self.target_size = target_size
+        self.resample = resample
+        self.vertical = target_size[1] != source_size[1]
+        if self.vertical:
+            self.first, count, self.coefficients = resample_coefficients(source_size[1], target_size[1], resample)
+            self.last = self.first + count # Output row i reads input rows first[i] .. last[i] - 1
+        self._window = None # Horizontally resampled, premultiplied rows [window_top, ...)
+        self._window_top = 0
+        self._next = 0 # Next output row
+
+    def _horizontal(self, strip):
+        img = Image.fromarray(np.ascontiguousarray(strip), "RGBA").convert("RGBa")
+        if img.width != self.target_size[0]:
+            img = img.resize((self.target_size[0], img.height), self.resample)
+        return np.asarray(img)
+
+    def _unpremultiply(self, rows):
+        return np.asarray(Image.fromarray(rows, "RGBa").convert("RGBA"))
+
+    def feed(self, strip):
+        if self.source_size == self.target_size:
+            return [strip]
+        rows = self._horizontal(strip)
+        if not self.vertical:
+            return [self._unpremultiply(rows)]
+        self._window = rows if self._window is None else np.concatenate((self._window, rows))
+        return self._emit(complete=False)
+
+    def flush(self):
+        if not self.vertical or self._window is None:
+            return []
+        return self._emit(complete=True)
+
+    def _emit(self, complete):
+        available = self._window_top + len(self._window)
+        end = self._next
+        while end < self.target_size[1] and (complete or self.last[end] <= available):
+            end += 1
+        if end == self._next:
+            return []
+        first = self.first[self._next:end] - self._window_top
+        coefficients = self.coefficients[self._next:end]
+        acc = np.full((end - self._next,) + self._window.shape[1:], 1 << (PRECISION_BITS - 1), dtype=np.int64)
+        for k in range(coefficients.shape[1]):
+            column = coefficients[:, k]
+            if not column.any():
+                continue
+            rows = self._window[np.minimum(first + k, len(self._window) - 1)]
+            acc += rows.astype(np.int64) * column[:, None, None]
+        out = np.clip(acc >> PRECISION_BITS, 0, 255).astype(np.uint8)
+        self._next = end
+        # Drop rows no later output row reads
+        if end < self.target_size[1]:
+            drop = int(self.first[end]) - self._window_top
+            if drop > 0:
+                self._window = self._window[drop:]
+                self._window_top += drop
+        return [self._unpremultiply(out)]
+
+
+# --- Writing ---
+
+def _chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+
+def _filter_rows(rows, above, bpp):
+    """Adaptively filtered scanlines (filter byte + data) of rows (n, stride) uint8, as bytes."""
+    rows = rows.astype(np.int16)
+    up_rows = np.concatenate((above[None, :].astype(np.int16), rows[:-1]))
+    left = np.zeros_like(rows)
+    left[:, bpp:] = rows[:, :-bpp]
+    up_left = np.zeros_like(rows)
+    up_left[:, bpp:] = up_rows[:, :-bpp]
+    p = left + up_rows - up_left
+    pa, pb, pc = np.abs(p - left), np.abs(p - up_rows), np.abs(p - up_left)
+    paeth = np.where((pa <= pb) & (pa <= pc), left, np.where(pb <= pc, up_rows, up_left))
+    candidates = np.stack((rows, rows - left, rows - up_rows, rows - (left + up_rows) // 2, rows - paeth))
+    candidates = (candidates & 0xFF).astype(np.uint8)
+    # Usual heuristic: the smallest sum of absolute values, reading bytes as signed
+    scores = np.minimum(candidates, 256 - candidates.astype(np.int16)).sum(axis=2)
+    best = scores.argmin(axis=0)
+    chosen = candidates[best, np.arange(len(rows))]
+    return np.concatenate((best.astype(np.uint8)[:, None], chosen), axis=1).tobytes()
+
+
+class PngStripWriter:
+    """
+    Writes a PNG from strips, compressing with every zlib strategy in strategies into temporary
+    files and keeping the smallest, like png_optimize.encode(). mode is "RGBA" (strips of RGBA
+    pixels) or "P" (strips of palette indices; palette is (N, 4) RGBA entries, the first
+    `translucent` of which go into tRNS).
+    """
+
+    def __init__(self, path, size, mode="RGBA", palette=None, translucent=0,
+                 compress_level=png_optimize.DEFAULT_COMPRESS_LEVEL, strategies=png_optimize.STRATEGIES):
+        self.path = path
+        self.size = size
+        self.mode = mode
+        self.palette = palette
+        self.translucent = translucent
+        colours = len(palette) if palette is not None else 0
+        # Same bit depths as Pillow's PNG writer for palette images
+        self.bits = 8 if mode == "RGBA" else 1 if colours <= 2 else 2 if colours <= 4 else 4 if colours <= 16 else 8
+        self._above = np.zeros(size[0] * 4, dtype=np.uint8)
+        self._streams = []
+        for strategy in strategies:
+            self._streams.append((zlib.compressobj(compress_level, zlib.DEFLATED, 15, 9, strategy),
+                                  tempfile.TemporaryFile()))
+
+    def write(self, strip):
+        if self.mode == "RGBA":
+            rows = np.ascontiguousarray(strip).reshape(len(strip), -1)
+            data = _filter_rows(rows, self._above, 4)
+            self._above = rows[-1]
+        else:
+            per_byte = 8 // self.bits
+            indices = strip
+            if per_byte > 1:
+                pad = -indices.shape[1] % per_byte
+                indices = np.pad(indices, ((0, 0), (0, pad))).reshape(len(strip), -1, per_byte)
+                shifts = (8 - self.bits * (np.arange(per_byte) + 1)).astype(np.uint8)
+                indices = np.bitwise_or.reduce(indices << shifts, axis=2).astype(np.uint8)
+            data = _filter_rows(indices, self._above[:indices.shape[1]], 1)
+            self._above = indices[-1]
+        for compressor, spool in self._streams:
+            spool.write(compressor.compress(data))
+
+    def close(self):
+        """Finishes the smallest stream into path (atomically). Returns its size in bytes."""
+        for compressor, spool in self._streams:
+            spool.write(compressor.flush())
+        best = min(self._streams, key=lambda stream: stream[1].tell())[1]
+        width, height = self.size
+        colour_type = 6 if self.mode == "RGBA" else 3
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(PNG_SIGNATURE)
+            f.write(_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, self.bits, colour_type, 0, 0, 0)))
+            if self.mode == "P":
+                f.write(_chunk(b"PLTE", self.palette[:, :3].tobytes()))
+                if self.translucent:
+                    f.write(_chunk(b"tRNS", self.palette[:self.translucent, 3].tobytes()))
+            best.seek(0)
+            while True:
+                data = best.read(IDAT_SIZE)
+                if not data:
+                    break
+                f.write(_chunk(b"IDAT", data))
+            f.write(_chunk(b"IEND", b""))
+            written = f.tell()
+        for _, spool in self._streams:
+            spool.close()
+        os.replace(tmp_path, self.path)
+        return written
+
+
+class StripSink:
+    """
+    Saves RGBA strips to path as png_optimize.save_png(image, path, optimization) would. For
+    "none" strips are written straight away; otherwise they are spooled to disk while their
+    colours are counted, and encoded by close().
+    """
+
+    def __init__(self, path, size, optimization="lossless", rows=DEFAULT_STRIP_ROWS):
+        if optimization not in png_optimize.MODES:
+            raise ValueError(f"Unknown PNG output mode '{optimization}' (expected one of {', '.join(png_optimize.MODES)})")
+        self.path = path
+        self.size = size
+        self.optimization = optimization
+        self.rows = rows
+        self.kind = None
+        if optimization == "none":
+            # Pillow's defaults: zlib's default level and strategy
+            self._writer = PngStripWriter(path, size, compress_level=-1, strategies=(0,))
+        else:
+            self._spool = tempfile.TemporaryFile()
+            self._colours = np.zeros(0, dtype=np.uint32) # None once there are more than 256
+
+    def write(self, strip):
+        if self.optimization == "none":
+            self._writer.write(strip)
+            return
+        strip = np.ascontiguousarray(strip)
+        self._spool.write(strip.tobytes())
+        if self._colours is not None:
+            self._colours = np.union1d(self._colours, np.unique(strip.view(np.uint32)))
+            if len(self._colours) > 256:
+                self._colours = None
+
+    def _spooled(self):
+        width, height = self.size
+        self._spool.seek(0)
+        for top in range(0, height, self.rows):
+            count = min(self.rows, height - top)
+            data = self._spool.read(count * width * 4)
+            yield np.frombuffer(data, dtype=np.uint8).reshape(count, width, 4)
+
+    def close(self):
+        """Writes the file. Returns a description like png_optimize.optimize_image()'s."""
+        if self.optimization == "none":
+            self._writer.close()
+            return "rgba"
+        try:
+            if self._colours is not None:
+                entries, remap, translucent = png_optimize.palette_order(self._colours)
+                writer = PngStripWriter(self.path, self.size, "P", entries, translucent)
+                for strip in self._spooled():
+                    packed = strip.view(np.uint32)[..., 0]
+                    writer.write(remap[np.searchsorted(self._colours, packed)])
+                writer.close()
+                return f"palette {len(entries)}"
+            if self.optimization == "quantize":
+                # Octree quantization works on the whole image; only this case needs it in memory
+                rgba = np.concatenate(list(self._spooled()))
+                return png_optimize.save_optimized(Image.fromarray(rgba, "RGBA"), self.path, quantize=True)
+            writer = PngStripWriter(self.path, self.size, compress_level=-1, strategies=(0,))
+            for strip in self._spooled():
+                writer.write(strip)
+            writer.close()
+            return "rgba"
+        finally:
+            self._spool.close()
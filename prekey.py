@@ -0,0 +1,199 @@
+"""Offline conversion of RGBA reticles into colour-keyed images for the overlay window.
+
+The overlay window is made see-through with Tk's "-transparentcolor": pixels of exactly that
+colour vanish, everything else is opaque. An RGBA PNG shown as-is is composited against the
+key colour first, so every anti-aliased edge pixel becomes a green-tinted fringe. Pre-keying
+resolves alpha once, offline:
+
+  threshold   pixels with alpha >= threshold keep their colour, the rest become the key
+  matte       as threshold, but kept pixels are composited over a matte colour (e.g. black)
+              so soft edges darken towards the matte instead of showing the key
+
+The result is an RGB PNG cropped to the reticle's bounding box, in which the key colour (the
+preferred one unless the reticle itself uses it) appears nowhere but in the transparent area.
+Key colour, frame size and crop box are stored as PNG text chunks. Results are cached in
+.cache/keyed of the library root (see variants.library_root), named by a digest of the source
+identity and settings, so an edited source or a settings change is re-keyed automatically.
+"""
+import argparse
+import hashlib
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import image_cache
+import variants
+
+CACHE_FOLDER = os.path.join(".cache", "keyed")
+# Tk's 'lime green', the overlay's default TRANSPARENT_COLOR
+DEFAULT_KEY_COLOR = (50, 205, 50)
+# Tried in order when the reticle already uses the preferred key colour
+KEY_CANDIDATES = ((255, 0, 255), (0, 255, 255), (1, 254, 1), (254, 1, 254), (1, 1, 254))
+DEFAULT_THRESHOLD = 128
+MODES = ("threshold", "matte")
+
+
+# --- Keying ---
+
+def _pack_rgb(rgb):
+    """(..., 3) uint8 -> (...) uint32 0xRRGGBB."""
+    import numpy as np
+    rgb = rgb.astype(np.uint32)
+    return (rgb[..., 0] << 16) | (rgb[..., 1] << 8) | rgb[..., 2]
+
+
+def pick_key_color(colours, preferred=DEFAULT_KEY_COLOR):
+    """
+    A colour absent from colours (an (N, 3) uint8 array of the visible pixels): preferred if
+    possible, else the first free KEY_CANDIDATES entry, else the lowest unused 24-bit value.
+    """
+    import numpy as np
+    used = np.unique(_pack_rgb(colours))
+    for candidate in (tuple(preferred),) + KEY_CANDIDATES:
+        value = (candidate[0] << 16) | (candidate[1] << 8) | candidate[2]
+        index = np.searchsorted(used, value)
+        if index == len(used) or used[index] != value:
+            return candidate
+    # At most 2**24 - 1 colours can be in use, so a gap always exists
+    gaps = np.flatnonzero(np.diff(used) > 1)
+    if used[0] > 0:
+        value = 0
+    elif len(gaps):
+        value = int(used[gaps[0]]) + 1
+    else:
+        value = int(used[-1]) + 1
+    return (value >> 16) & 255, (value >> 8) & 255, value & 255
+
+
+def prekey_image(image, mode="threshold", threshold=DEFAULT_THRESHOLD, matte=(0, 0, 0),
+                 preferred=DEFAULT_KEY_COLOR):
+    """
+    Keys a Pillow image. Returns (rgb image cropped to the visible pixels, key colour,
+    bbox of the crop in the full frame).
+    """
+    import numpy as np
+    from PIL import Image
+    if mode not in MODES:
+        raise ValueError(f"Unknown pre-key mode '{mode}' (expected one of {', '.join(MODES)})")
+    rgba = np.asarray(image.convert("RGBA"))
+    visible = rgba[..., 3] >= threshold
+    rows, cols = np.flatnonzero(visible.any(axis=1)), np.flatnonzero(visible.any(axis=0))
+    if len(rows):
+        bbox = (int(cols[0]), int(rows[0]), int(cols[-1]) + 1, int(rows[-1]) + 1)
+    else:
+        bbox = (0, 0, 1, 1)
+    left, top, right, bottom = bbox
+    crop = rgba[top:bottom, left:right]
+    visible = visible[top:bottom, left:right]
+
+    rgb = crop[..., :3].copy()
+    if mode == "matte":
+        alpha = crop[..., 3:4].astype(np.uint16)
+        matte_plane = np.array(matte, dtype=np.uint16)
+        blended = (rgb * alpha + matte_plane * (255 - alpha) + 127) // 255
+        rgb = blended.astype(np.uint8)
+    key = pick_key_color(rgb[visible], preferred)
+    rgb[~visible] = key
+    return Image.fromarray(rgb, "RGB"), key, bbox
+
+
+# --- Cache ---
+
+def settings_id(mode, threshold, matte, preferred):
+    return f"{mode}:{threshold}:{','.join(map(str, matte))}:{','.join(map(str, preferred))}"
+
+
+def prekeyed_path(source_path, settings):
+    """Cache file for source_path; the name includes a digest of the source identity and settings."""
+    source_path = os.path.abspath(source_path)
+    st = os.stat(source_path)
+    identity = f"{source_path}|{st.st_mtime_ns}|{st.st_size}|{settings}"
+    digest = hashlib.sha1(identity.encode("utf-8")).hexdigest()[:12]
+    cache_dir = os.path.join(variants.library_root(os.path.dirname(source_path)), CACHE_FOLDER)
+    base_name = os.path.splitext(os.path.basename(source_path))[0]
+    return os.path.join(cache_dir, f"{base_name}_{digest}.png")
+
+
+def ensure_prekeyed(source_path, mode="threshold", threshold=DEFAULT_THRESHOLD, matte=(0, 0, 0),
+                    preferred=DEFAULT_KEY_COLOR):
+    """Returns the cached pre-keyed file for source_path, creating it if necessary."""
+    from PIL import Image, PngImagePlugin
+    target_path = prekeyed_path(source_path, settings_id(mode, threshold, matte, preferred))
+    if os.path.isfile(target_path):
+        return target_path
+    with Image.open(source_path) as img:
+        keyed, key, bbox = prekey_image(img, mode, threshold, matte, preferred)
+        frame = img.size
+    info = PngImagePlugin.PngInfo()
+    info.add_text("KeyColor", "#%02x%02x%02x" % key)
+    info.add_text("Frame", f"{frame[0]}x{frame[1]}")
+    info.add_text("BBox", ",".join(map(str, bbox)))
+    os.makedirs(os.path.dirname(target_path), exist_ok=True)
+    variants.save_atomic(keyed, target_path, pnginfo=info)
+    return target_path
+
+
+def load_entry(prekeyed_file):
+    """An image_cache.CacheEntry for a pre-keyed file, with key_color set to its '#rrggbb'."""
+    img = image_cache.decode_image(prekeyed_file)
+    frame = tuple(int(v) for v in img.info["Frame"].split("x"))
+    bbox = tuple(int(v) for v in img.info["BBox"].split(","))
+    entry = image_cache.CacheEntry.from_crop(img, frame, bbox)
+    entry.key_color = img.info["KeyColor"]
+    return entry
+
+
+# --- Command line ---
+
+def _prekey_job(job):
+    source, settings = job
+    try:
+        return source, ensure_prekeyed(source, *settings), None
+    except Exception as e:
+        return source, None, str(e)
+
+
+def library_sources(library_dir):
+    """PNGs in library_dir and its (non-hidden) subfolders such as 2k/ and 4k/."""
+    sources = []
+    for folder, subfolders, filenames in os.walk(library_dir):
+        subfolders[:] = sorted(d for d in subfolders if not d.startswith("."))
+        sources.extend(os.path.join(folder, f) for f in sorted(filenames) if f.lower().endswith(".png"))
+    return sources
+
+
+def main(argv=None):
+    from trans import parse_key_color
+    parser = argparse.ArgumentParser(description="Pre-key RGBA reticles to a transparent key colour for the overlay.")
+    parser.add_argument("input", nargs="?", default="./img", help="PNG file or library folder")
+    parser.add_argument("-m", "--mode", choices=MODES, default="threshold", help="How partial alpha is resolved")
+    parser.add_argument("-t", "--threshold", type=int, default=DEFAULT_THRESHOLD, help="Minimum alpha that stays visible")
+    parser.add_argument("--matte", default="0,0,0", help="Matte colour for --mode matte")
+    parser.add_argument("-k", "--key-color", default="50,205,50",
+                        help="Preferred key colour: the overlay's TRANSPARENT_COLOR (default: lime green)")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="Worker processes for folders")
+    args = parser.parse_args(argv)
+
+    settings = (args.mode, args.threshold, parse_key_color(args.matte), parse_key_color(args.key_color))
+    sources = library_sources(args.input) if os.path.isdir(args.input) else [args.input]
+    start = time.perf_counter()
+    jobs = [(source, settings) for source in sources]
+    if args.workers == 1 or len(jobs) <= 1:
+        results = [_prekey_job(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            results = list(pool.map(_prekey_job, jobs))
+    failed = 0
+    for source, output, error in results:
+        if error:
+            failed += 1
+            print(f"Failed: {source}: {error}")
+        else:
+            print(f"{source} -> {output}")
+    print(f"Pre-keyed {len(results) - failed}/{len(results)} images in {time.perf_counter() - start:.2f}s.")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+"""Dynamic layers drawn over the base reticle on the overlay canvas and updated in place.
+
+The base reticle (an image item, or the items of a vector reticle) is drawn once per apply.
+Each layer is a couple of canvas items that are created once and afterwards only moved or
+re-labelled, so adjusting a layer repaints just the few pixels it covers instead of uploading
+a new PhotoImage:
+
+  range   a horizontal bar with a label, stepped through the configured range marks
+          (label, pixels below the aim point) or, without marks, in fixed pixel steps
+  mark    a box highlighting one of the configured mil marks (x, y), cycled by hotkey
+  nudge   a zero offset for the whole reticle; applied by moving the overlay window, so no
+          item changes at all
+
+Positions are given in pixels at REFERENCE_HEIGHT (1080p) relative to the screen centre and
+scaled by screen height, like vector reticles. Canvas coordinates are screen coordinates minus
+the canvas origin (the un-nudged top-left corner of the overlay window).
+"""
+REFERENCE_HEIGHT = 1080
+RANGE_BAR_WIDTH = 60 # Reference pixels
+RANGE_LABEL_SIZE = 12
+MARK_SIZE = 10
+LAYER_TAG = "layer"
+
+
+def union(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])
+
+
+def contains(outer, inner):
+    return (outer[0] <= inner[0] and outer[1] <= inner[1]
+            and outer[2] >= inner[2] and outer[3] >= inner[3])
+
+
+class LayerState:
+    """What the layers show. Hotkeys change it; LayerCanvas draws it."""
+
+    def __init__(self, range_marks=(), mil_marks=(), range_step=1):
+        self.range_marks = [(str(label), offset) for label, offset in range_marks]
+        self.mil_marks = [tuple(mark) for mark in mil_marks]
+        self.range_step = range_step
+        self.range_visible = False
+        self.range_index = 0 # Into range_marks
+        self.range_offset = 0 # Free offset (reference pixels) when there are no marks
+        self.mark_index = None # Highlighted mil mark, None when hidden
+        self.nudge = (0, 0) # Screen pixels
+
+    def step_range(self, steps, presses=1):
+        """
+        Shows the range bar (first press) or moves it by steps marks / pixel steps. steps may be
+        the sum of several coalesced presses; while the bar is hidden the first of them shows it
+        and the rest still move it.
+        """
+        if not self.range_visible:
+            self.range_visible = True
+            steps -= steps // presses # The showing press's share
+            if not steps:
+                return
+        if self.range_marks:
+            self.range_index = max(0, min(len(self.range_marks) - 1, self.range_index + steps))
+        else:
+            self.range_offset += steps * self.range_step
+
+    def range_position(self):
+        """(label, y offset in reference pixels) of the range bar, or None when hidden."""
+        if not self.range_visible:
+            return None
+        if self.range_marks:
+            return self.range_marks[self.range_index]
+        return f"{self.range_offset:+d}", self.range_offset
+
+    def cycle_mark(self, steps):
+        if not self.mil_marks:
+            print("No mil marks configured (MIL_MARKS); nothing to highlight.")
+            return
+        if self.mark_index is None:
+            self.mark_index = 0 if steps > 0 else len(self.mil_marks) - 1
+        else:
+            self.mark_index += steps
+            if not 0 <= self.mark_index < len(self.mil_marks):
+                self.mark_index = None # Cycling past either end hides the highlight
+
+    def mark_position(self):
+        return None if self.mark_index is None else self.mil_marks[self.mark_index]
+
+    def move_nudge(self, dx, dy):
+        self.nudge = (self.nudge[0] + dx, self.nudge[1] + dy)
+
+    def reset(self):
+        """Hides the layers and clears the zero offset; the range bar starts over at the first mark."""
+        self.range_visible = False
+        self.range_index = 0
+        self.range_offset = 0
+        self.mark_index = None
+        self.nudge = (0, 0)
+
+
+class LayerCanvas:
+    """Owns the layer items on the overlay canvas and tracks the canvas origin."""
+
+    def __init__(self, canvas, state, color="red"):
+        self.canvas = canvas
+        self.state = state
+        self.color = color
+        self.origin = (0, 0)
+        self.screen_size = (1, 1)
+        self._items = {} # layer name -> tuple of canvas item ids
+        self._drawn = {} # layer name -> what its items show, in screen coordinates (None when hidden)
+
+    def scale(self, v):
+        return round(v * self.screen_size[1] / REFERENCE_HEIGHT)
+
+    def _centre(self):
+        return self.screen_size[0] // 2, self.screen_size[1] // 2
+
+    # --- Layer geometry (screen coordinates) ---
+
+    def range_rect(self):
+        position = self.state.range_position()
+        if position is None:
+            return None
+        cx, cy = self._centre()
+        y = cy + self.scale(position[1])
+        half = self.scale(RANGE_BAR_WIDTH) // 2
+        thickness = max(1, self.scale(1))
+        label_width = self.scale(RANGE_LABEL_SIZE) * (len(position[0]) + 1)
+        return cx - half, y - self.scale(RANGE_LABEL_SIZE), cx + half + label_width, y + thickness + self.scale(RANGE_LABEL_SIZE)
+
+    def mark_rect(self):
+        position = self.state.mark_position()
+        if position is None:
+            return None
+        cx, cy = self._centre()
+        x, y = cx + self.scale(position[0]), cy + self.scale(position[1])
+        half = max(2, self.scale(MARK_SIZE) // 2)
+        return x - half, y - half, x + half + 1, y + half + 1
+
+    def layers_rect(self):
+        """Screen box the visible layers need, or None."""
+        return union(self.range_rect(), self.mark_rect())
+
+    # --- Drawing ---
+
+    def reset(self, origin, screen_size):
+        """Called after the canvas was cleared for a new base reticle."""
+        self.origin = origin
+        self.screen_size = screen_size
+        self._items.clear()
+        self._drawn.clear()
+
+    def move_origin(self, origin):
+        """Shifts every item (base included) so that screen positions stay put."""
+        dx, dy = self.origin[0] - origin[0], self.origin[1] - origin[1]
+        if dx or dy:
+            self.canvas.move("all", dx, dy)
+        self.origin = origin
+
+    def _local(self, x, y):
+        return x - self.origin[0], y - self.origin[1]
+
+    def draw(self):
+        """
+        Creates, moves or hides the layer items to match the state. Layers whose geometry and
+        label are unchanged since the last call are not touched, so Tk repaints only the
+        region of the layer that changed.
+        """
+        self._draw_range()
+        self._draw_mark()
+
+    def _changed(self, name, drawn):
+        if self._drawn.get(name) == drawn:
+            return False
+        self._drawn[name] = drawn
+        return True
+
+    def _hide(self, name):
+        if self._changed(name, None):
+            for item in self._items.get(name, ()):
+                self.canvas.itemconfigure(item, state="hidden")
+
+    def _draw_range(self):
+        position = self.state.range_position()
+        if position is None:
+            self._hide("range")
+            return
+        label, offset = position
+        cx, cy = self._centre()
+        y = cy + self.scale(offset)
+        half = self.scale(RANGE_BAR_WIDTH) // 2
+        thickness = max(1, self.scale(1))
+        if not self._changed("range", (cx, y, label)):
+            return
+        bar = self._local(cx - half, y) + self._local(cx + half, y + thickness)
+        text = self._local(cx + half + self.scale(4), y)
+        items = self._items.get("range")
+        if items is None:
+            self._items["range"] = (
+                self.canvas.create_rectangle(*bar, fill=self.color, outline="", width=0, tags=LAYER_TAG),
+                self.canvas.create_text(*text, text=label, fill=self.color, anchor="w",
+                                        font=("Arial", -self.scale(RANGE_LABEL_SIZE)), tags=LAYER_TAG))
+            return
+        self.canvas.coords(items[0], *bar)
+        self.canvas.coords(items[1], *text)
+        self.canvas.itemconfigure(items[1], text=label)
+        for item in items:
+            self.canvas.itemconfigure(item, state="normal")
+
+    def _draw_mark(self):
+        rect = self.mark_rect()
+        if rect is None:
+            self._hide("mark")
+            return
+        if not self._changed("mark", rect):
+            return
+        box = self._local(*rect[:2]) + self._local(*rect[2:])
+        items = self._items.get("mark")
+        if items is None:
+            self._items["mark"] = (self.canvas.create_rectangle(*box, outline=self.color,
+                                                                width=max(1, self.scale(1)), tags=LAYER_TAG),)
+            return
+        self.canvas.coords(items[0], *box)
+        self.canvas.itemconfigure(items[0], state="normal")
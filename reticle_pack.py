@@ -0,0 +1,200 @@
+"""Single-file reticle packs (*.rpak) that the overlay memory-maps instead of inflating PNGs.
+
+Layout (little endian):
+
+    header  b"RPAK" | version u16 | reserved u16 | index offset u64 | index length u64
+    planes  raw pixel planes, each starting on a 16-byte boundary
+    index   UTF-8 JSON:
+            {"reticles": {"M1REV": [{"size": [1920, 1080], "bbox": [l, t, r, b],
+                                     "mode": "P" | "RGBA", "offset": o, "length": n,
+                                     "palette": [o, n]}, ...]}}
+
+Every variant is stored pre-keyed (alpha thresholded to 0/255 unless built with --keep-alpha)
+and cropped to its opaque bounding box, as 8-bit palette indices with an RGBA palette when it
+has at most 256 colours, otherwise as raw RGBA. Loading a variant is a Pillow image wrapped
+around a slice of the mapped file: no copy, no zlib.
+
+Overlay paths address pack members as "<folder>/<pack>.rpak/<reticle name>".
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+
+import image_cache
+import variants
+
+PACK_SUFFIX = ".rpak"
+MAGIC = b"RPAK"
+VERSION = 1
+HEADER = struct.Struct("<4sHHQQ")
+ALIGNMENT = 16
+# Matches vector_reticle.ALPHA_THRESHOLD: what the overlay's colour keying treats as opaque
+ALPHA_THRESHOLD = 128
+
+
+def is_pack(path):
+    return path.lower().endswith(PACK_SUFFIX)
+
+
+def split_pack_path(path):
+    """'img/tanks.rpak/M1REV' -> ('img/tanks.rpak', 'M1REV'); (None, None) for other paths."""
+    index = path.lower().rfind(PACK_SUFFIX)
+    end = index + len(PACK_SUFFIX)
+    if index < 0 or end >= len(path) or path[end] not in "/\\":
+        return None, None
+    return path[:end], path[end + 1:]
+
+
+def member_path(pack_path, name):
+    return f"{pack_path}/{name}"
+
+
+# --- Reading ---
+
+class ReticlePack:
+    """A memory-mapped pack. Images returned by image() share memory with the mapping."""
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        self.mtime_ns = os.stat(self.path).st_mtime_ns
+        with open(self.path, "rb") as f:
+            # The mapping stays valid after the file object is closed
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, index_offset, index_length = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"'{path}' is not a version {VERSION} reticle pack")
+        index = json.loads(self._map[index_offset:index_offset + index_length].decode("utf-8"))
+        self.reticles = index["reticles"]
+
+    def names(self):
+        return sorted(self.reticles)
+
+    def variant_sizes(self, name):
+        return {tuple(v["size"]): v for v in self.reticles[name]}
+
+    def image(self, variant):
+        """The cropped Pillow image of an index entry, wrapped around the mapped bytes."""
+        from PIL import Image # Deferred so importing the overlay stays fast
+        left, top, right, bottom = variant["bbox"]
+        size = (right - left, bottom - top)
+        data = memoryview(self._map)[variant["offset"]:variant["offset"] + variant["length"]]
+        img = Image.frombuffer(variant["mode"], size, data, "raw", variant["mode"], 0, 1)
+        if variant["mode"] == "P":
+            offset, length = variant["palette"]
+            img.putpalette(self._map[offset:offset + length], "RGBA")
+        return img
+
+    def entry(self, name, screen_size):
+        """
+        An image_cache.CacheEntry of reticle name for screen_size: the exact variant, or the
+        nearest larger one (see variants.pick_variant) scaled by screen height.
+        """
+        sizes = self.variant_sizes(name)
+        size, variant = variants.pick_variant(sizes, tuple(screen_size))
+        img = self.image(variant)
+        bbox = tuple(variant["bbox"])
+        if size != tuple(screen_size):
+            img, size, bbox = scale_crop(img, size, bbox, screen_size[1] / size[1])
+            if size[0] > screen_size[0]:
+                img, size, bbox = clip_width(img, size, bbox, screen_size[0])
+        return image_cache.CacheEntry.from_crop(img, size, bbox)
+
+
+def scale_crop(img, size, bbox, scale):
+    """Scales a cropped variant and its placement by scale (the crop only, not the full frame)."""
+    from PIL import Image
+    left, top = int(bbox[0] * scale), int(bbox[1] * scale)
+    right = max(left + 1, -int(-bbox[2] * scale)) # Round outwards so nothing is clipped
+    bottom = max(top + 1, -int(-bbox[3] * scale))
+    resized = img.convert("RGBA").resize((right - left, bottom - top),
+                                         Image.Resampling[variants.RESAMPLING_FILTER])
+    return resized, (round(size[0] * scale), round(size[1] * scale)), (left, top, right, bottom)
+
+
+def clip_width(img, size, bbox, width):
+    """Centre-crops the frame to width, as variants.resample_for_screen does for whole images."""
+    cut = (size[0] - width) // 2
+    left, right = max(bbox[0] - cut, 0), min(bbox[2] - cut, width)
+    if right <= left: # Nothing of the reticle is left on screen
+        return img.crop((0, 0, 1, 1)), (width, size[1]), (0, bbox[1], 1, bbox[1] + 1)
+    img = img.crop((left + cut - bbox[0], 0, right + cut - bbox[0], img.height))
+    return img, (width, size[1]), (left, bbox[1], right, bbox[3])
+
+
+# --- Building ---
+
+def _prepare(img, keep_alpha):
+    """Keys, crops and encodes one variant. Returns (mode, plane bytes, palette bytes or None, bbox)."""
+    import numpy as np
+    from PIL import Image
+    rgba = np.array(img.convert("RGBA"))
+    if not keep_alpha:
+        opaque = rgba[..., 3] >= ALPHA_THRESHOLD
+        rgba[..., 3] = np.where(opaque, 255, 0)
+    rgba[rgba[..., 3] == 0] = 0 # One transparent colour, so it takes a single palette slot
+    keyed = Image.fromarray(rgba, "RGBA")
+    bbox = image_cache.opaque_bbox(keyed)
+    crop = np.ascontiguousarray(rgba[bbox[1]:bbox[3], bbox[0]:bbox[2]])
+
+    flat = crop.reshape(-1, 4).view(np.uint32).ravel()
+    colours, indices = np.unique(flat, return_inverse=True)
+    if len(colours) <= 256:
+        palette = colours.astype(np.uint32).view(np.uint8).tobytes()
+        return "P", indices.astype(np.uint8).tobytes(), palette, bbox
+    return "RGBA", crop.tobytes(), None, bbox
+
+
+def build_pack(library_dir, output_path, keep_alpha=False):
+    """Packs every reticle variant found by variants.VariantIndex under library_dir."""
+    from PIL import Image
+    index = variants.VariantIndex(library_dir).refresh()
+    reticles = {}
+    tmp_path = output_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, 0, 0))
+
+        def write_aligned(data):
+            f.write(b"\0" * (-f.tell() % ALIGNMENT))
+            offset = f.tell()
+            f.write(data)
+            return offset
+
+        for name in sorted(index.variants):
+            for size, path in sorted(index.variants[name].items()):
+                with Image.open(path) as img:
+                    mode, plane, palette, bbox = _prepare(img, keep_alpha)
+                variant = {"size": list(size), "bbox": list(bbox), "mode": mode,
+                           "offset": write_aligned(plane), "length": len(plane)}
+                if palette is not None:
+                    variant["palette"] = [write_aligned(palette), len(palette)]
+                reticles.setdefault(name, []).append(variant)
+                print(f"  {name} {size[0]}x{size[1]}: {mode}, crop {bbox[2] - bbox[0]}x{bbox[3] - bbox[1]} <- {path}")
+
+        index_bytes = json.dumps({"reticles": reticles}, separators=(",", ":")).encode("utf-8")
+        index_offset = write_aligned(index_bytes)
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, 0, index_offset, len(index_bytes)))
+    os.replace(tmp_path, output_path)
+    return reticles
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build a memory-mappable reticle pack from an img/ tree.")
+    parser.add_argument("library", nargs="?", default="./img", help="Library folder (with optional 1k/2k/4k subfolders)")
+    parser.add_argument("-o", "--output", help="Pack file to write (default: <library>/<library name>.rpak)")
+    parser.add_argument("--keep-alpha", action="store_true", help="Keep soft alpha instead of thresholding it")
+    args = parser.parse_args(argv)
+
+    output = args.output or os.path.join(args.library, os.path.basename(os.path.abspath(args.library)) + PACK_SUFFIX)
+    print(f"Building '{output}' from '{args.library}'...")
+    reticles = build_pack(args.library, output, args.keep_alpha)
+    count = sum(len(v) for v in reticles.values())
+    print(f"Packed {len(reticles)} reticles ({count} variants), {os.path.getsize(output)} bytes.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
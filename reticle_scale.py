@@ -0,0 +1,209 @@
+"""Pixel-accurate scaling for reticle images: thin lines stay crisp, alpha stays hard.
+
+Filters like LANCZOS spread a 1px mil line over 2-3 semi-transparent pixels at 1.333x (2k)
+and ring around it; those soft edges are also what colour-key transparency handles worst.
+scale_image() instead:
+
+  1. hardens the alpha (ALPHA_THRESHOLD) so every pixel is either opaque or fully transparent
+  2. scales rows, then columns, by nearest neighbour, except that every thin opaque run (at
+     most THIN_RUN source pixels: lines, ticks, dots) is redrawn with a whole-pixel width,
+     max(1, round(width * scale)), centred on its scaled position; so all 1px lines come out
+     equally wide instead of alternating between 1 and 2px, and none is dropped when scaling down
+
+No new colours are introduced, so palette PNGs stay small. Runs are found per row/column with
+numpy, which makes it several times faster than LANCZOS on full-screen images.
+
+line_width_error() measures how far line widths in a scaled image are from the source widths
+times the scale. Command line, comparing with LANCZOS:
+
+    python reticle_scale.py img/M1REV.png -s 1440,2160
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+RETICLE = "reticle" # Name of this scaling mode next to the Pillow filters (view.py --resample)
+ALPHA_THRESHOLD = 128
+THIN_RUN = 3 # Source pixels
+
+
+# --- Scaling ---
+
+def harden_alpha(rgba, threshold=ALPHA_THRESHOLD):
+    """
+    An HxWx4 uint8 RGBA array as HxW uint32 pixels with alpha >= threshold made opaque and the
+    rest cleared to 0 (transparent black).
+    """
+    rgba = np.ascontiguousarray(rgba, dtype=np.uint8)
+    opaque_alpha = np.array([(0, 0, 0, 255)], dtype=np.uint8).view(np.uint32)[0]
+    pixels = rgba.view(np.uint32)[..., 0] | opaque_alpha
+    pixels[rgba[..., 3] < threshold] = 0
+    return pixels
+
+
+def _runs(pixels):
+    """Runs of equal values along axis 1 of a 2-D array: (row, start, length), in row-major order."""
+    starts = np.ones(pixels.shape, dtype=bool)
+    np.not_equal(pixels[:, 1:], pixels[:, :-1], out=starts[:, 1:])
+    rows, start = np.nonzero(starts)
+    end = np.empty_like(start)
+    end[:-1] = start[1:]
+    end[-1] = pixels.shape[1]
+    end[:-1][rows[1:] != rows[:-1]] = pixels.shape[1] # Last run of each row
+    return rows, start, end - start
+
+
+def _scale_rows(pixels, width):
+    """One pass: scales axis 1 of a 2-D uint32 array (transparent pixels are 0) to width."""
+    scale = width / pixels.shape[1]
+    rows, start, length = _runs(pixels)
+    thin = (length <= THIN_RUN) & (pixels[rows, start] != 0)
+    rows, start, length = rows[thin], start[thin], length[thin]
+    colours = pixels[rows, start]
+    # Nearest neighbour of the image without the thin runs (filled with the pixel to their left,
+    # or right at the left edge), which are then drawn at their snapped positions
+    background = pixels.copy()
+    fill = pixels[rows, np.where(start > 0, start - 1, np.minimum(start + length, pixels.shape[1] - 1))]
+    for k in range(THIN_RUN):
+        inside = length > k
+        background[rows[inside], start[inside] + k] = fill[inside]
+    nearest = np.minimum(((np.arange(width) + 0.5) / scale).astype(np.intp), pixels.shape[1] - 1)
+    out = background[:, nearest]
+    widths = np.maximum(1, np.floor(length * scale + 0.5).astype(np.intp))
+    left = np.floor((start + length / 2) * scale - widths / 2 + 0.5).astype(np.intp)
+    left = np.clip(left, 0, width - widths)
+    for k in range(int(widths.max(initial=0))):
+        drawn = widths > k
+        out[rows[drawn], left[drawn] + k] = colours[drawn]
+    return out
+
+
+def scale_array(rgba, size):
+    """Scales an HxWx4 uint8 RGBA array to size (width, height); returns a new array."""
+    pixels = harden_alpha(rgba)
+    width, height = size
+    if width != pixels.shape[1]:
+        pixels = _scale_rows(pixels, width)
+    if height != pixels.shape[0]:
+        pixels = _scale_rows(pixels.T, height).T
+    return np.ascontiguousarray(pixels).view(np.uint8).reshape(height, width, 4)
+
+
+def scale_image(img, size):
+    """Image.resize() counterpart: an RGBA image scaled to size."""
+    from PIL import Image
+    return Image.fromarray(scale_array(np.asarray(img.convert("RGBA")), size), "RGBA")
+
+
+# --- Verification ---
+
+def _extents(mask):
+    """For every pixel, the first and last index of the run of equal mask values along axis 1 containing it."""
+    n = mask.shape[1]
+    index = np.arange(n)
+    change = np.ones(mask.shape, dtype=bool)
+    change[:, 1:] = mask[:, 1:] != mask[:, :-1]
+    first = np.maximum.accumulate(np.where(change, index, 0), axis=1)
+    change[:, :-1] = mask[:, :-1] != mask[:, 1:]
+    change[:, -1] = True
+    last = np.minimum.accumulate(np.where(change, index, n)[:, ::-1], axis=1)[:, ::-1]
+    return first, last
+
+
+def _line_widths(source, scaled):
+    """(ideal, measured) widths along axis 1 of the thin lines in boolean opacity masks."""
+    scale_x = scaled.shape[1] / source.shape[1]
+    scale_y = scaled.shape[0] / source.shape[0]
+    rows, start, length = _runs(source)
+    # Thin opaque runs that continue in the rows above and below: lines, not dots or glyph edges
+    keep = source[rows, start] & (length <= THIN_RUN) & (rows > 0) & (rows < source.shape[0] - 1)
+    rows, start, length = rows[keep], start[keep], length[keep]
+    for k in range(THIN_RUN):
+        inside = np.minimum(start + k, start + length - 1)
+        keep = source[rows - 1, inside] & source[rows + 1, inside]
+        rows, start, length = rows[keep], start[keep], length[keep]
+    out_rows = np.minimum(((rows + 0.5) * scale_y).astype(np.intp), scaled.shape[0] - 1)
+    centre = np.minimum(((start + length / 2) * scale_x).astype(np.intp), scaled.shape[1] - 1)
+    first, last = _extents(scaled)
+    hit = scaled[out_rows, centre]
+    measured = np.where(hit, last[out_rows, centre] - first[out_rows, centre] + 1, 0)
+    return length * scale_x, measured
+
+
+def line_width_error(source, scaled, threshold=ALPHA_THRESHOLD):
+    """
+    Compares the widths of the thin lines of source (RGBA array) with scaled (RGBA array of the
+    whole frame scaled by some factor), both thresholded at threshold alpha. Returns a dict:
+    lines measured, mean/max absolute error against source width * scale (px), the share of
+    lines drawn at the best whole-pixel width, and how many lines are missing.
+    """
+    source = np.asarray(source)[..., 3] >= threshold
+    scaled = np.asarray(scaled)[..., 3] >= threshold
+    ideal_x, measured_x = _line_widths(source, scaled)
+    ideal_y, measured_y = _line_widths(source.T, scaled.T)
+    ideal = np.concatenate((ideal_x, ideal_y))
+    measured = np.concatenate((measured_x, measured_y))
+    if not len(ideal):
+        return {"lines": 0, "mean_error": 0.0, "max_error": 0.0, "exact": 1.0, "missing": 0}
+    error = np.abs(measured - ideal)
+    return {
+        "lines": int(len(ideal)),
+        "mean_error": float(error.mean()),
+        "max_error": float(error.max()),
+        "exact": float(np.mean(measured == np.maximum(1, np.floor(ideal + 0.5)))),
+        "missing": int(np.count_nonzero(measured == 0)),
+    }
+
+
+# --- Command line ---
+
+def main(argv=None):
+    from PIL import Image
+    import variants
+
+    parser = argparse.ArgumentParser(description="Scale reticles with crisp lines and compare line widths with LANCZOS.")
+    parser.add_argument("input", help="PNG file or folder of PNG files")
+    parser.add_argument("-s", "--heights", default="1440,2160", help="Target screen heights, comma separated")
+    parser.add_argument("-o", "--output", help="Folder to save the reticle-scaled images into")
+    args = parser.parse_args(argv)
+
+    if os.path.isdir(args.input):
+        paths = [os.path.join(args.input, f) for f in sorted(os.listdir(args.input)) if f.lower().endswith(".png")]
+    else:
+        paths = [args.input]
+    heights = [int(h) for h in args.heights.split(",") if h.strip()]
+    totals = {"LANCZOS": 0.0, RETICLE: 0.0}
+    for path in paths:
+        with Image.open(path) as img:
+            img = img.convert("RGBA")
+        source = np.asarray(img)
+        for height in heights:
+            size = (variants.fov_width(img.size, height), height)
+            start = time.perf_counter()
+            lanczos = img.resize(size, Image.Resampling.LANCZOS)
+            lanczos_s = time.perf_counter() - start
+            start = time.perf_counter()
+            reticle = scale_image(img, size)
+            reticle_s = time.perf_counter() - start
+            totals["LANCZOS"] += lanczos_s
+            totals[RETICLE] += reticle_s
+            print(f"{os.path.basename(path)} -> {size[0]}x{size[1]}")
+            for name, result, seconds in (("LANCZOS", lanczos, lanczos_s), (RETICLE, reticle, reticle_s)):
+                error = line_width_error(source, np.asarray(result))
+                print(f"  {name:8} {seconds * 1000:7.1f} ms  {error['lines']} lines, width error mean "
+                      f"{error['mean_error']:.2f} px, max {error['max_error']:.2f} px, "
+                      f"{error['exact'] * 100:.1f}% at whole-pixel width, {error['missing']} missing")
+            if args.output:
+                os.makedirs(args.output, exist_ok=True)
+                base_name = os.path.splitext(os.path.basename(path))[0]
+                reticle.save(os.path.join(args.output, f"{base_name}_{size[0]}x{size[1]}.png"))
+    if paths and heights:
+        print(f"Total: LANCZOS {totals['LANCZOS']:.3f}s, {RETICLE} {totals[RETICLE]:.3f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+import os
+import sys
+
+import pytest
+
+# The modules live at the top level of the repository, next to this folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def manifest_tree(tmp_path):
+    """
+    make(outputs) -> (source, output_base, key, data): a source PNG path and a view.py manifest
+    recording the given {target name: size} outputs of it, each written to disk.
+    """
+    # Imported here so suites that don't need Pillow still run without it
+    from PIL import Image
+
+    import manifest
+    import view
+
+    def make(outputs):
+        source = tmp_path / "src" / "M1REV.png"
+        source.parent.mkdir()
+        source.write_bytes(b"reticle")
+        output_base = str(tmp_path / "out")
+        key = os.path.relpath(str(source), output_base)
+        entry = manifest.source_fingerprint(str(source))
+        entry["outputs"] = {}
+        for res_name, size in outputs.items():
+            path = view.output_path_for(output_base, "M1REV", res_name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(b"output")
+            entry["outputs"][res_name] = {"path": os.path.relpath(path, output_base),
+                                          "config": view.target_config(size, "none", Image.Resampling.LANCZOS)}
+        data = {"version": manifest.MANIFEST_VERSION, "sources": {key: entry}}
+        return str(source), output_base, key, data
+    return make
+
+
+@pytest.fixture
+def plan():
+    """view.plan_rebuild for one source (or none) with the settings manifest_tree records."""
+    from PIL import Image
+
+    import view
+
+    def plan(source, output_base, data, targets, **kwargs):
+        kwargs.setdefault("optimization", "none")
+        kwargs.setdefault("resample", Image.Resampling.LANCZOS)
+        return view.plan_rebuild([source] if source else [], targets, output_base, data, **kwargs)
+    return plan
@@ -0,0 +1,120 @@
+import os
+import stat
+import sys
+import threading
+
+import pytest
+
+import control
+
+
+class FakeRoot:
+    """Stands in for the Tk root: after() runs the callback on a timer thread."""
+
+    def __init__(self):
+        self.timers = {}
+
+    def after(self, ms, callback):
+        timer = threading.Timer(ms / 1000, callback)
+        timer.daemon = True
+        self.timers[id(timer)] = timer
+        timer.start()
+        return id(timer)
+
+    def after_cancel(self, after_id):
+        self.timers.pop(after_id).cancel()
+
+
+# --- Parsing ---
+
+@pytest.mark.parametrize("line, expected", [
+    ("status", {"cmd": "status", "target": None}),
+    ("  next \n", {"cmd": "next", "target": None}),
+    ("apply tanks.rpak/M1REV", {"cmd": "apply", "target": "tanks.rpak/M1REV"}),
+    ("apply  My Scope.png ", {"cmd": "apply", "target": "My Scope.png"}),
+    ('{"cmd": "apply", "target": "M1REV.png", "id": 7}', {"cmd": "apply", "target": "M1REV.png", "id": 7}),
+    ('{"cmd": "toggle"}', {"cmd": "toggle"}),
+    ('{"cmd": "apply", "target": 0}', {"cmd": "apply", "target": 0}),
+])
+def test_parse_command(line, expected):
+    assert control.parse_command(line) == expected
+
+
+@pytest.mark.parametrize("line", [
+    "reload", "", "apply", "apply   ", "auth secret", '{"cmd": "apply"}', '["toggle"]', '{"cmd": "toggle"', '{}',
+    '{"cmd": "apply", "target": true}', '{"cmd": "apply", "target": false}', '{"cmd": "apply", "target": 1.5}',
+    '{"cmd": "apply", "target": ["M1REV.png"]}',
+])
+def test_parse_command_rejects(line):
+    with pytest.raises(ValueError):
+        control.parse_command(line)
+
+
+@pytest.mark.parametrize("line, token", [
+    ("auth abc123\n", "abc123"),
+    ('{"cmd": "auth", "token": "abc123"}', "abc123"),
+    ('{"cmd": "auth"}', ""),
+    ("auth", ""),
+    ("status", None),
+    ("authx abc", None),
+    ('{"cmd": "status", "token": "abc123"}', None),
+    ('{"cmd": "auth", ', None),
+])
+def test_parse_auth(line, token):
+    assert control.parse_auth(line) == token
+
+
+# --- Token file ---
+
+def test_token_file_round_trip(tmp_path):
+    path = str(tmp_path / "token")
+    token = control.write_token(path)
+    assert len(token) == 32 and control.read_token(path) == token
+    assert control.write_token(path) != token
+    assert os.listdir(str(tmp_path)) == ["token"]
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="POSIX permissions")
+def test_token_file_is_private(tmp_path):
+    path = str(tmp_path / "token")
+    control.write_token(path)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+
+def test_server_needs_token():
+    with pytest.raises(ValueError):
+        control.ControlServer(FakeRoot(), {}, "", port=0)
+
+
+# --- Server ---
+
+@pytest.fixture
+def server():
+    def apply(target):
+        if target == "missing":
+            raise RuntimeError("No crosshair named missing")
+        return {"applied": target}
+
+    handlers = {"apply": apply, "status": lambda target: {"visible": True}}
+    server = control.ControlServer(FakeRoot(), handlers, "secret", port=0, poll_ms=5)
+    server.start()
+    yield server
+    server.stop()
+
+
+def test_round_trip(server):
+    host, port = server.address
+    lines = ["status", '{"cmd": "apply", "target": "M1REV.png", "id": 3}', "apply missing", "bogus"]
+    responses = [response for _, response, _ in control.send(lines, host, port, token="secret", timeout=5)]
+    assert responses[0]["ok"] and responses[0]["result"] == {"visible": True}
+    assert responses[1]["ok"] and responses[1]["id"] == 3 and responses[1]["result"] == {"applied": "M1REV.png"}
+    assert responses[2] == {**responses[2], "ok": False, "error": "No crosshair named missing"}
+    assert not responses[3]["ok"] and "Unknown command" in responses[3]["error"]
+    assert all(r["total_ms"] >= r["handler_ms"] for r in responses[:3])
+
+
+def test_wrong_token_is_rejected(server):
+    host, port = server.address
+    with pytest.raises(PermissionError):
+        list(control.send(["status"], host, port, token="guess", timeout=5))
+
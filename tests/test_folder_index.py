@@ -0,0 +1,131 @@
+import os
+
+import folder_index
+
+
+def list_entries(folder, filename):
+    """PNGs are crosshairs, .pack files list one crosshair per line, everything else is ignored."""
+    if filename.endswith(".png"):
+        return [filename]
+    if filename.endswith(".pack"):
+        with open(os.path.join(folder, filename), "r", encoding="utf-8") as f:
+            return [f"{filename}/{line.strip()}" for line in f if line.strip()]
+    return []
+
+
+def write(path, content="x"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+    bump(os.path.dirname(path))
+
+
+def bump(folder):
+    """Moves a folder's mtime forward, so changes are seen even on filesystems with coarse timestamps."""
+    st = os.stat(folder)
+    os.utime(folder, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+
+
+def make_index(root, **kwargs):
+    kwargs.setdefault("stat_every", 1)
+    return folder_index.FolderIndex(str(root), list_entries, **kwargs)
+
+
+def test_join():
+    assert folder_index.join("", "a.png") == "a.png"
+    assert folder_index.join("2k", "a.png") == "2k/a.png"
+
+
+def test_initial_scan(tmp_path):
+    write(str(tmp_path / "M1REV.png"))
+    write(str(tmp_path / "notes.txt"))
+    write(str(tmp_path / ".hidden.png"))
+    write(str(tmp_path / ".cache" / "a.png"))
+    write(str(tmp_path / "tanks.pack"), "M1REV\nT72\n")
+    write(str(tmp_path / "sub" / "dot.png"))
+    index = make_index(tmp_path)
+    added, removed = index.scan()
+    expected = ["M1REV.png", "sub/dot.png", "tanks.pack/M1REV", "tanks.pack/T72"]
+    assert sorted(added) == expected and removed == []
+    assert index.names() == expected
+    assert index.scan() == ([], [])
+
+
+def test_added_and_removed_deltas(tmp_path):
+    write(str(tmp_path / "a.png"))
+    write(str(tmp_path / "sub" / "b.png"))
+    index = make_index(tmp_path)
+    index.scan()
+    write(str(tmp_path / "sub" / "c.png"))
+    os.remove(str(tmp_path / "a.png"))
+    bump(str(tmp_path))
+    assert index.scan() == (["sub/c.png"], ["a.png"])
+    write(str(tmp_path / "sub" / "deeper" / "d.png"))
+    assert index.scan() == (["sub/deeper/d.png"], [])
+    for name in ("b.png", "c.png", "deeper/d.png"):
+        os.remove(str(tmp_path / "sub" / name))
+    os.rmdir(str(tmp_path / "sub" / "deeper"))
+    os.rmdir(str(tmp_path / "sub"))
+    bump(str(tmp_path))
+    added, removed = index.scan()
+    assert added == [] and sorted(removed) == ["sub/b.png", "sub/c.png", "sub/deeper/d.png"]
+    assert index.names() == []
+
+
+def test_rewrite_in_changed_folder_reports_member_changes(tmp_path):
+    write(str(tmp_path / "tanks.pack"), "M1REV\nT72\n")
+    index = make_index(tmp_path)
+    index.scan()
+    path = str(tmp_path / "tanks.pack")
+    write(path, "M1REV\nLeopard\nT90\n")
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+    added, removed = index.scan()
+    assert sorted(added) == ["tanks.pack/Leopard", "tanks.pack/T90"] and removed == ["tanks.pack/T72"]
+
+
+def test_rewritten_files_wait_for_stat_every(tmp_path):
+    write(str(tmp_path / "tanks.pack"), "M1REV\n")
+    index = make_index(tmp_path, stat_every=3)
+    index.scan()
+    with open(str(tmp_path / "tanks.pack"), "a", encoding="utf-8") as f:
+        f.write("T72\n")
+    assert index.scan() == ([], [])
+    assert index.scan() == ([], [])
+    assert index.scan() == (["tanks.pack/T72"], [])
+
+
+def test_skip_folder(tmp_path):
+    write(str(tmp_path / "a.png"))
+    write(str(tmp_path / "2k" / "a_2k.png"))
+    write(str(tmp_path / "mine" / "b.png"))
+    index = make_index(tmp_path, skip_folder=lambda name: name == "2k")
+    added, _ = index.scan()
+    assert sorted(added) == ["a.png", "mine/b.png"]
+
+
+def test_max_depth_and_not_recursive(tmp_path):
+    write(str(tmp_path / "a.png"))
+    write(str(tmp_path / "1" / "b.png"))
+    write(str(tmp_path / "1" / "2" / "c.png"))
+    assert sorted(make_index(tmp_path, max_depth=1).scan()[0]) == ["1/b.png", "a.png"]
+    assert make_index(tmp_path, recursive=False).scan()[0] == ["a.png"]
+
+
+def test_thread_reports_first_scan_and_deltas(tmp_path):
+    write(str(tmp_path / "a.png"))
+    index = make_index(tmp_path, interval=0.01)
+    index.start()
+    try:
+        changes = []
+        while not changes:
+            changes = index.changes()
+        assert changes[0] == (["a.png"], [])
+        write(str(tmp_path / "b.png"))
+        changes = []
+        while not changes:
+            changes = index.changes()
+        assert changes == [(["b.png"], [])]
+    finally:
+        index.stop()
+        index.join(1)
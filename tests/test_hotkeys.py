@@ -0,0 +1,120 @@
+import hotkeys
+
+
+class FakeRoot:
+    """Records root.after() calls instead of scheduling them."""
+
+    def __init__(self):
+        self.scheduled = []
+        self.cancelled = []
+
+    def after(self, ms, callback):
+        self.scheduled.append((ms, callback))
+        return len(self.scheduled)
+
+    def after_cancel(self, after_id):
+        self.cancelled.append(after_id)
+
+
+def dispatcher(handlers=None, debounce_ms=0):
+    return hotkeys.HotkeyDispatcher(FakeRoot(), handlers or {}, poll_ms=7, debounce_ms=debounce_ms)
+
+
+def test_drain_empty():
+    assert dispatcher().drain() == (0, 0, None, {}, None)
+
+
+def test_drain_coalesces_burst():
+    d = dispatcher()
+    for action, value in [(hotkeys.TOGGLE, None), (hotkeys.STEP, 1), (hotkeys.SELECT, "a.png"),
+                          (hotkeys.STEP, 1), (hotkeys.TOGGLE, None), (hotkeys.STEP, -1),
+                          (hotkeys.SELECT, "b.png"), (hotkeys.TOGGLE, None)]:
+        d.post(action, value, binding=object())
+    toggles, step, select, layers, first = d.drain()
+    assert (toggles, step, select, layers) == (3, 1, "b.png", {})
+    assert first is not None
+    assert d.drain() == (0, 0, None, {}, None)
+
+
+def test_drain_sums_layers_per_name_in_arrival_order():
+    d = dispatcher()
+    for value in [("opacity", -5), ("offset", (1, 0)), ("opacity", -5), ("offset", (0, -2)), ("offset", (1, 1))]:
+        d.post(hotkeys.LAYER, value, binding=object())
+    layers = d.drain()[3]
+    assert layers == {"opacity": (-10, 2), "offset": ((2, -1), 3)}
+    assert list(layers) == ["opacity", "offset"]
+
+
+def test_debounce_drops_repeats_of_one_binding():
+    d = dispatcher(debounce_ms=10_000)
+    for _ in range(5):
+        d.post(hotkeys.STEP, 1)
+    d.post(hotkeys.STEP, -1)
+    d.post(hotkeys.TOGGLE, binding="f9")
+    d.post(hotkeys.TOGGLE, binding="f9")
+    toggles, step = d.drain()[:2]
+    assert (toggles, step) == (1, 0)
+
+
+def test_layer_bindings_are_not_debounced():
+    d = dispatcher(debounce_ms=10_000)
+    for _ in range(4):
+        d.post(hotkeys.LAYER, ("nudge", (1, 0)), binding="ctrl+right")
+    assert d.drain()[3] == {"nudge": ((4, 0), 4)}
+
+
+def test_callback_posts():
+    d = dispatcher()
+    d.callback(hotkeys.SELECT, "M1REV.png")()
+    assert d.drain()[2] == "M1REV.png"
+
+
+def test_pump_runs_handlers_once_in_order():
+    calls = []
+    handlers = {
+        hotkeys.TOGGLE: lambda: calls.append(("toggle",)),
+        hotkeys.STEP: lambda offset: calls.append(("step", offset)),
+        hotkeys.SELECT: lambda target: calls.append(("select", target)),
+        hotkeys.LAYER: lambda name, amount, presses: calls.append(("layer", name, amount, presses)),
+    }
+    d = dispatcher(handlers)
+    d.post(hotkeys.TOGGLE, binding=1)
+    d.post(hotkeys.LAYER, ("opacity", 5), binding=2)
+    d.post(hotkeys.STEP, 2, binding=3)
+    d.post(hotkeys.SELECT, "a.png", binding=4)
+    d.post(hotkeys.LAYER, ("opacity", 5), binding=5)
+    d.pump()
+    assert calls == [("select", "a.png"), ("step", 2), ("layer", "opacity", 10, 2), ("toggle",)]
+    assert d.latency_summary()[0] == 1 and d.burst_start is None
+    assert d.root.scheduled == [(7, d.pump)]
+
+
+def test_pump_skips_cancelled_toggles_and_missing_handlers():
+    calls = []
+    d = dispatcher({hotkeys.TOGGLE: lambda: calls.append("toggle")})
+    d.post(hotkeys.TOGGLE, binding=1)
+    d.post(hotkeys.TOGGLE, binding=2)
+    d.post(hotkeys.STEP, 1, binding=3)
+    d.pump()
+    assert calls == []
+    d.pump()
+    assert d.latency_summary()[0] == 1
+
+
+def test_pump_reschedules_after_handler_error():
+    def fail(offset):
+        raise RuntimeError("boom")
+
+    d = dispatcher({hotkeys.STEP: fail})
+    d.post(hotkeys.STEP, 1)
+    d.pump()
+    assert d.burst_start is None and len(d.root.scheduled) == 1
+
+
+def test_start_and_stop():
+    d = dispatcher()
+    d.start()
+    d.start()
+    assert len(d.root.scheduled) == 1
+    d.stop()
+    assert d.root.cancelled == [1]
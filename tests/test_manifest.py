@@ -0,0 +1,91 @@
+import os
+
+from PIL import Image
+
+import manifest
+import view
+
+TARGETS = {"2k": (2560, 1440), "4k": (3840, 2160)}
+
+
+# --- Manifest file ---
+
+def test_load_missing_or_invalid_manifest(tmp_path):
+    empty = {"version": manifest.MANIFEST_VERSION, "sources": {}}
+    assert manifest.load_manifest(str(tmp_path / "missing.json")) == empty
+    (tmp_path / "bad.json").write_text("{not json")
+    assert manifest.load_manifest(str(tmp_path / "bad.json")) == empty
+    (tmp_path / "old.json").write_text('{"version": 0, "sources": {}}')
+    assert manifest.load_manifest(str(tmp_path / "old.json")) == empty
+
+
+def test_save_and_load_round_trip(manifest_tree):
+    _, output_base, _, data = manifest_tree(TARGETS)
+    path = manifest.manifest_path(output_base)
+    manifest.save_manifest(path, data)
+    assert manifest.load_manifest(path) == data
+    assert os.listdir(output_base).count(manifest.MANIFEST_NAME) == 1
+    assert not os.path.exists(path + ".tmp")
+
+
+def test_fingerprint_reuses_hash_of_unchanged_file(tmp_path):
+    path = tmp_path / "a.png"
+    path.write_bytes(b"abc")
+    first = manifest.source_fingerprint(str(path))
+    assert first["sha256"] == manifest.file_sha256(str(path))
+    previous = dict(first, sha256="cached")
+    assert manifest.source_fingerprint(str(path), previous)["sha256"] == "cached"
+    previous["size"] += 1
+    assert manifest.source_fingerprint(str(path), previous)["sha256"] == first["sha256"]
+
+
+def test_recorded_outputs(manifest_tree):
+    _, output_base, _, data = manifest_tree(TARGETS)
+    expected = {os.path.normcase(os.path.abspath(view.output_path_for(output_base, "M1REV", name)))
+                for name in TARGETS}
+    assert manifest.recorded_outputs(data, output_base) == expected
+
+
+# --- plan_rebuild ---
+
+def test_unchanged_outputs_are_up_to_date(manifest_tree, plan):
+    source, output_base, _, data = manifest_tree(TARGETS)
+    jobs, _, stale, up_to_date = plan(source, output_base, data, TARGETS)
+    assert jobs == [] and stale == [] and up_to_date == 2
+
+
+def test_changed_source_rebuilds(manifest_tree, plan):
+    source, output_base, key, data = manifest_tree(TARGETS)
+    with open(source, "ab") as f:
+        f.write(b" edited")
+    jobs, fingerprints, stale, up_to_date = plan(source, output_base, data, TARGETS)
+    assert jobs == [(source, TARGETS)] and stale == [] and up_to_date == 0
+    assert fingerprints[key]["sha256"] == manifest.file_sha256(source)
+
+
+def test_force_rebuilds_without_pruning(manifest_tree, plan):
+    source, output_base, _, data = manifest_tree(TARGETS)
+    jobs, _, stale, _ = plan(source, output_base, data, TARGETS, force=True)
+    assert jobs == [(source, TARGETS)] and stale == []
+
+
+def test_config_change_or_missing_output_rebuilds_target(manifest_tree, plan):
+    source, output_base, _, data = manifest_tree(TARGETS)
+    jobs, _, _, up_to_date = plan(source, output_base, data, TARGETS, resample=Image.Resampling.BICUBIC)
+    assert jobs == [(source, TARGETS)] and up_to_date == 0
+    os.remove(view.output_path_for(output_base, "M1REV", "4k"))
+    jobs, _, stale, up_to_date = plan(source, output_base, data, TARGETS)
+    assert jobs == [(source, {"4k": TARGETS["4k"]})] and stale == [] and up_to_date == 1
+
+
+def test_deleted_source_is_stale(manifest_tree, plan):
+    source, output_base, key, data = manifest_tree(TARGETS)
+    os.remove(source)
+    jobs, _, stale, _ = plan(None, output_base, data, TARGETS)
+    assert jobs == [] and stale == [(key, None)]
+
+
+def test_source_of_another_input_folder_is_kept(manifest_tree, plan):
+    source, output_base, _, data = manifest_tree(TARGETS)
+    jobs, _, stale, _ = plan(None, output_base, data, TARGETS)
+    assert jobs == [] and stale == []
@@ -0,0 +1,90 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import png_optimize
+
+
+def decode(data):
+    with Image.open(io.BytesIO(data)) as img:
+        return np.asarray(img.convert("RGBA"))
+
+
+def few_colours(size=(64, 48)):
+    rgba = np.zeros((size[1], size[0], 4), dtype=np.uint8)
+    rgba[10, :] = (255, 0, 0, 255)
+    rgba[:, 20] = (0, 255, 0, 128) # Translucent
+    rgba[30:35, 30:40] = (0, 0, 255, 255)
+    rgba[0, 0] = (9, 9, 9, 0) # Transparent with a colour of its own
+    return rgba
+
+
+def test_palette_image_is_lossless():
+    rgba = few_colours()
+    pal = png_optimize.palette_image(Image.fromarray(rgba, "RGBA"))
+    assert pal.mode == "P"
+    np.testing.assert_array_equal(np.asarray(pal.convert("RGBA")), rgba)
+
+
+def test_palette_order_puts_translucent_entries_first():
+    rgba = few_colours()
+    colours = np.unique(np.ascontiguousarray(rgba).view(np.uint32))
+    entries, remap, translucent = png_optimize.palette_order(colours)
+    assert translucent == 3 # Fully transparent black, (9, 9, 9, 0) and the translucent green
+    assert (entries[:translucent, 3] < 255).all() and (entries[translucent:, 3] == 255).all()
+    np.testing.assert_array_equal(entries[remap], colours.view(np.uint8).reshape(-1, 4))
+
+
+def test_too_many_colours_has_no_palette():
+    rgba = np.random.default_rng(0).integers(0, 256, (32, 32, 4), dtype=np.uint8)
+    assert png_optimize.palette_image(Image.fromarray(rgba, "RGBA")) is None
+
+
+@pytest.mark.parametrize("seed", [None, 0])
+def test_optimize_image_lossless(seed):
+    if seed is None:
+        rgba = few_colours()
+    else:
+        rgba = np.random.default_rng(seed).integers(0, 256, (32, 32, 4), dtype=np.uint8)
+    data, kind = png_optimize.optimize_image(Image.fromarray(rgba, "RGBA"))
+    assert kind.startswith("palette" if seed is None else "rgba")
+    np.testing.assert_array_equal(decode(data), rgba)
+
+
+def test_quantize_limits_colours():
+    rgba = np.random.default_rng(1).integers(0, 256, (32, 32, 4), dtype=np.uint8)
+    data, kind = png_optimize.optimize_image(Image.fromarray(rgba, "RGBA"), quantize=True, colors=16)
+    assert kind.startswith("quantized")
+    assert len(np.unique(decode(data).reshape(-1, 4), axis=0)) <= 16
+
+
+def test_save_png_modes(tmp_path):
+    rgba = few_colours()
+    img = Image.fromarray(rgba, "RGBA")
+    for mode in png_optimize.MODES:
+        path = str(tmp_path / f"{mode}.png")
+        png_optimize.save_png(img, path, mode)
+        with open(path, "rb") as f:
+            np.testing.assert_array_equal(decode(f.read()), rgba)
+    with pytest.raises(ValueError):
+        png_optimize.save_png(img, str(tmp_path / "x.png"), "smallest")
+
+
+def test_rgba_fallback_is_saved_once_with_defaults():
+    rgba = np.random.default_rng(2).integers(0, 256, (32, 32, 4), dtype=np.uint8)
+    img = Image.fromarray(rgba, "RGBA")
+    data, kind = png_optimize.optimize_image(img)
+    assert kind == "rgba" and data == png_optimize.encode_default(img)
+
+
+def test_save_png_report(tmp_path):
+    img = Image.fromarray(few_colours(), "RGBA")
+    report = png_optimize.save_png(img, str(tmp_path / "a.png"), "lossless", report=True)
+    assert report["kind"].startswith("palette")
+    assert report["after_bytes"] == (tmp_path / "a.png").stat().st_size
+    assert report["before_bytes"] == len(png_optimize.encode_default(img))
+    assert report["before_ms"] > 0 and report["after_ms"] > 0
+    noisy = Image.fromarray(np.random.default_rng(3).integers(0, 256, (32, 32, 4), dtype=np.uint8), "RGBA")
+    assert png_optimize.save_png(noisy, str(tmp_path / "b.png"), report=True) == {"kind": "rgba"}
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+import png_strips
+
+
+def reticle(size, seed=0):
+    """A mostly transparent RGBA image with a few colours, like a reticle, plus some noise."""
+    rng = np.random.default_rng(seed)
+    rgba = np.zeros((size[1], size[0], 4), dtype=np.uint8)
+    rgba[size[1] // 2, :] = (255, 0, 0, 255)
+    rgba[:, size[0] // 2] = (0, 255, 0, 255)
+    rgba[::7, ::5] = rng.integers(0, 256, rgba[::7, ::5].shape, dtype=np.uint8)
+    return rgba
+
+
+def save(tmp_path, rgba, name="src.png", **params):
+    path = str(tmp_path / name)
+    Image.fromarray(rgba, "RGBA").save(path, **params)
+    return path
+
+
+@pytest.mark.parametrize("mode", ["RGBA", "RGB", "LA", "P"])
+def test_reader_matches_pillow(tmp_path, mode):
+    img = Image.fromarray(reticle((97, 61)), "RGBA").convert(mode)
+    path = str(tmp_path / "src.png")
+    img.save(path)
+    with png_strips.StripReader(path, rows=8) as reader:
+        tops, strips = zip(*[(top, np.array(strip)) for top, strip in reader])
+    assert tops == tuple(range(0, 61, 8))
+    np.testing.assert_array_equal(np.concatenate(strips), np.asarray(img.convert("RGBA")))
+
+
+def test_reader_interlaced_falls_back(tmp_path):
+    rgba = reticle((40, 30))
+    path = save(tmp_path, rgba, interlace=1)
+    with png_strips.StripReader(path, rows=4) as reader:
+        strips = [np.array(strip) for _, strip in reader]
+    np.testing.assert_array_equal(np.concatenate(strips), rgba)
+
+
+@pytest.mark.parametrize("resample", [Image.Resampling.LANCZOS, Image.Resampling.BICUBIC, Image.Resampling.BOX])
+@pytest.mark.parametrize("target", [(133, 75), (40, 23), (100, 60)])
+def test_resizer_matches_image_resize(resample, target):
+    rgba = reticle((100, 60), seed=1)
+    expected = np.asarray(Image.fromarray(rgba, "RGBA").resize(target, resample))
+    resizer = png_strips.StripResizer((100, 60), target, resample)
+    out = []
+    for top in range(0, 60, 7):
+        out += resizer.feed(rgba[top:top + 7])
+    out += resizer.flush()
+    np.testing.assert_array_equal(np.concatenate(out), expected)
+
+
+@pytest.mark.parametrize("optimization", ["none", "lossless", "quantize"])
+def test_sink_round_trip(tmp_path, optimization):
+    rgba = reticle((70, 45), seed=2)
+    path = str(tmp_path / "out.png")
+    sink = png_strips.StripSink(path, (70, 45), optimization, rows=16)
+    for top in range(0, 45, 16):
+        sink.write(rgba[top:top + 16])
+    sink.close()
+    with Image.open(path) as img:
+        written = np.asarray(img.convert("RGBA"))
+    if optimization == "quantize":
+        assert written.shape == rgba.shape
+    else:
+        np.testing.assert_array_equal(written, rgba)
+
+
+def test_use_strips():
+    assert png_strips.use_strips((7680, 4320), None)
+    assert not png_strips.use_strips((1920, 1080), None)
+    assert not png_strips.use_strips((7680, 4320), 0)
+    assert png_strips.use_strips((10, 10), 64)
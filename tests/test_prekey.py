@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+import prekey
+import trans
+
+
+def rgb(*colours):
+    return np.array(colours, dtype=np.uint8).reshape(-1, 3)
+
+
+def test_pick_key_color_prefers_default():
+    assert prekey.pick_key_color(rgb((0, 0, 0), (255, 255, 255))) == prekey.DEFAULT_KEY_COLOR
+
+
+@pytest.mark.parametrize("taken", range(1, len(prekey.KEY_CANDIDATES) + 1))
+def test_pick_key_color_skips_used_colours(taken):
+    colours = rgb(prekey.DEFAULT_KEY_COLOR, *prekey.KEY_CANDIDATES[:taken - 1])
+    key = prekey.pick_key_color(colours)
+    assert key == prekey.KEY_CANDIDATES[taken - 1]
+    assert key not in map(tuple, colours.tolist())
+
+
+def test_pick_key_color_falls_back_to_a_gap():
+    colours = rgb((0, 0, 0), (0, 0, 1), (0, 0, 3), prekey.DEFAULT_KEY_COLOR, *prekey.KEY_CANDIDATES)
+    assert prekey.pick_key_color(colours) == (0, 0, 2)
+    assert prekey.pick_key_color(colours[1:]) == (0, 0, 0)
+
+
+def reticle(seed=0):
+    """Noise with a clear border and some pixels already in the default key colour."""
+    rng = np.random.default_rng(seed)
+    rgba = rng.integers(0, 256, (40, 60, 4), dtype=np.uint8)
+    rgba[:5] = 0
+    rgba[:, -7:] = 0
+    rgba[10, 10:20] = (*prekey.DEFAULT_KEY_COLOR, 255)
+    return rgba
+
+
+@pytest.mark.parametrize("threshold", [1, 128, 255])
+def test_threshold_round_trips_through_key_image(threshold):
+    rgba = reticle()
+    keyed, key, bbox = prekey.prekey_image(Image.fromarray(rgba, "RGBA"), threshold=threshold)
+    left, top, right, bottom = bbox
+    assert keyed.mode == "RGB" and keyed.size == (right - left, bottom - top)
+    assert key != prekey.DEFAULT_KEY_COLOR
+
+    crop = rgba[top:bottom, left:right]
+    visible = crop[..., 3] >= threshold
+    # The crop is tight around the visible pixels
+    assert visible.any(axis=1)[[0, -1]].all() and visible.any(axis=0)[[0, -1]].all()
+
+    restored = np.asarray(trans.key_image(keyed, key_color=key, tolerance=1))
+    np.testing.assert_array_equal(restored[..., 3] == 255, visible)
+    np.testing.assert_array_equal(restored[..., 3] == 0, ~visible)
+    np.testing.assert_array_equal(restored[visible][:, :3], crop[visible][:, :3])
+
+
+def test_matte_blends_kept_pixels_towards_matte():
+    rgba = np.zeros((4, 4, 4), dtype=np.uint8)
+    rgba[1:3, 1:3] = (200, 100, 50, 255)
+    rgba[1, 1, 3] = 128
+    rgba[2, 2, 3] = 60 # Below the threshold: keyed out
+    keyed, key, bbox = prekey.prekey_image(Image.fromarray(rgba, "RGBA"), mode="matte", matte=(0, 0, 0))
+    assert bbox == (1, 1, 3, 3)
+    pixels = np.asarray(keyed)
+    assert tuple(pixels[0, 0]) == (100, 50, 25)
+    assert tuple(pixels[0, 1]) == (200, 100, 50)
+    assert tuple(pixels[1, 1]) == key
+    restored = np.asarray(trans.key_image(keyed, key_color=key, tolerance=1))
+    assert restored[..., 3].tolist() == [[255, 255], [255, 0]]
+
+
+def test_prekey_rejects_unknown_mode():
+    with pytest.raises(ValueError):
+        prekey.prekey_image(Image.new("RGBA", (2, 2)), mode="blur")
@@ -0,0 +1,42 @@
+import pytest
+
+import reticle_layers
+
+
+def test_first_range_press_shows_the_bar():
+    state = reticle_layers.LayerState(range_marks=[("200", 0), ("400", 6)])
+    assert state.range_position() is None
+    state.step_range(1)
+    assert state.range_position() == ("200", 0)
+    state.step_range(5)
+    assert state.range_position() == ("400", 6)
+
+
+@pytest.mark.parametrize("steps, presses, expected", [(3, 3, ("600", 12)), (-2, 2, ("200", 0)), (1, 1, ("200", 0))])
+def test_coalesced_presses_show_then_move_the_range_bar(steps, presses, expected):
+    state = reticle_layers.LayerState(range_marks=[("200", 0), ("400", 6), ("600", 12), ("800", 18)])
+    state.step_range(steps, presses)
+    assert state.range_position() == expected
+
+
+def test_reset_hides_layers_and_restarts_range():
+    state = reticle_layers.LayerState(range_marks=[("200", 0), ("400", 6)], mil_marks=[(3, 4)])
+    state.step_range(1)
+    state.step_range(1)
+    state.cycle_mark(1)
+    state.move_nudge(2, -1)
+    state.reset()
+    assert state.range_position() is None and state.mark_position() is None
+    assert state.nudge == (0, 0)
+    state.step_range(1)
+    assert state.range_position() == ("200", 0)
+
+
+def test_reset_restarts_free_range_offset():
+    state = reticle_layers.LayerState(range_step=2)
+    state.step_range(1)
+    state.step_range(3)
+    assert state.range_position() == ("+6", 6)
+    state.reset()
+    state.step_range(1)
+    assert state.range_position() == ("+0", 0)
@@ -0,0 +1,89 @@
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import reticle_pack
+
+
+def reticle(size, seed):
+    """A few colours, a translucent fringe and a transparent border."""
+    rng = np.random.default_rng(seed)
+    rgba = np.zeros((size[1], size[0], 4), dtype=np.uint8)
+    rgba[size[1] // 2, 4:-4] = (237, 28, 36, 255)
+    rgba[3:-3, size[0] // 2] = (34, 177, 76, 255)
+    rgba[size[1] // 2 + 1, 4:-4] = (237, 28, 36, 100) # Below the threshold unless --keep-alpha
+    rgba[5, 6:10, :3] = rng.integers(0, 256, (4, 3), dtype=np.uint8)
+    rgba[5, 6:10, 3] = 255
+    return rgba
+
+
+def noisy(size, seed):
+    """More than 256 colours, so the variant is stored as raw RGBA."""
+    rgba = np.random.default_rng(seed).integers(0, 256, (size[1], size[0], 4), dtype=np.uint8)
+    rgba[..., 3] = 255
+    rgba[:2] = 0
+    return rgba
+
+
+def expected(rgba, keep_alpha):
+    """The source keyed and cropped the way the pack stores it."""
+    rgba = rgba.copy()
+    if not keep_alpha:
+        rgba[..., 3] = np.where(rgba[..., 3] >= reticle_pack.ALPHA_THRESHOLD, 255, 0)
+    rgba[rgba[..., 3] == 0] = 0
+    rows, cols = np.flatnonzero(rgba[..., 3].any(axis=1)), np.flatnonzero(rgba[..., 3].any(axis=0))
+    bbox = (int(cols[0]), int(rows[0]), int(cols[-1]) + 1, int(rows[-1]) + 1)
+    return rgba[bbox[1]:bbox[3], bbox[0]:bbox[2]], bbox
+
+
+@pytest.mark.parametrize("keep_alpha", [False, True])
+def test_every_variant_reads_back_exactly(tmp_path, keep_alpha):
+    library = tmp_path / "img"
+    (library / "2k").mkdir(parents=True)
+    sources = {
+        ("M1REV", (96, 54)): (library / "M1REV.png", reticle((96, 54), 0)),
+        ("M1REV", (128, 72)): (library / "2k" / "M1REV_2k.png", reticle((128, 72), 1)),
+        ("noise", (40, 30)): (library / "noise.png", noisy((40, 30), 2)),
+    }
+    for path, rgba in sources.values():
+        Image.fromarray(rgba, "RGBA").save(path)
+
+    pack_path = str(tmp_path / "lib.rpak")
+    reticle_pack.build_pack(str(library), pack_path, keep_alpha)
+    assert not os.path.exists(pack_path + ".tmp")
+    pack = reticle_pack.ReticlePack(pack_path)
+    assert pack.names() == ["M1REV", "noise"]
+    for (name, size), (_, rgba) in sources.items():
+        variant = pack.variant_sizes(name)[size]
+        assert variant["offset"] % reticle_pack.ALIGNMENT == 0
+        assert variant["mode"] == ("RGBA" if name == "noise" else "P")
+        crop, bbox = expected(rgba, keep_alpha)
+        assert tuple(variant["bbox"]) == bbox
+        np.testing.assert_array_equal(np.asarray(pack.image(variant).convert("RGBA")), crop)
+
+
+def test_entry_uses_exact_variant(tmp_path):
+    library = tmp_path / "img"
+    library.mkdir()
+    rgba = reticle((96, 54), 0)
+    Image.fromarray(rgba, "RGBA").save(library / "M1REV.png")
+    pack_path = str(tmp_path / "lib.rpak")
+    reticle_pack.build_pack(str(library), pack_path)
+    entry = reticle_pack.ReticlePack(pack_path).entry("M1REV", (96, 54))
+    crop, bbox = expected(rgba, False)
+    assert entry.size == (96, 54) and tuple(entry.bbox) == bbox
+
+
+def test_pack_paths():
+    assert reticle_pack.split_pack_path("img/tanks.rpak/M1REV") == ("img/tanks.rpak", "M1REV")
+    assert reticle_pack.split_pack_path("img/tanks.rpak") == (None, None)
+    assert reticle_pack.member_path("img/tanks.rpak", "M1REV") == "img/tanks.rpak/M1REV"
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "bad.rpak"
+    path.write_bytes(b"PNG!" + bytes(reticle_pack.HEADER.size))
+    with pytest.raises(ValueError):
+        reticle_pack.ReticlePack(str(path))
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+import reticle_scale
+
+
+def lines_image(size=(192, 108)):
+    """1px vertical and horizontal lines and short ticks on a transparent background."""
+    rgba = np.zeros((size[1], size[0], 4), dtype=np.uint8)
+    rgba[size[1] // 2, :] = (255, 0, 0, 255)
+    rgba[:, size[0] // 2] = (255, 0, 0, 255)
+    for x in range(10, size[0] - 10, 13):
+        rgba[40:60, x] = (0, 255, 0, 255)
+    rgba[20:22, 30:90] = (0, 0, 255, 255) # A 2px horizontal line
+    return rgba
+
+
+def test_identity_scale_reports_no_error():
+    rgba = lines_image()
+    error = reticle_scale.line_width_error(rgba, rgba)
+    assert error["lines"] > 0
+    assert error["mean_error"] == 0 and error["max_error"] == 0
+    assert error["exact"] == 1.0 and error["missing"] == 0
+
+
+def test_error_measures_widened_lines():
+    rgba = lines_image()
+    widened = rgba.copy()
+    widened[:40, rgba.shape[1] // 2 + 1] = (255, 0, 0, 255) # Top of the centre vertical line 2px wide
+    error = reticle_scale.line_width_error(rgba, widened)
+    assert error["max_error"] == 1
+    assert 0 < error["exact"] < 1.0
+
+
+def test_missing_lines_are_counted():
+    rgba = lines_image()
+    empty = np.zeros_like(rgba)
+    error = reticle_scale.line_width_error(rgba, empty)
+    assert error["missing"] == error["lines"] > 0
+
+
+@pytest.mark.parametrize("scale", [4 / 3, 2])
+def test_scaled_lines_have_whole_pixel_widths(scale):
+    rgba = lines_image()
+    size = (round(rgba.shape[1] * scale), round(rgba.shape[0] * scale))
+    scaled = reticle_scale.scale_array(rgba, size)
+    assert scaled.shape == (size[1], size[0], 4)
+    assert set(np.unique(scaled[..., 3])) <= {0, 255}
+    error = reticle_scale.line_width_error(rgba, scaled)
+    assert error["missing"] == 0
+    assert error["exact"] == 1.0
+
+
+def test_scaling_down_keeps_every_line():
+    rgba = lines_image()
+    scaled = reticle_scale.scale_array(rgba, (144, 81))
+    assert reticle_scale.line_width_error(rgba, scaled)["missing"] == 0
+
+
+def test_lanczos_is_less_exact():
+    rgba = lines_image()
+    lanczos = np.asarray(Image.fromarray(rgba, "RGBA").resize((256, 144), Image.Resampling.LANCZOS))
+    reticle = reticle_scale.scale_array(rgba, (256, 144))
+    assert (reticle_scale.line_width_error(rgba, lanczos)["exact"]
+            < reticle_scale.line_width_error(rgba, reticle)["exact"])
+
+
+def test_scale_image_adds_no_colours():
+    rgba = lines_image()
+    scaled = reticle_scale.scale_image(Image.fromarray(rgba, "RGBA"), (256, 144))
+    colours = {tuple(c) for c in np.asarray(scaled).reshape(-1, 4)}
+    assert colours <= {tuple(c) for c in rgba.reshape(-1, 4)}
+
+
+def test_harden_alpha():
+    rgba = np.array([[[10, 20, 30, 127], [10, 20, 30, 128], [1, 2, 3, 255]]], dtype=np.uint8)
+    hardened = reticle_scale.harden_alpha(rgba).view(np.uint8).reshape(1, 3, 4)
+    np.testing.assert_array_equal(hardened, [[[0, 0, 0, 0], [10, 20, 30, 255], [1, 2, 3, 255]]])
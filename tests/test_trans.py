@@ -0,0 +1,28 @@
+import pytest
+
+import trans
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("255,255,255", (255, 255, 255)),
+    (" 0, 128 ,7", (0, 128, 7)),
+    ((50, 205, 50), (50, 205, 50)),
+    ("lime green", (50, 205, 50)),
+    ("#ff0000", (255, 0, 0)),
+])
+def test_parse_key_color(value, expected):
+    assert trans.parse_key_color(value) == expected
+
+
+@pytest.mark.parametrize("value", ["1,2", "1,2,3,4", "1,2,300", "-1,0,0", "a,b,c", (1, 2), "no such colour"])
+def test_parse_key_color_rejects(value):
+    with pytest.raises(ValueError):
+        trans.parse_key_color(value)
+
+
+@pytest.mark.parametrize("args", [["-k", "1,2"], ["-t", "300"], ["-t", "-1"], ["-s", "256"]])
+def test_bad_options_are_usage_errors(args, capsys):
+    with pytest.raises(SystemExit) as exc:
+        trans.main(["missing.png"] + args)
+    assert exc.value.code == 2
+    assert "error:" in capsys.readouterr().err
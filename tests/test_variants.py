@@ -0,0 +1,66 @@
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import variants
+
+SIZES = {"M1REV.png": (192, 108), os.path.join("2k", "M1REV_2k.png"): (256, 144),
+         os.path.join("4k", "M1REV_4k.png"): (384, 216)}
+
+
+def make_library(root):
+    for name, size in SIZES.items():
+        path = root / name
+        path.parent.mkdir(exist_ok=True)
+        rgba = np.zeros((size[1], size[0], 4), dtype=np.uint8)
+        rgba[size[1] // 2, :] = (255, 0, 0, 255)
+        Image.fromarray(rgba, "RGBA").save(path)
+    return variants.VariantIndex(str(root))
+
+
+@pytest.mark.parametrize("screen, expected", [
+    ((2560, 1440), (2560, 1440)), # Exact
+    ((3440, 1440), (2560, 1440)), # Same height, other width: nearest larger by height
+    ((1366, 768), (1920, 1080)), # Smaller than every variant: the smallest one still larger
+    ((1920, 1200), (2560, 1440)),
+    ((5120, 2880), (3840, 2160)), # Larger than every variant: the tallest
+])
+def test_pick_variant(screen, expected):
+    available = {(1920, 1080): "1k", (2560, 1440): "2k", (3840, 2160): "4k"}
+    assert variants.pick_variant(available, screen) == (expected, available[expected])
+
+
+def test_logical_name_and_folders():
+    assert variants.logical_name("2k/M1REV_2k.png") == "M1REV"
+    assert variants.logical_name("M1REV_3440x1440.png") == "M1REV"
+    assert variants.library_root("img/3440x1440") == os.path.abspath("img")
+
+
+def test_resolve_exact_variant(tmp_path):
+    index = make_library(tmp_path)
+    assert index.refresh().sizes("M1REV") == sorted(SIZES.values())
+    assert variants.resolve(index, str(tmp_path / "M1REV.png"), (256, 144)) == str(tmp_path / "2k" / "M1REV_2k.png")
+
+
+@pytest.mark.parametrize("screen, resampled", [
+    ((344, 144), (256, 144)), # Ultrawide: scaled by height, narrower than the screen
+    ((160, 90), (160, 90)), # Smaller than every variant
+    ((192, 120), (192, 120)), # 16:10: centre-cropped to the screen width
+    ((768, 432), (768, 432)), # Larger than every variant
+])
+def test_resolve_resamples_into_cache_once(tmp_path, screen, resampled):
+    index = make_library(tmp_path)
+    path = variants.resolve(index, str(tmp_path / "M1REV.png"), screen)
+    assert os.path.dirname(path) == str(tmp_path / variants.CACHE_FOLDER)
+    with Image.open(path) as img:
+        assert img.size == resampled
+    stamp = os.stat(path).st_mtime_ns
+    assert variants.resolve(index, str(tmp_path / "4k" / "M1REV_4k.png"), screen) == path
+    assert os.stat(path).st_mtime_ns == stamp
+
+
+def test_resolve_leaves_unknown_images_alone(tmp_path):
+    index = make_library(tmp_path)
+    assert variants.resolve(index, "elsewhere/t90REV.png", (1920, 1080)) == "elsewhere/t90REV.png"
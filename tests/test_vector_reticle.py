@@ -0,0 +1,42 @@
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import vector_reticle
+
+IMG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "img")
+RED = (237, 28, 36)
+
+
+def test_edge_tints_fold_into_the_reticle_colour():
+    rgba = np.zeros((4, 4, 4), dtype=np.uint8)
+    rgba[0, :] = RED + (255,)
+    rgba[1, :] = (243, 101, 106, 255) # RED at about 68% over white
+    rgba[2, :] = (249, 175, 178, 255) # RED at about 35%: below the threshold
+    rgba[3, :] = RED + (100,)
+    colours, index = vector_reticle.reticle_coverage(rgba)
+    assert colours == [RED]
+    assert index[:, 0].tolist() == [0, 0, -1, -1]
+
+
+@pytest.mark.parametrize("name, opaque, folded", [("M1REV.png", 432, 69), ("t90REV.png", 678, 0)])
+def test_import_differs_only_by_folded_edges(tmp_path, name, opaque, folded):
+    path = os.path.join(IMG_DIR, name)
+    doc = vector_reticle.import_png(path)
+    out = str(tmp_path / (doc["name"] + vector_reticle.VECTOR_SUFFIX))
+    vector_reticle.save_reticle(doc, out)
+    # Measured against the source's own alpha mask, not the importer's coverage
+    assert vector_reticle.mask_error(vector_reticle.load_reticle(out), path) == (folded, opaque, folded)
+    assert os.path.getsize(out) * 2 < os.path.getsize(path)
+
+
+def test_rects_element_lays_out_every_box():
+    doc = {"version": 1, "units": 100, "color": "#ff0000",
+           "elements": [{"type": "rects", "boxes": [0, 0, 1, 1, -2, -2, -1, 2]}]}
+    bbox, items = vector_reticle.layout(doc, 200, 100)
+    assert bbox == (98, 48, 101, 52)
+    assert [coords for _, coords, _ in items] == [(2, 2, 3, 3), (0, 0, 1, 4)]
+    rendered = np.asarray(vector_reticle.render_to_image(doc, 200, 100))[..., 3] > 0
+    assert np.count_nonzero(rendered) == 5
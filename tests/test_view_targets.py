@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+import view
+
+TARGETS = {"2k": (2560, 1440), "4k": (3840, 2160)}
+EXTRA = {"1366x768": (1366, 768)}
+SOURCE = (1920, 1080)
+
+
+# --- Target resolutions ---
+
+def test_parse_resolutions():
+    assert view.parse_resolutions("3440x1440, 1366X768,,2k") == {
+        "3440x1440": (3440, 1440), "1366x768": (1366, 768), "2k": (2560, 1440)}
+    assert view.parse_resolutions("03440x01440") == {"3440x1440": (3440, 1440)}
+
+
+@pytest.mark.parametrize("text", ["3440", "3440x", "x1440", "0x1440", "3440x-1", "wide"])
+def test_parse_resolutions_rejects(text):
+    with pytest.raises(ValueError):
+        view.parse_resolutions(text)
+
+
+def test_merge_targets_skips_sizes_already_built():
+    merged = view.merge_targets(TARGETS, {"2560x1440": (2560, 1440), "3440x1440": (3440, 1440), "2k": (1, 1)})
+    assert merged == dict(TARGETS, **{"3440x1440": (3440, 1440)})
+
+
+# --- Scaling by vertical field of view ---
+
+@pytest.mark.parametrize("target, scaled", [
+    ((2560, 1440), (2560, 1440)),
+    ((3440, 1440), (2560, 1440)), # 21:9: narrower than the screen, padded
+    ((1920, 1200), (2133, 1200)), # 16:10: wider than the screen, cropped
+    ((1366, 768), (1365, 768)),
+])
+def test_scaled_size_keeps_height(target, scaled):
+    assert view.scaled_size(SOURCE, target) == scaled
+
+
+def marked(width, height):
+    """An RGBA array with a distinct colour in every column, so crops and pads are visible."""
+    rgba = np.zeros((height, width, 4), dtype=np.uint8)
+    rgba[..., 0] = np.arange(width) % 256
+    rgba[..., 1] = np.arange(width) // 256
+    rgba[..., 3] = 255
+    return rgba
+
+
+@pytest.mark.parametrize("target", [(3440, 1440), (1920, 1200), (1366, 768), (2560, 1440)])
+def test_fit_width_centres_scaled_image(target):
+    scaled = marked(*view.scaled_size(SOURCE, target))
+    fitted = np.asarray(view.fit_width(Image.fromarray(scaled, "RGBA"), target[0]))
+    assert fitted.shape == (target[1], target[0], 4)
+    np.testing.assert_array_equal(view.fit_rows(scaled, target[0]), fitted)
+    offset = (target[0] - scaled.shape[1]) // 2
+    if offset >= 0: # Padded with transparency on both sides
+        np.testing.assert_array_equal(fitted[:, offset:offset + scaled.shape[1]], scaled)
+        assert not fitted[:, :offset, 3].any() and not fitted[:, offset + scaled.shape[1]:, 3].any()
+    else: # Centre-cropped
+        left = (scaled.shape[1] - target[0]) // 2
+        np.testing.assert_array_equal(fitted, scaled[:, left:left + target[0]])
+
+
+def test_targets_of_same_height_share_one_resize(tmp_path, monkeypatch):
+    calls = []
+    resize_with = view.resize_with
+
+    def counting_resize(img, size, resample):
+        calls.append(size)
+        return resize_with(img, size, resample)
+    monkeypatch.setattr(view, "resize_with", counting_resize)
+    img = Image.fromarray(marked(192, 108), "RGBA")
+    cache = {}
+    for name, size in {"256x144": (256, 144), "344x144": (344, 144), "192x120": (192, 120)}.items():
+        path, _ = view.resize_image(img, size, name, "M1REV", str(tmp_path / name), "none", cache)
+        with Image.open(path) as out:
+            assert out.size == size
+    assert calls == [(256, 144), (213, 120)]
+    assert set(cache) == {(256, 144), (213, 120)}
+
+
+# --- Outputs of targets not named in a run ---
+
+def test_targets_not_in_run_are_kept_unless_pruned(manifest_tree, plan):
+    source, output_base, key, data = manifest_tree(dict(TARGETS, **EXTRA))
+    jobs, _, stale, _ = plan(source, output_base, data, {"2k": TARGETS["2k"]})
+    assert jobs == [] and stale == []
+    _, _, stale, _ = plan(source, output_base, data, {"2k": TARGETS["2k"]}, prune=True)
+    assert sorted(stale) == [(key, "1366x768"), (key, "4k")]
+
+
+def test_changed_source_prunes_targets_not_in_run(manifest_tree, plan):
+    source, output_base, key, data = manifest_tree(dict(TARGETS, **EXTRA))
+    with open(source, "ab") as f:
+        f.write(b" edited")
+    jobs, _, stale, _ = plan(source, output_base, data, TARGETS)
+    assert jobs == [(source, TARGETS)]
+    assert stale == [(key, "1366x768")]
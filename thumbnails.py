@@ -0,0 +1,151 @@
+"""Thumbnails of crosshairs for the gallery picker, with a persistent on-disk cache.
+
+Thumbnails are cropped to the reticle's opaque bounding box, scaled to fit THUMB_SIZE and
+saved as small RGBA PNGs in <library root>/.cache/thumbs, named by the SHA-256 of the source's
+content (plus the member name for reticle packs). Renaming or copying a reticle therefore
+reuses its thumbnail, and an edited one gets a new one.
+
+Hashes are remembered in a manifest.py-style index (path -> mtime/size/sha256) next to the
+thumbnails, so reopening a folder only stats its files. ThumbnailLoader does the hashing on
+a background thread and renders missing thumbnails in a process pool; the GUI drains finished
+(name, thumbnail path) pairs with results() and never decodes a full-size image itself.
+"""
+import hashlib
+import os
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import image_cache
+import manifest
+import reticle_pack
+import variants
+import vector_reticle
+
+CACHE_FOLDER = os.path.join(".cache", "thumbs")
+INDEX_NAME = "index.json"
+THUMB_SIZE = 96
+# Vector reticles are rasterized at this size before thumbnailing
+VECTOR_RENDER_SIZE = (1920, 1080)
+
+
+def cache_dir_for(folder):
+    return os.path.join(variants.library_root(folder), CACHE_FOLDER)
+
+
+def thumbnail_name(content_hash, member=None, size=THUMB_SIZE):
+    if member is not None:
+        content_hash = hashlib.sha256(f"{content_hash}/{member}".encode("utf-8")).hexdigest()
+    return f"{content_hash[:24]}_{size}.png"
+
+
+def load_source_image(path, member=None):
+    """The reticle at path (a PNG, a vector reticle, or a member of the pack at path), cropped."""
+    from PIL import Image
+    if member is not None:
+        pack = reticle_pack.ReticlePack(path)
+        # The smallest variant is plenty for a thumbnail
+        variant = min(pack.reticles[member], key=lambda v: v["size"][1])
+        return pack.image(variant).convert("RGBA")
+    if vector_reticle.is_vector_reticle(path):
+        img = vector_reticle.render_to_image(vector_reticle.load_reticle(path), *VECTOR_RENDER_SIZE)
+    else:
+        with Image.open(path) as source:
+            img = source.convert("RGBA")
+    return img.crop(image_cache.opaque_bbox(img))
+
+
+def render_thumbnail(job):
+    """Process pool job: (source path, pack member or None, output path, size) -> (output path, error)."""
+    from PIL import Image
+    path, member, output_path, size = job
+    try:
+        img = load_source_image(path, member)
+        img.thumbnail((size, size), Image.Resampling.LANCZOS)
+        thumb = Image.new("RGBA", (size, size), (0, 0, 0, 0))
+        thumb.paste(img, ((size - img.width) // 2, (size - img.height) // 2))
+        tmp_path = f"{output_path}.{os.getpid()}.tmp"
+        thumb.save(tmp_path, format="PNG")
+        os.replace(tmp_path, output_path)
+        return output_path, None
+    except Exception as e:
+        return output_path, str(e)
+
+
+class ThumbnailLoader(threading.Thread):
+    """
+    Produces thumbnails for names (list entries relative to folder, as in the overlay's
+    crosshair list) on a daemon thread. Cached thumbnails are reported first, in list order,
+    then the rendered ones as they finish.
+    """
+
+    def __init__(self, folder, names, size=THUMB_SIZE, workers=None):
+        super().__init__(name="thumbnails", daemon=True)
+        self.folder = os.path.abspath(folder)
+        self.names = list(names)
+        self.size = size
+        self.workers = workers
+        self.cache_dir = cache_dir_for(self.folder)
+        self._results = queue.SimpleQueue()
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def results(self):
+        """Drains finished thumbnails as a list of (name, thumbnail path or None)."""
+        finished = []
+        while True:
+            try:
+                finished.append(self._results.get_nowait())
+            except queue.Empty:
+                return finished
+
+    def run(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        index_path = os.path.join(self.cache_dir, INDEX_NAME)
+        index = manifest.load_manifest(index_path)
+        sources = index["sources"]
+        jobs = {}
+        for name in self.names:
+            if self._cancelled.is_set():
+                return
+            path = os.path.join(self.folder, *name.split("/"))
+            pack_path, member = reticle_pack.split_pack_path(path)
+            source = pack_path or path
+            try:
+                fingerprint = manifest.source_fingerprint(source, sources.get(source))
+            except OSError:
+                self._results.put((name, None))
+                continue
+            sources[source] = fingerprint
+            thumb_path = os.path.join(self.cache_dir, thumbnail_name(fingerprint["sha256"], member, self.size))
+            if os.path.isfile(thumb_path):
+                self._results.put((name, thumb_path))
+            else:
+                jobs[name] = (source, member, thumb_path, self.size)
+        try:
+            manifest.save_manifest(index_path, index)
+        except OSError as e:
+            print(f"Could not save thumbnail index: {e}")
+
+        if not jobs or self._cancelled.is_set():
+            return
+        if self.workers == 1 or len(jobs) == 1:
+            for name, job in jobs.items():
+                if self._cancelled.is_set():
+                    return
+                thumb_path, error = render_thumbnail(job)
+                self._results.put((name, None if error else thumb_path))
+            return
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(render_thumbnail, job): name for name, job in jobs.items()}
+            for future in as_completed(futures):
+                if self._cancelled.is_set():
+                    for pending in futures:
+                        pending.cancel()
+                    return
+                thumb_path, error = future.result()
+                if error:
+                    print(f"Thumbnail failed for '{futures[future]}': {error}")
+                self._results.put((futures[future], None if error else thumb_path))
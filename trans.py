@@ -1,21 +1,237 @@
-from PIL import Image
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 
-def white_to_transparent(image_path):
-    img = Image.open(image_path)
-    img = img.convert("RGBA")
+import numpy as np
+from PIL import Image, ImageColor
 
-    datas = img.getdata()
-    newData = []
-    for item in datas:
-        if item[0] > 200 and item[1] > 200 and item[2] > 200:
-            newData.append((255, 255, 255, 0))
+import png_optimize
+import png_strips
+
+
+# --- Configuration ---
+# Pixels whose every channel lies within DEFAULT_TOLERANCE of the key colour are keyed out.
+# With a white key this is the same rule as the old per-pixel loop ("all channels > 200").
+DEFAULT_KEY_COLOR = (255, 255, 255)
+DEFAULT_TOLERANCE = 55
+# Width (in channel levels) of the alpha ramp outside the tolerance; 0 gives a hard key
+DEFAULT_SOFTNESS = 0
+OUTPUT_SUFFIX = "_transparent"
+# PNG encoding of the output, one of png_optimize.MODES
+DEFAULT_OPTIMIZATION = "lossless"
+# Rows per strip when images are keyed strip by strip with bounded memory (see png_strips.py):
+# None streams images larger than png_strips.AUTO_STRIP_PIXELS, 0 never streams
+DEFAULT_STRIP_ROWS = None
+
+
+# --- Keying engine ---
+
+def check_level(value, name):
+    """Returns value if it is a channel level (0-255), else raises ValueError naming it."""
+    if not 0 <= value <= 255:
+        raise ValueError(f"{name} must be between 0 and 255, got {value}")
+    return value
+
+
+def parse_key_color(value):
+    """
+    Accepts an (r, g, b) tuple, a colour name ('lime green', 'LimeGreen'), '#rrggbb' or 'r,g,b'.
+    Raises ValueError unless it gives exactly three components in 0-255.
+    """
+    if isinstance(value, (tuple, list)) or "," in value:
+        parts = value if isinstance(value, (tuple, list)) else value.split(",")
+        if len(parts) != 3:
+            raise ValueError(f"expected 3 components (r,g,b), got {len(parts)}")
+        return tuple(check_level(int(c), "colour components") for c in parts)
+    # Tk also spells multi-word names with spaces; Pillow knows them without
+    return ImageColor.getrgb(value.replace(" ", ""))[:3]
+
+
+def key_distance(rgba, key_color):
+    """Returns the per-pixel max channel distance to key_color as a uint8 array."""
+    dist = np.zeros(rgba.shape[:2], dtype=np.uint8)
+    for channel, key in enumerate(key_color):
+        plane = rgba[..., channel]
+        # |plane - key| without leaving uint8: one of the two saturating differences is zero
+        diff = np.where(plane > key, plane - np.uint8(key), np.uint8(key) - plane)
+        np.maximum(dist, diff, out=dist)
+    return dist
+
+
+def key_mask(rgba, key_color, tolerance):
+    """Boolean mask of pixels whose every channel is within tolerance of key_color."""
+    mask = np.ones(rgba.shape[:2], dtype=bool)
+    for channel, key in enumerate(key_color):
+        plane = rgba[..., channel]
+        # |plane - key| < tolerance, skipping bounds that no uint8 value can violate
+        if key - tolerance >= 0:
+            mask &= plane > key - tolerance
+        if key + tolerance <= 255:
+            mask &= plane < key + tolerance
+    return mask
+
+
+def key_array(rgba, key_color=DEFAULT_KEY_COLOR, tolerance=DEFAULT_TOLERANCE, softness=DEFAULT_SOFTNESS):
+    """Keys a C-contiguous HxWx4 uint8 RGBA array in place and returns it."""
+    keyed = key_mask(rgba, key_color, tolerance)
+    if softness > 0:
+        # Linear alpha falloff across [tolerance, tolerance + softness)
+        ramp_zone = ~keyed & key_mask(rgba, key_color, tolerance + softness)
+        ramp = (key_distance(rgba, key_color)[ramp_zone].astype(np.float32) - tolerance + 1) / (softness + 1)
+        alpha = rgba[..., 3]
+        alpha[ramp_zone] = (alpha[ramp_zone] * ramp).astype(np.uint8)
+    # Write whole pixels at once through a 32-bit view instead of fancy-indexing four channels
+    keyed_pixel = np.array([(*key_color, 0)], dtype=np.uint8).view(np.uint32)[0]
+    np.copyto(rgba.view(np.uint32)[..., 0], keyed_pixel, where=keyed)
+    return rgba
+
+
+def key_image(img, key_color=DEFAULT_KEY_COLOR, tolerance=DEFAULT_TOLERANCE, softness=DEFAULT_SOFTNESS):
+    """Returns a new RGBA image with pixels close to key_color made transparent."""
+    rgba = np.array(img.convert("RGBA"))
+    key_array(rgba, key_color, tolerance, softness)
+    return Image.fromarray(rgba, "RGBA")
+
+
+def same_path(a, b):
+    """Whether a and b name the same file or folder (also when spelled differently)."""
+    if os.path.exists(a) and os.path.exists(b):
+        return os.path.samefile(a, b)
+    return os.path.normcase(os.path.abspath(a)) == os.path.normcase(os.path.abspath(b))
+
+
+def default_output_path(image_path):
+    """'<dir>/<name>_transparent.png' next to the source."""
+    base, _ = os.path.splitext(image_path)
+    return f"{base}{OUTPUT_SUFFIX}.png"
+
+
+def key_strips(image_path, output_path, key_color=DEFAULT_KEY_COLOR, tolerance=DEFAULT_TOLERANCE,
+               softness=DEFAULT_SOFTNESS, optimization=DEFAULT_OPTIMIZATION, strip_rows=png_strips.DEFAULT_STRIP_ROWS):
+    """Keys image_path into output_path strip by strip; same pixels as key_image(), bounded memory."""
+    with png_strips.StripReader(image_path, strip_rows) as reader:
+        sink = png_strips.StripSink(output_path, reader.size, optimization, strip_rows)
+        for _, strip in reader:
+            sink.write(key_array(np.array(strip), key_color, tolerance, softness))
+        sink.close()
+
+
+def white_to_transparent(image_path, output_path=None, key_color=DEFAULT_KEY_COLOR,
+                         tolerance=DEFAULT_TOLERANCE, softness=DEFAULT_SOFTNESS, optimization=DEFAULT_OPTIMIZATION,
+                         strip_rows=DEFAULT_STRIP_ROWS):
+    """Keys out near-white (or key_color) pixels of image_path and saves the result as PNG."""
+    if output_path is None:
+        output_path = default_output_path(image_path)
+    if same_path(output_path, image_path):
+        raise ValueError(f"Output '{output_path}' would overwrite the source image")
+    out_dir = os.path.dirname(output_path)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+    if png_strips.use_strips(png_strips.image_size(image_path), strip_rows):
+        key_strips(image_path, output_path, key_color, tolerance, softness, optimization,
+                   strip_rows or png_strips.DEFAULT_STRIP_ROWS)
+        return output_path
+    with Image.open(image_path) as img:
+        result = key_image(img, key_color, tolerance, softness)
+    png_optimize.save_png(result, output_path, optimization)
+    return output_path
+
+
+# --- Batch mode ---
+
+def _key_file_job(args):
+    """Process-pool entry point; returns (source, output, error)."""
+    image_path, output_path, key_color, tolerance, softness, optimization, strip_rows = args
+    try:
+        white_to_transparent(image_path, output_path, key_color, tolerance, softness, optimization, strip_rows)
+        return image_path, output_path, None
+    except Exception as e:
+        return image_path, output_path, str(e)
+
+
+def key_directory(input_dir, output_dir=None, key_color=DEFAULT_KEY_COLOR, tolerance=DEFAULT_TOLERANCE,
+                  softness=DEFAULT_SOFTNESS, workers=None, optimization=DEFAULT_OPTIMIZATION,
+                  strip_rows=DEFAULT_STRIP_ROWS):
+    """Keys every PNG in input_dir across a process pool. Returns a list of (source, output, error)."""
+    if output_dir is None:
+        output_dir = input_dir
+    in_place = same_path(output_dir, input_dir)
+    jobs = []
+    for filename in sorted(os.listdir(input_dir)):
+        path = os.path.join(input_dir, filename)
+        if not os.path.isfile(path) or not filename.lower().endswith(".png"):
+            continue
+        base, _ = os.path.splitext(filename)
+        if base.endswith(OUTPUT_SUFFIX):
+            continue # Don't re-key our own output when writing next to the sources
+        if in_place:
+            output_path = os.path.join(output_dir, f"{base}{OUTPUT_SUFFIX}.png")
         else:
-            newData.append(item)
+            output_path = os.path.join(output_dir, filename)
+        jobs.append((path, output_path, key_color, tolerance, softness, optimization, strip_rows))
+
+    if workers == 1 or len(jobs) <= 1:
+        return [_key_file_job(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_key_file_job, jobs))
+
+
+# --- Command line ---
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Make near-white (or key-coloured) pixels of PNG reticles transparent.")
+    parser.add_argument("input", nargs="?", default="img/M1REV.png", help="PNG file or folder of PNG files")
+    parser.add_argument("-o", "--output", help="Output file (single image) or folder (batch mode)")
+    parser.add_argument("-k", "--key-color", default="255,255,255", help="Colour to key out: 'r,g,b', '#rrggbb' or a name")
+    parser.add_argument("-t", "--tolerance", type=int, default=DEFAULT_TOLERANCE,
+                        help="Max per-channel distance from the key colour that is fully transparent")
+    parser.add_argument("-s", "--softness", type=int, default=DEFAULT_SOFTNESS,
+                        help="Width of the soft alpha falloff beyond the tolerance (0 = hard edge)")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="Worker processes for batch mode")
+    parser.add_argument("-O", "--optimize", choices=png_optimize.MODES, default=DEFAULT_OPTIMIZATION,
+                        help="PNG output: plain, lossless palette reduction, or with quantization as fallback")
+    parser.add_argument("--strip-rows", type=int, default=DEFAULT_STRIP_ROWS,
+                        help="Process images in strips of this many rows with bounded memory "
+                             "(default: only images larger than 4K; 0 = never)")
+    args = parser.parse_args(argv)
+
+    try:
+        key_color = parse_key_color(args.key_color)
+    except ValueError as e:
+        parser.error(f"invalid --key-color: {e}")
+    try:
+        check_level(args.tolerance, "--tolerance")
+        check_level(args.softness, "--softness")
+    except ValueError as e:
+        parser.error(str(e))
+    start = time.perf_counter()
+    if os.path.isdir(args.input):
+        results = key_directory(args.input, args.output, key_color, args.tolerance, args.softness, args.workers,
+                                args.optimize, args.strip_rows)
+        failed = 0
+        for source, output, error in results:
+            if error:
+                failed += 1
+                print(f"Error processing '{source}': {error}")
+            else:
+                print(f"Saved '{output}'.")
+        print(f"Converted {len(results) - failed} of {len(results)} images in {time.perf_counter() - start:.2f}s.")
+        return 1 if failed else 0
+
+    if not os.path.isfile(args.input):
+        print(f"Error: '{args.input}' not found.")
+        return 1
+    try:
+        output_path = white_to_transparent(args.input, args.output, key_color, args.tolerance, args.softness,
+                                           args.optimize, args.strip_rows)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+    print(f"Conversion complete. Transparent image saved as '{output_path}' ({time.perf_counter() - start:.2f}s).")
+    return 0
 
-    img.putdata(newData)
-    img.save("6_transparent.png", "PNG")
 
 if __name__ == "__main__":
-    image_path = "img/M1REV.png"  # Replace with your image path
-    white_to_transparent(image_path)
-    print("Conversion complete. Transparent image saved as '6_transparent.png'.")
\ No newline at end of file
+    sys.exit(main())
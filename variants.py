@@ -0,0 +1,201 @@
+"""Groups resolution variants of the same reticle and picks or builds the right one for a screen.
+
+`M1REV.png`, `1k/M1REV.png`, `2k/M1REV_2k.png` and `4k/M1REV_4k.png` are one logical reticle
+("M1REV") with variants at 1920x1080, 2560x1440 and 3840x2160. For a given screen the resolver
+returns the exact match if there is one; otherwise it resamples the nearest larger variant
+(or the largest one available) and stores the result in an on-disk cache, so the next apply at
+that resolution is a plain file lookup.
+"""
+import hashlib
+import os
+import re
+import tempfile
+import threading
+
+# Folder names view.py writes variants into (plus '<width>x<height>' folders for other
+# resolutions, e.g. 3440x1440); a library root is the folder that contains them
+VARIANT_FOLDERS = ("1k", "2k", "4k")
+RESOLUTION_FOLDER_RE = re.compile(r"^\d+x\d+$", re.IGNORECASE)
+# Suffixes view.py (and users) append to variant file names: _2k, _4k, _3440x1440 ...
+VARIANT_SUFFIX_RE = re.compile(r"_(?:\d+k|\d+x\d+)$", re.IGNORECASE)
+CACHE_FOLDER = os.path.join(".cache", "variants")
+# Held while a cached variant is checked and created, so two threads don't resample the same one
+_resample_lock = threading.Lock()
+# Same filter view.py uses for its pre-built variants (a PIL.Image.Resampling member name;
+# Pillow is only imported once an image actually has to be read)
+RESAMPLING_FILTER = "LANCZOS"
+
+
+def logical_name(filename):
+    """'M1REV_2k.png' -> 'M1REV'"""
+    base_name = os.path.splitext(os.path.basename(filename))[0]
+    return VARIANT_SUFFIX_RE.sub("", base_name)
+
+
+def is_variant_folder(name):
+    return name.lower() in VARIANT_FOLDERS or bool(RESOLUTION_FOLDER_RE.match(name))
+
+
+def library_root(directory):
+    """The folder holding the variant subfolders: img/2k -> img, img/3440x1440 -> img, img -> img."""
+    directory = os.path.abspath(directory)
+    if is_variant_folder(os.path.basename(directory)):
+        return os.path.dirname(directory)
+    return directory
+
+
+class VariantIndex:
+    """
+    Maps logical reticle names to {(width, height): path} for a library root and its immediate
+    subfolders. Image sizes are read from PNG headers only. The index is rebuilt when the
+    modification time of any scanned folder changes.
+    """
+
+    def __init__(self, root):
+        self.root = library_root(root)
+        self.variants = {}
+        self._folder_mtimes = None
+        self._lock = threading.Lock() # The overlay's preloader resolves from a background thread
+
+    def _folders(self):
+        folders = [self.root]
+        try:
+            for entry in os.scandir(self.root):
+                # Skip hidden folders such as our own resample cache
+                if entry.is_dir() and not entry.name.startswith("."):
+                    folders.append(entry.path)
+        except OSError:
+            pass
+        return folders
+
+    def refresh(self):
+        with self._lock:
+            self._refresh()
+        return self
+
+    def _refresh(self):
+        from PIL import Image
+        folders = self._folders()
+        mtimes = {}
+        for folder in folders:
+            try:
+                mtimes[folder] = os.stat(folder).st_mtime_ns
+            except OSError:
+                pass
+        if mtimes == self._folder_mtimes:
+            return
+        variants = {}
+        for folder in folders:
+            try:
+                filenames = sorted(os.listdir(folder))
+            except OSError:
+                continue
+            for filename in filenames:
+                if not filename.lower().endswith(".png"):
+                    continue
+                path = os.path.join(folder, filename)
+                try:
+                    with Image.open(path) as img:
+                        size = img.size
+                except Exception:
+                    continue
+                # First path found wins, so root-level sources beat identical copies in 1k/
+                variants.setdefault(logical_name(filename), {}).setdefault(size, path)
+        self.variants = variants
+        self._folder_mtimes = mtimes
+
+    def sizes(self, name):
+        return sorted(self.variants.get(name, {}))
+
+
+def pick_variant(variants, screen_size):
+    """
+    Chooses ((width, height), path) to derive screen_size from: the exact match, else the
+    smallest variant at least as tall as the screen, else the tallest one.
+    """
+    if screen_size in variants:
+        return screen_size, variants[screen_size]
+    by_height = sorted(variants, key=lambda size: (size[1], size[0]))
+    larger = [size for size in by_height if size[1] >= screen_size[1]]
+    size = larger[0] if larger else by_height[-1]
+    return size, variants[size]
+
+
+def fov_width(source_size, height):
+    """
+    Width of a source_size frame scaled to height. The game keeps the vertical field of view
+    fixed, so reticles scale with screen height about the screen centre, whatever the width.
+    """
+    return max(1, round(source_size[0] * (height / source_size[1])))
+
+
+def resample_for_screen(image, screen_size):
+    """
+    Scales image by screen height (see fov_width) and centre-crops any width that does not fit
+    the screen. Narrower results are left as-is; the overlay centres them.
+    """
+    from PIL import Image
+    screen_width, screen_height = screen_size
+    width = fov_width(image.size, screen_height)
+    resized = image.resize((width, screen_height), Image.Resampling[RESAMPLING_FILTER])
+    if width > screen_width:
+        left = (width - screen_width) // 2
+        resized = resized.crop((left, 0, left + screen_width, screen_height))
+    return resized
+
+
+def save_atomic(image, path, **params):
+    """
+    Saves image as a PNG at path through a temp file of its own, so concurrent writers (the
+    preloader thread and the Tk loop resolving the same file) never see a half-written file.
+    """
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(path) or ".", prefix=os.path.basename(path) + ".",
+                                     suffix=".tmp", delete=False) as tmp:
+        tmp_path = tmp.name
+    try:
+        image.save(tmp_path, format="PNG", **params)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def cached_variant_path(cache_dir, name, source_path, screen_size):
+    """Cache file name includes a digest of the source identity so edits invalidate it."""
+    st = os.stat(source_path)
+    identity = f"{os.path.abspath(source_path)}|{st.st_mtime_ns}|{st.st_size}|{RESAMPLING_FILTER}"
+    digest = hashlib.sha1(identity.encode("utf-8")).hexdigest()[:12]
+    return os.path.join(cache_dir, f"{name}_{screen_size[0]}x{screen_size[1]}_{digest}.png")
+
+
+def resolve(index, image_path, screen_size):
+    """
+    Returns the path of an image for the same logical reticle as image_path sized for
+    screen_size, resampling and caching it if no variant matches exactly. Returns image_path
+    unchanged if it is not part of the index.
+    """
+    screen_size = tuple(screen_size)
+    name = logical_name(image_path)
+    variants = index.refresh().variants.get(name)
+    if not variants:
+        return image_path
+    size, source_path = pick_variant(variants, screen_size)
+    if size == screen_size:
+        return source_path
+
+    cache_dir = os.path.join(index.root, CACHE_FOLDER)
+    target_path = cached_variant_path(cache_dir, name, source_path, screen_size)
+    with _resample_lock:
+        if os.path.isfile(target_path):
+            return target_path
+        from PIL import Image
+        os.makedirs(cache_dir, exist_ok=True)
+        with Image.open(source_path) as img:
+            resized = resample_for_screen(img.convert("RGBA"), screen_size)
+        save_atomic(resized, target_path)
+        print(f"Resampled '{os.path.basename(source_path)}' ({size[0]}x{size[1]}) "
+              f"for {screen_size[0]}x{screen_size[1]} -> '{target_path}'")
+    return target_path
@@ -0,0 +1,399 @@
+"""Compact vector description of reticles, a PNG importer and resolution-independent renderers.
+
+A reticle file (``<name>.reticle.json``) looks like:
+
+    {"version": 1, "name": "M1REV", "units": 1080, "color": "#ed1c24",
+     "elements": [
+       {"type": "line", "points": [x0, y0, x1, y1], "width": w},
+       {"type": "rect", "box": [x0, y0, x1, y1], "color": "#22b14c"},
+       {"type": "rects", "boxes": [x0, y0, x1, y1, x0, y0, x1, y1, ...]},
+       {"type": "dot", "center": [x, y], "radius": r},
+       {"type": "arc", "center": [x, y], "radius": r, "start": 0, "extent": 180, "width": w},
+       {"type": "text", "pos": [x, y], "text": "4", "size": h, "anchor": "center"}]}
+
+Coordinates are normalized the way the game scales its optics: (0, 0) is the screen centre
+and ``units`` (default 1) equals the screen height, so the same file renders correctly at
+any resolution and aspect ratio. The importer uses the source height as ``units``, which
+keeps coordinates small exact numbers. ``color`` on an element overrides the document default.
+
+The importer cannot recognise numerals or curves; it decomposes the opaque pixels of a PNG
+into axis-aligned lines and rectangles at its own resolution. Anti-aliased edges are folded
+into the reticle colour first (see reticle_coverage()), so edge pixels neither split runs nor
+add per-element colours; edge pixels covered less than the alpha threshold are left out, and
+mask_error() reports how many. The leftover fragments of numerals and diagonals are packed
+into one ``rects`` element per colour.
+Dots, arcs and text can be added by hand.
+"""
+import argparse
+import json
+import math
+import os
+import sys
+from collections import Counter
+
+# numpy and Pillow are only needed by the importer and the Pillow renderer; they are imported
+# inside those functions so the overlay can draw vector reticles without loading either.
+
+VECTOR_SUFFIX = ".reticle.json"
+FORMAT_VERSION = 1
+# Pixels with at least this alpha are part of the reticle (the overlay keys the rest out anyway)
+ALPHA_THRESHOLD = 128
+# Dots up to this many screen pixels wide are drawn as squares
+MAX_DOT_SIZE = 5
+# The importer stores runs at least this long (and twice as long as wide) as lines
+MIN_LINE_LENGTH = 4
+# How far an edge colour may stray from an exact tint of a reticle colour (fraction of 255)
+TINT_TOLERANCE = 0.08
+
+
+# --- Document I/O ---
+
+def load_reticle(path):
+    with open(path, "r", encoding="utf-8") as f:
+        doc = json.load(f)
+    if doc.get("version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported reticle format version: {doc.get('version')}")
+    return doc
+
+
+def save_reticle(doc, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(doc, f, separators=(",", ":"))
+
+
+def is_vector_reticle(path):
+    return path.lower().endswith(VECTOR_SUFFIX)
+
+
+# --- Importer ---
+
+def _hex(rgb):
+    return "#%02x%02x%02x" % tuple(int(c) for c in rgb[:3])
+
+
+def _mask_rectangles(mask):
+    """Decomposes a boolean mask into rectangles by merging identical row runs; exact cover."""
+    import numpy as np
+    rects = []
+    open_runs = {} # (x0, x1) -> first row
+    padded = np.zeros(mask.shape[1] + 2, dtype=np.int8)
+    for y in range(mask.shape[0] + 1):
+        runs = set()
+        if y < mask.shape[0] and mask[y].any():
+            padded[1:-1] = mask[y]
+            edges = np.diff(padded)
+            runs = set(zip(np.flatnonzero(edges == 1).tolist(), np.flatnonzero(edges == -1).tolist()))
+        for run, y0 in list(open_runs.items()):
+            if run not in runs:
+                rects.append((run[0], y0, run[1], y))
+                del open_runs[run]
+        for run in runs:
+            open_runs.setdefault(run, y)
+    return rects
+
+
+def _fewest_rectangles(mask):
+    """Row-run or column-run decomposition of mask, whichever needs fewer rectangles."""
+    by_rows = _mask_rectangles(mask)
+    by_columns = [(x0, y0, x1, y1) for y0, x0, y1, x1 in _mask_rectangles(mask.T)]
+    return by_rows if len(by_rows) <= len(by_columns) else by_columns
+
+
+def _tint(colour, base):
+    """
+    Coverage t if colour is base anti-aliased onto a white background (colour = base * t + white
+    * (1 - t) in every channel), otherwise None.
+    """
+    spans = [(255 - c, 255 - b) for c, b in zip(colour, base)]
+    ratios = [c / b for c, b in spans if b >= 32]
+    if not ratios or max(ratios) - min(ratios) > TINT_TOLERANCE:
+        return None
+    t = min(1.0, sum(ratios) / len(ratios))
+    if any(abs(c - b * t) > 255 * TINT_TOLERANCE for c, b in spans):
+        return None
+    return t
+
+
+def reticle_coverage(rgba, alpha_threshold=ALPHA_THRESHOLD):
+    """
+    Splits the pixels of an RGBA array into reticle colours. Anti-aliased edges drawn onto white
+    are folded into the colour they are a tint of, and a pixel belongs to the reticle when its
+    alpha times that coverage reaches alpha_threshold, the same test the overlay's keying applies
+    to alpha alone. Returns (colours, index) where index holds each pixel's position in colours,
+    or -1 for background.
+    """
+    import numpy as np
+    alpha = rgba[..., 3]
+    candidates = alpha >= alpha_threshold
+    index = np.full(alpha.shape, -1, dtype=np.int16)
+    colours = []
+    pixels = rgba[candidates]
+    # The most frequent colours become the bases the rarer edge colours are matched against
+    for colour, _ in Counter(map(tuple, pixels[:, :3].tolist())).most_common():
+        for i, base in enumerate(colours):
+            t = _tint(colour, base)
+            if t is not None:
+                break
+        else:
+            colours.append(colour)
+            i, t = len(colours) - 1, 1.0
+        same = candidates & np.all(rgba[..., :3] == colour, axis=-1)
+        index[same & (alpha.astype(np.float32) * t >= alpha_threshold)] = i
+    used = [i for i in range(len(colours)) if np.any(index == i)]
+    remap = np.full(len(colours) + 1, -1, dtype=np.int16)
+    remap[used] = np.arange(len(used))
+    return [colours[i] for i in used], remap[index]
+
+
+def import_png(image_path, alpha_threshold=ALPHA_THRESHOLD):
+    """
+    Builds a reticle document from the opaque pixels of a PNG. Long thin runs become lines; the
+    remaining fragments (numerals, diagonals) are stored as one "rects" element per colour.
+    """
+    import numpy as np
+    from PIL import Image
+    with Image.open(image_path) as img:
+        rgba = np.asarray(img.convert("RGBA"))
+    height, width = rgba.shape[:2]
+    colours, index = reticle_coverage(rgba, alpha_threshold)
+    centre_x, centre_y = width / 2, height / 2
+
+    def num(v):
+        # Pixel coordinates are whole or half pixels; store them without a trailing .0
+        return int(v) if v == int(v) else v
+
+    def nx(px):
+        return num(px - centre_x)
+
+    def ny(py):
+        return num(py - centre_y)
+
+    colour_names = [_hex(colour) for colour in colours]
+    colour_counts = Counter({name: int(np.count_nonzero(index == i)) for i, name in enumerate(colour_names)})
+    default_colour = colour_counts.most_common(1)[0][0] if colour_counts else "#000000"
+    elements = []
+    for i, colour in enumerate(colour_names):
+        lines, boxes = [], []
+        for x0, y0, x1, y1 in _fewest_rectangles(index == i):
+            w, h = x1 - x0, y1 - y0
+            if w >= 2 * h and w >= MIN_LINE_LENGTH:
+                lines.append({"type": "line", "points": [nx(x0), ny(y0 + h / 2), nx(x1), ny(y0 + h / 2)],
+                              "width": h})
+            elif h >= 2 * w and h >= MIN_LINE_LENGTH:
+                lines.append({"type": "line", "points": [nx(x0 + w / 2), ny(y0), nx(x0 + w / 2), ny(y1)],
+                              "width": w})
+            else:
+                boxes.extend((nx(x0), ny(y0), nx(x1), ny(y1)))
+        if boxes:
+            lines.append({"type": "rects", "boxes": boxes})
+        for element in lines:
+            if colour != default_colour:
+                element["color"] = colour
+            elements.append(element)
+
+    name = os.path.basename(image_path)
+    return {
+        "version": FORMAT_VERSION,
+        "name": os.path.splitext(name)[0],
+        "source": {"file": name, "size": [width, height]},
+        "units": height,
+        "color": default_colour,
+        "elements": elements,
+    }
+
+
+# --- Layout ---
+
+def _snap(v):
+    """Rounds half up (unlike round()), so half-pixel edges snap consistently."""
+    return int(math.floor(v + 0.5))
+
+
+def layout(doc, screen_width, screen_height):
+    """
+    Converts a document to screen pixels. Returns (bbox, items) where bbox is the
+    (left, top, right, bottom) screen box covering every item and items are
+    (kind, coords, options) tuples with coords relative to bbox:
+      ("rect", (x0, y0, x1, y1), {"fill"})                  pixel-exact filled box
+      ("line", (x0, y0, x1, y1), {"fill", "width"})         diagonal line
+      ("oval", (x0, y0, x1, y1), {"fill"})
+      ("arc",  (x0, y0, x1, y1), {"outline", "width", "start", "extent"})
+      ("text", (x, y),           {"fill", "text", "size", "anchor"})
+    Axis-aligned lines become rects so widths and positions snap to whole pixels.
+    """
+    cx, cy, scale = screen_width / 2, screen_height / 2, screen_height / doc.get("units", 1)
+    default_colour = doc.get("color", "#000000")
+    items = []
+
+    def px(v):
+        return _snap(cx + v * scale)
+
+    def py(v):
+        return _snap(cy + v * scale)
+
+    def size(v):
+        return max(1, _snap(v * scale))
+
+    for element in doc["elements"]:
+        colour = element.get("color", default_colour)
+        kind = element["type"]
+        if kind in ("rect", "rects"):
+            boxes = element["box"] if kind == "rect" else element["boxes"]
+            for i in range(0, len(boxes), 4):
+                x0, y0, x1, y1 = boxes[i:i + 4]
+                left, top = px(x0), py(y0)
+                items.append(("rect", (left, top, max(left + 1, px(x1)), max(top + 1, py(y1))),
+                              {"fill": colour}))
+        elif kind == "line":
+            x0, y0, x1, y1 = element["points"]
+            width = size(element.get("width", 0))
+            if y0 == y1:
+                left, right = sorted((px(x0), px(x1)))
+                top = _snap(cy + y0 * scale - width / 2)
+                items.append(("rect", (left, top, max(left + 1, right), top + width), {"fill": colour}))
+            elif x0 == x1:
+                top, bottom = sorted((py(y0), py(y1)))
+                left = _snap(cx + x0 * scale - width / 2)
+                items.append(("rect", (left, top, left + width, max(top + 1, bottom)), {"fill": colour}))
+            else:
+                items.append(("line", (px(x0), py(y0), px(x1), py(y1)), {"fill": colour, "width": width}))
+        elif kind == "dot":
+            x, y = element["center"]
+            d = size(element["radius"] * 2)
+            left, top = _snap(cx + x * scale - d / 2), _snap(cy + y * scale - d / 2)
+            # Small dots are squares on screen anyway; only round the big ones
+            shape = "oval" if d > MAX_DOT_SIZE else "rect"
+            items.append((shape, (left, top, left + d, top + d), {"fill": colour}))
+        elif kind == "arc":
+            x, y = element["center"]
+            r = element["radius"] * scale
+            items.append(("arc", (_snap(cx + x * scale - r), _snap(cy + y * scale - r),
+                                  _snap(cx + x * scale + r), _snap(cy + y * scale + r)),
+                          {"outline": colour, "width": size(element.get("width", 0)),
+                           "start": element.get("start", 0), "extent": element.get("extent", 360)}))
+        elif kind == "text":
+            x, y = element["pos"]
+            items.append(("text", (px(x), py(y)), {"fill": colour, "text": element["text"],
+                                                    "size": size(element["size"]),
+                                                    "anchor": element.get("anchor", "center")}))
+
+    if not items:
+        return (int(cx), int(cy), int(cx) + 1, int(cy) + 1), []
+    boxes = []
+    for kind, coords, options in items:
+        if kind == "text":
+            # Rough extent; generous so glyphs are never clipped by the window
+            half = options["size"] * max(1, len(options["text"]))
+            boxes.append((coords[0] - half, coords[1] - half, coords[0] + half, coords[1] + half))
+        else:
+            pad = options.get("width", 0) if kind in ("line", "arc") else 0
+            boxes.append((min(coords[0], coords[2]) - pad, min(coords[1], coords[3]) - pad,
+                          max(coords[0], coords[2]) + pad, max(coords[1], coords[3]) + pad))
+    left = max(0, min(b[0] for b in boxes))
+    top = max(0, min(b[1] for b in boxes))
+    right = min(screen_width, max(b[2] for b in boxes))
+    bottom = min(screen_height, max(b[3] for b in boxes))
+
+    shifted = []
+    for kind, coords, options in items:
+        offsets = (left, top) * (len(coords) // 2)
+        shifted.append((kind, tuple(c - o for c, o in zip(coords, offsets)), options))
+    return (left, top, max(left + 1, right), max(top + 1, bottom)), shifted
+
+
+# --- Renderers ---
+
+def draw_on_canvas(canvas, items):
+    """Draws layout() items on a Tk canvas whose origin is the layout bbox."""
+    for kind, coords, options in items:
+        if kind == "rect":
+            canvas.create_rectangle(*coords, fill=options["fill"], outline="", width=0)
+        elif kind == "oval":
+            canvas.create_oval(*coords, fill=options["fill"], outline="", width=0)
+        elif kind == "line":
+            canvas.create_line(*coords, fill=options["fill"], width=options["width"])
+        elif kind == "arc":
+            canvas.create_arc(*coords, style="arc", outline=options["outline"], width=options["width"],
+                              start=options["start"], extent=options["extent"])
+        elif kind == "text":
+            canvas.create_text(*coords, text=options["text"], fill=options["fill"],
+                               font=("Arial", -options["size"]), anchor=options["anchor"])
+
+
+def render_to_image(doc, screen_width, screen_height):
+    """Rasterizes a document to a full-screen RGBA image (for previews and verification)."""
+    from PIL import Image, ImageDraw, ImageFont
+    img = Image.new("RGBA", (screen_width, screen_height), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+    (left, top, _, _), items = layout(doc, screen_width, screen_height)
+    for kind, coords, options in items:
+        coords = tuple(c + o for c, o in zip(coords, (left, top) * (len(coords) // 2)))
+        if kind == "rect":
+            draw.rectangle((coords[0], coords[1], coords[2] - 1, coords[3] - 1), fill=options["fill"])
+        elif kind == "oval":
+            draw.ellipse((coords[0], coords[1], coords[2] - 1, coords[3] - 1), fill=options["fill"])
+        elif kind == "line":
+            draw.line(coords, fill=options["fill"], width=options["width"])
+        elif kind == "arc":
+            # Tk measures angles counter-clockwise from 3 o'clock, Pillow clockwise
+            start, extent = options["start"], options["extent"]
+            draw.arc(coords, -(start + extent), -start, fill=options["outline"], width=options["width"])
+        elif kind == "text":
+            anchor = {"center": "mm", "n": "mt", "s": "mb", "e": "rm", "w": "lm",
+                      "nw": "lt", "ne": "rt", "sw": "lb", "se": "rb"}.get(options["anchor"], "mm")
+            try:
+                font = ImageFont.load_default(size=options["size"])
+            except TypeError: # Pillow < 10.1 has no sized default font
+                font = ImageFont.load_default()
+            draw.text(coords, options["text"], fill=options["fill"], font=font, anchor=anchor)
+    return img
+
+
+def mask_error(doc, image_path, alpha_threshold=ALPHA_THRESHOLD):
+    """
+    Compares the render with the source PNG's alpha >= alpha_threshold mask. Returns (differing
+    pixels, opaque source pixels, folded) where folded counts the opaque pixels the importer
+    dropped on purpose: anti-aliased edges whose coverage is below the threshold (see
+    reticle_coverage()). An import that reproduces the source has differing == folded.
+    """
+    import numpy as np
+    from PIL import Image
+    with Image.open(image_path) as img:
+        rgba = np.asarray(img.convert("RGBA"))
+    source = rgba[..., 3] >= alpha_threshold
+    folded = source & (reticle_coverage(rgba, alpha_threshold)[1] < 0)
+    rendered = np.asarray(render_to_image(doc, source.shape[1], source.shape[0]))[..., 3] > 0
+    return int(np.count_nonzero(source != rendered)), int(np.count_nonzero(source)), int(np.count_nonzero(folded))
+
+
+# --- Command line ---
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import PNG reticles into the vector reticle format.")
+    parser.add_argument("inputs", nargs="+", help="PNG files or folders of PNG files")
+    parser.add_argument("-o", "--output", help="Output folder (default: next to each PNG)")
+    parser.add_argument("-t", "--alpha-threshold", type=int, default=ALPHA_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    paths = []
+    for item in args.inputs:
+        if os.path.isdir(item):
+            paths.extend(os.path.join(item, f) for f in sorted(os.listdir(item)) if f.lower().endswith(".png"))
+        else:
+            paths.append(item)
+
+    for path in paths:
+        doc = import_png(path, args.alpha_threshold)
+        out_dir = args.output or os.path.dirname(path)
+        os.makedirs(out_dir or ".", exist_ok=True)
+        out_path = os.path.join(out_dir, doc["name"] + VECTOR_SUFFIX)
+        save_reticle(doc, out_path)
+        wrong, total, folded = mask_error(doc, path, args.alpha_threshold)
+        print(f"{path}: {len(doc['elements'])} elements, {os.path.getsize(out_path)} bytes "
+              f"(PNG {os.path.getsize(path)} bytes), {wrong} of {total} opaque pixels differ, "
+              f"{folded} of them faint anti-aliased edges left out, {wrong - folded} otherwise -> '{out_path}'")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,18 @@
+import argparse
 import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
 from PIL import Image
 
+import manifest
+import png_optimize
+import png_strips
+import reticle_scale
+import variants
+
 # --- 配置 ---
 
 input_folder = './img'
@@ -19,6 +31,11 @@ target_resolutions = {
     '4k': (3840, 2160),
 }
 
+# 其它分辨率（带鱼屏 3440x1440、16:10 的 1920x1200、1366x768 等）用 -r/--resolutions 或 --detect 追加，
+# 输出到名为 '<宽>x<高>' 的子文件夹。游戏保持垂直视野不变，所以炮镜按高度等比缩放、以屏幕中心为基准，
+# 比目标宽的部分居中裁掉，比目标窄的两侧用透明像素补齐；高度相同的目标共用同一份缩放结果
+resolution_presets = {'1k': (1920, 1080), **target_resolutions}
+
 # 预期的原始图片分辨率 (可选，如果只想处理特定尺寸的图片)
 expected_original_resolution = (1920, 1080)
 
@@ -26,83 +43,466 @@ expected_original_resolution = (1920, 1080)
 # Image.Resampling.LANCZOS 适用于 Pillow 9.1.0 或更高版本
 # 如果你的 Pillow 版本较旧，可能需要使用 Image.LANCZOS
 # LANCZOS 通常用于放大图片时保持细节
+# 也可以设为 reticle_scale.RETICLE ('reticle')：像素对齐缩放，细线宽度取整、位置对齐到整像素，
+# alpha 只有全透明/不透明两种，不会出现 LANCZOS 在 1.333 倍 (2k) 时的模糊与振铃，且速度更快
+# （命令行 --resample reticle；用 python reticle_scale.py 对比两者的线宽误差）
 resampling_filter = Image.Resampling.LANCZOS
 
+# 输出 PNG 的编码方式 (png_optimize.MODES)：
+# 'lossless' 颜色数不超过 256 时无损转为调色板+tRNS 格式，文件更小、解码更快，
+#            否则（如 LANCZOS 缩放后的边缘）按 Pillow 默认设置保存一次，不增加生成时间；
+# 'quantize' 颜色过多时再有损量化到 256 色；'none' 使用 Pillow 默认的 32 位 RGBA
+output_optimization = 'lossless'
+
+# 分条（流式）处理：按 strip_rows 行一条读取、缩放、写出，内存占用与图片高度无关，输出像素与整图处理完全一致
+# None 表示只对大于 4K (png_strips.AUTO_STRIP_PIXELS) 的源图片分条处理，0 表示从不分条
+strip_rows = None
+
+# 并行处理的进程数，None 表示使用全部 CPU 核心
+default_workers = None
+
+# 增量构建：输出文件夹中的清单 (manifest.MANIFEST_NAME) 记录每个源文件的哈希和各目标的配置，
+# 只有新增/修改的源文件、或目标分辨率/滤镜发生变化时才重新生成，已删除源文件的输出会被清理
+
 
 # --- 脚本逻辑 ---
-def resize_image(image_path, target_size, target_name, base_name, output_folder):
+def output_path_for(output_base, base_name, res_name):
+    """输出文件路径：<输出基础文件夹>/<目标名称>/<文件名>_<目标名称>.png"""
+    return os.path.join(output_base, res_name, f"{base_name}_{res_name}.png")
+
+
+def parse_resolutions(text):
+    """'3440x1440,1366x768,2k' -> {'3440x1440': (3440, 1440), '1366x768': (1366, 768), '2k': (2560, 1440)}"""
+    targets = {}
+    for item in text.split(','):
+        item = item.strip().lower()
+        if not item:
+            continue
+        if item in resolution_presets:
+            targets[item] = resolution_presets[item]
+            continue
+        width, sep, height = item.partition('x')
+        if not (sep and width.isdigit() and height.isdigit() and int(width) > 0 and int(height) > 0):
+            raise ValueError(f"无法识别的分辨率 '{item}'，应为 <宽>x<高> 或 {'/'.join(resolution_presets)}")
+        targets[f"{int(width)}x{int(height)}"] = (int(width), int(height))
+    return targets
+
+
+def detect_resolutions():
+    """当前主屏幕的分辨率 {'<宽>x<高>': (宽, 高)}（与炮镜叠加层检测屏幕的方式相同）。"""
+    import tkinter as tk
+    root = tk.Tk()
+    try:
+        size = (root.winfo_screenwidth(), root.winfo_screenheight())
+    finally:
+        root.destroy()
+    return {f"{size[0]}x{size[1]}": size}
+
+
+def merge_targets(targets, extra):
+    """把 extra 追加到 targets；与已有目标尺寸相同的分辨率不重复生成。"""
+    merged = dict(targets)
+    for res_name, target_size in extra.items():
+        if target_size not in merged.values():
+            merged.setdefault(res_name, target_size)
+    return merged
+
+
+def scaled_size(source_size, target_size):
+    """按垂直视野缩放后的尺寸：高度等于目标高度，宽度保持原图比例。"""
+    return variants.fov_width(source_size, target_size[1]), target_size[1]
+
+
+def fit_width(img, width):
+    """把缩放后的图片居中裁剪、或两侧用透明像素补齐到 width；宽度相同时原样返回。"""
+    if img.width == width:
+        return img
+    if img.width > width:
+        left = (img.width - width) // 2
+        return img.crop((left, 0, left + width, img.height))
+    padded = Image.new('RGBA', (width, img.height), (0, 0, 0, 0))
+    padded.paste(img, ((width - img.width) // 2, 0))
+    return padded
+
+
+def fit_rows(rows, width):
+    """fit_width 的分条版本，作用于 RGBA 数组。"""
+    if rows.shape[1] == width:
+        return rows
+    if rows.shape[1] > width:
+        left = (rows.shape[1] - width) // 2
+        return rows[:, left:left + width]
+    padded = np.zeros((rows.shape[0], width, 4), dtype=np.uint8)
+    left = (width - rows.shape[1]) // 2
+    padded[:, left:left + rows.shape[1]] = rows
+    return padded
+
+
+def parse_resample(name):
+    """'lanczos' / 'bicubic' / ... -> Image.Resampling 成员，'reticle' 原样返回。"""
+    if name.lower() == reticle_scale.RETICLE:
+        return reticle_scale.RETICLE
+    try:
+        return Image.Resampling[name.upper()]
+    except KeyError:
+        raise ValueError(name) from None
+
+
+def resample_name(resample):
+    return 'RETICLE' if resample == reticle_scale.RETICLE else Image.Resampling(resample).name
+
+
+def resize_with(img, size, resample):
+    """img.resize(size, resample)，resample 也可以是 'reticle'（reticle_scale 像素对齐缩放）。"""
+    if resample == reticle_scale.RETICLE:
+        return reticle_scale.scale_image(img, size)
+    return img.resize(size, resample)
+
+
+def target_config(target_size, optimization=None, resample=None):
+    """目标配置的指纹，写入清单；任何影响输出文件的设置都应包含在内。"""
+    optimization = optimization or output_optimization
+    resample = resampling_filter if resample is None else resample
+    config = f"{target_size[0]}x{target_size[1]}:{resample_name(resample)}"
+    # 宽高比与原图不同的目标按垂直视野缩放并裁剪/补齐；16:9 目标不加后缀，与旧版本清单保持一致
+    if target_size[0] * expected_original_resolution[1] != target_size[1] * expected_original_resolution[0]:
+        config += ":fov"
+    # 'none' 不加后缀，与旧版本清单中的记录保持一致
+    return config if optimization == 'none' else f"{config}:{optimization}"
+
+
+def is_generated_name(filename, targets):
+    """文件名形如 xxx_2k.png / xxx_4k.png 时视为本脚本生成的输出，避免被再次缩放。"""
+    base_name = os.path.splitext(filename)[0]
+    return any(base_name.endswith(f"_{res_name}") for res_name in targets)
+
+
+def resize_image(img, target_size, target_name, base_name, output_folder, optimization=None, scaled_cache=None,
+                 resample=None):
     """
-    打开、缩放并保存图片到指定分辨率。
+    将已解码的图片缩放并保存到指定分辨率，返回输出文件路径。
+    optimization、resample 为 None 时使用 output_optimization、resampling_filter。
+    scaled_cache 为 {缩放尺寸: 缩放结果}，同一源图片的多个目标共用，高度相同的目标只缩放一次。
+    返回 (输出文件路径, 编码报告)；编码报告见 png_optimize.compare_with_default()，'none' 模式下为 None。
     """
-    try:
-        img = Image.open(image_path)
+    # 按垂直视野缩放：先按高度等比缩放，再居中裁剪/补齐到目标宽度
+    # 与原图等比例的目标（2k/4k）缩放后正好是目标尺寸，不需要裁剪
+    size = scaled_size(img.size, target_size)
+    scaled = scaled_cache.get(size) if scaled_cache is not None else None
+    if scaled is None:
+        scaled = resize_with(img, size, resampling_filter if resample is None else resample)
+        if scaled_cache is not None:
+            scaled_cache[size] = scaled
+    resized_img = fit_width(scaled, target_size[0])
 
-        # 可选：检查图片尺寸是否符合预期
-        # if img.size != expected_original_resolution:
-        #     print(f"  跳过：图片 {os.path.basename(image_path)} 尺寸为 {img.size}，而非 {expected_original_resolution}")
-        #     img.close()
-        #     return
+    # 创建输出文件夹 (如果不存在)
+    os.makedirs(output_folder, exist_ok=True)
 
-        # 确保图片是 RGBA 模式以保留透明通道，即使原始图片模式不是
-        if img.mode != 'RGBA':
-             img = img.convert('RGBA')
+    # 构建输出文件名和路径
+    output_file_path = os.path.join(output_folder, f"{base_name}_{target_name}.png")
 
-        print(f"  -> 正在缩放至 {target_size[0]}x{target_size[1]} ({target_name})...")
+    # 保存为 PNG 格式以保留透明信息；优化编码时同时与默认编码比较体积和解码时间
+    optimization = optimization or output_optimization
+    if optimization == 'none':
+        png_optimize.save_png(resized_img, output_file_path, optimization)
+        return output_file_path, None
+    return output_file_path, png_optimize.save_png(resized_img, output_file_path, optimization, report=True)
 
-        # 缩放图片
-        # 因为目标分辨率与原始分辨率是等比例的，直接使用 resize 即可
-        # 如果比例不等，则需要先计算保持比例的新尺寸
-        resized_img = img.resize(target_size, resampling_filter)
 
-        # 创建输出文件夹 (如果不存在)
-        os.makedirs(output_folder, exist_ok=True)
+def format_report(report):
+    """resize_image 的编码报告 -> 附在输出日志后的说明 (体积和解码时间相对默认编码的变化)。"""
+    if not report:
+        return ""
+    text = f"，{report['kind']}"
+    if "before_bytes" in report:
+        text += (f"，比默认编码 {report['after_bytes'] / report['before_bytes'] - 1:+.0%}，"
+                 f"解码 {report['before_ms']:.2f} -> {report['after_ms']:.2f} ms")
+    return text
 
-        # 构建输出文件名和路径
-        output_filename = f"{base_name}_{target_name}.png"
-        output_file_path = os.path.join(output_folder, output_filename)
 
-        # 保存为 PNG 格式以保留透明信息
-        resized_img.save(output_file_path, format='PNG')
-        print(f"  已保存：{output_file_path}")
+def build_pyramid_strips(image_path, targets, output_base, optimization, rows, resample):
+    """
+    build_pyramid 的分条版本：源图片逐条解码一次，每一条同时送入所有目标的缩放器和编码器。
+    输出与 build_pyramid 逐像素相同，内存只与条带高度有关（调色板编码前的数据暂存在临时文件中）。
+    缩放尺寸相同的目标共用一个缩放器，各自只做裁剪/补齐。
+    """
+    base_name = os.path.splitext(os.path.basename(image_path))[0]
+    groups = {} # 缩放尺寸 -> (缩放器, [(目标名称, 编码器, 目标宽度, 输出路径), ...])
+    try:
+        with png_strips.StripReader(image_path, rows) as reader:
+            for res_name, target_size in targets.items():
+                output_path = output_path_for(output_base, base_name, res_name)
+                os.makedirs(os.path.dirname(output_path), exist_ok=True)
+                size = scaled_size(reader.size, target_size)
+                if size not in groups:
+                    groups[size] = (png_strips.StripResizer(reader.size, size, resample), [])
+                groups[size][1].append((res_name, png_strips.StripSink(output_path, target_size, optimization, rows),
+                                        target_size[0], output_path))
+            for _, strip in reader:
+                for resizer, outputs in groups.values():
+                    for resized in resizer.feed(strip):
+                        for _, sink, width, _ in outputs:
+                            sink.write(fit_rows(resized, width))
+            results = []
+            for resizer, outputs in groups.values():
+                for resized in resizer.flush():
+                    for _, sink, width, _ in outputs:
+                        sink.write(fit_rows(resized, width))
+                for res_name, sink, _, output_path in outputs:
+                    # 分条处理不在内存中保留整张图片，因此只报告编码方式，不比较解码时间
+                    kind = sink.close()
+                    results.append((res_name, output_path, None, None if optimization == 'none' else {"kind": kind}))
+    except Exception as e:
+        return image_path, [(res_name, None, str(e), None) for res_name in targets]
+    return image_path, results
 
-        img.close() # 关闭图片文件
 
+def build_pyramid(image_path, targets, output_base, optimization=None, rows=None, resample=None):
+    """
+    只解码一次源图片，并从同一份像素数据生成所有目标分辨率。
+    rows 为分条处理的条带行数（含义同 strip_rows），大图片会改用 build_pyramid_strips
+    （'reticle' 缩放需要整列数据，总是整图处理）。resample 为 None 时使用 resampling_filter。
+    返回 (源文件, [(目标名称, 输出路径或 None, 错误信息或 None, 编码报告或 None), ...])，日志由主进程统一打印。
+    """
+    optimization = optimization or output_optimization
+    resample = resampling_filter if resample is None else resample
+    base_name = os.path.splitext(os.path.basename(image_path))[0]
+    results = []
+    try:
+        size = png_strips.image_size(image_path)
+        if (png_strips.use_strips(size, rows)
+                and all(png_strips.resizable(size, scaled_size(size, target_size), resample)
+                        for target_size in targets.values())):
+            return build_pyramid_strips(image_path, targets, output_base, optimization,
+                                        rows or png_strips.DEFAULT_STRIP_ROWS, resample)
+        with Image.open(image_path) as src:
+            # 可选：检查图片尺寸是否符合预期
+            # if src.size != expected_original_resolution:
+            #     return image_path, [(None, None, f"尺寸为 {src.size}，而非 {expected_original_resolution}", None)]
+
+            # 确保图片是 RGBA 模式以保留透明通道，即使原始图片模式不是
+            # convert/load 会完成解码，之后所有目标都复用这份数据
+            img = src.convert('RGBA') if src.mode != 'RGBA' else src.copy()
     except FileNotFoundError:
-        print(f"  错误：文件未找到 {image_path}")
+        return image_path, [(None, None, f"文件未找到 {image_path}", None)]
     except PermissionError:
-         print(f"  错误：无权限访问 {image_path}")
+        return image_path, [(None, None, f"无权限访问 {image_path}", None)]
     except Exception as e:
-        print(f"  处理图片 {os.path.basename(image_path)} 时发生错误：{e}")
-
+        return image_path, [(None, None, str(e), None)]
 
-# --- 主程序流程 ---
-if not os.path.isdir(input_folder):
-    print(f"错误：输入文件夹 '{input_folder}' 不存在或不是一个文件夹。请检查路径配置。")
-else:
-    print(f"正在处理文件夹中的图片：{input_folder}")
-    processed_count = 0
+    scaled_cache = {}
+    for res_name, target_size in targets.items():
+        output_folder_path = os.path.join(output_base, res_name)
+        try:
+            output_path, report = resize_image(img, target_size, res_name, base_name, output_folder_path,
+                                               optimization, scaled_cache, resample)
+            results.append((res_name, output_path, None, report))
+        except Exception as e:
+            results.append((res_name, None, str(e), None))
+    for scaled in scaled_cache.values():
+        scaled.close()
+    img.close()
+    return image_path, results
 
-    for filename in os.listdir(input_folder):
-        file_path = os.path.join(input_folder, filename)
 
+def find_source_images(folder, targets, known_outputs=()):
+    """列出文件夹中的 PNG 源文件（不含子文件夹），跳过本脚本生成的输出文件。"""
+    sources = []
+    for filename in sorted(os.listdir(folder)):
+        file_path = os.path.join(folder, filename)
         # 只处理文件且是 PNG 格式
         if os.path.isfile(file_path) and filename.lower().endswith('.png'):
-            print(f"\n处理文件：{filename}")
+            if (is_generated_name(filename, targets)
+                    or os.path.normcase(os.path.abspath(file_path)) in known_outputs):
+                print(f"跳过文件：{filename} (已生成的输出文件)")
+                continue
+            sources.append(file_path)
+        elif os.path.isfile(file_path) and filename != manifest.MANIFEST_NAME:
+            print(f"跳过文件：{filename} (非 PNG 格式)")
+        # else: 跳过文件夹或其它文件类型
+    return sources
 
-            # 获取文件名 (不含扩展名)
-            base_name, ext = os.path.splitext(filename)
 
-            # 逐个目标分辨率进行处理
-            for res_name, (width, height) in target_resolutions.items():
-                output_folder_path = os.path.join(output_base_folder, res_name)
-                resize_image(file_path, (width, height), res_name, base_name, output_folder_path)
+def plan_rebuild(sources, targets, output_base, data, force=False, optimization=None, resample=None, prune=False):
+    """
+    对比清单，决定哪些 (源文件, 目标) 需要重新生成、哪些输出已过期。
+    过期输出只包括：源文件已删除的输出，以及源文件内容已变化、本次又不重新生成的目标的输出。
+    本次运行没有包含的目标（例如上次用 -r 追加的分辨率）会保留，prune 为 True 时才删除。
+    配置变化的目标会在原路径重新生成。
+    返回 (jobs, fingerprints, stale, up_to_date)：
+      jobs         [(源文件路径, {目标名称: 尺寸}), ...]，只包含需要重建的目标
+      fingerprints {清单键: 源文件指纹}
+      stale        [(清单键, 目标名称 或 None 表示整个条目), ...]
+      up_to_date   无需处理的 (源文件, 目标) 数量
+    """
+    jobs = []
+    fingerprints = {}
+    up_to_date = 0
+    current_keys = set()
+
+    for path in sources:
+        key = os.path.relpath(path, output_base)
+        current_keys.add(key)
+        entry = data["sources"].get(key, {})
+        fingerprint = manifest.source_fingerprint(path, entry)
+        fingerprints[key] = fingerprint
+        unchanged = not force and entry.get("sha256") == fingerprint["sha256"]
+        base_name = os.path.splitext(os.path.basename(path))[0]
+
+        pending = {}
+        for res_name, target_size in targets.items():
+            recorded = entry.get("outputs", {}).get(res_name)
+            if (unchanged and recorded and recorded["config"] == target_config(target_size, optimization, resample)
+                    and os.path.isfile(output_path_for(output_base, base_name, res_name))):
+                up_to_date += 1
+            else:
+                pending[res_name] = target_size
+        if pending:
+            jobs.append((path, pending))
+
+    stale = []
+    for key, entry in data["sources"].items():
+        if key not in current_keys:
+            # 只清理源文件确实已被删除的条目；同一输出文件夹可能服务于多个输入文件夹
+            if not os.path.isfile(os.path.join(output_base, key)):
+                stale.append((key, None))
+            continue
+        # 源文件变化后，旧内容生成的其它目标输出也已过期
+        changed = entry.get("sha256") != fingerprints[key]["sha256"]
+        for res_name in entry.get("outputs", {}):
+            if res_name not in targets and (prune or changed):
+                stale.append((key, res_name))
+    return jobs, fingerprints, stale, up_to_date
+
+
+def prune_stale(stale, data, output_base, dry_run=False):
+    """删除清单中记录的过期输出文件，并从清单中移除对应条目。只会删除清单记录过的文件。"""
+    for key, res_name in stale:
+        outputs = data["sources"][key].get("outputs", {})
+        for name in ([res_name] if res_name else list(outputs)):
+            output_path = os.path.join(output_base, outputs[name]["path"])
+            print(f"{'将删除' if dry_run else '删除'}过期输出：{output_path}")
+            if not dry_run:
+                if os.path.isfile(output_path):
+                    os.remove(output_path)
+                del outputs[name]
+        if not dry_run and res_name is None:
+            del data["sources"][key]
 
-            processed_count += 1
-        elif os.path.isfile(file_path):
-             print(f"\n跳过文件：{filename} (非 PNG 格式)")
-        # else: 跳过文件夹或其它文件类型
+
+def build_all(jobs, output_base, workers=default_workers, optimization=None, rows=None, resample=None):
+    """
+    按文件分发到进程池并行处理，按完成顺序逐个产出 build_pyramid 的结果。
+    jobs 为 [(源文件路径, {目标名称: 尺寸}), ...]；workers 为 1 时在当前进程内串行处理（便于调试）。
+    rows、resample 为 None 时使用 strip_rows、resampling_filter。
+    """
+    # 显式传给子进程，命令行参数修改的设置在子进程中不可见
+    optimization = optimization or output_optimization
+    rows = strip_rows if rows is None else rows
+    resample = resampling_filter if resample is None else resample
+    if workers == 1 or len(jobs) <= 1:
+        for path, targets in jobs:
+            yield build_pyramid(path, targets, output_base, optimization, rows, resample)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(build_pyramid, path, targets, output_base, optimization, rows, resample)
+                   for path, targets in jobs]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+# --- 主程序流程 ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="将 1080p 炮镜图片批量缩放为 2k/4k 及任意分辨率（增量构建）。")
+    parser.add_argument('-i', '--input', default=input_folder, help="输入文件夹")
+    parser.add_argument('-o', '--output', default=None, help="输出基础文件夹 (默认与输入文件夹相同)")
+    parser.add_argument('-j', '--workers', type=int, default=default_workers, help="并行进程数 (默认: CPU 核心数)")
+    parser.add_argument('-n', '--dry-run', action='store_true', help="只报告将要生成/删除的文件，不做任何修改")
+    parser.add_argument('-f', '--force', action='store_true', help="忽略清单，全部重新生成")
+    parser.add_argument('-O', '--optimize', choices=png_optimize.MODES, default=output_optimization,
+                        help=f"输出 PNG 的编码方式 (默认: {output_optimization})")
+    parser.add_argument('--strip-rows', type=int, default=strip_rows,
+                        help="分条处理的条带行数，内存占用有上限 (默认: 只对大于 4K 的图片分条；0 表示从不分条)")
+    parser.add_argument('-r', '--resolutions', default=None,
+                        help=f"追加的目标分辨率，逗号分隔，如 3440x1440,1920x1200,1366x768 (也可用 {'/'.join(resolution_presets)})")
+    parser.add_argument('--detect', action='store_true', help="追加当前屏幕的分辨率")
+    parser.add_argument('--prune', action='store_true',
+                        help="删除本次没有指定的目标的输出 (例如不再需要的 -r 分辨率)；默认保留")
+    parser.add_argument('--resample', type=parse_resample, default=resampling_filter,
+                        help=f"缩放滤镜：lanczos/bicubic/... 或 reticle (像素对齐，细线清晰) (默认: {resample_name(resampling_filter).lower()})")
+    args = parser.parse_args(argv)
+    output_base = args.output if args.output is not None else args.input
+
+    targets = target_resolutions
+    try:
+        if args.resolutions:
+            targets = merge_targets(targets, parse_resolutions(args.resolutions))
+    except ValueError as e:
+        parser.error(str(e))
+    if args.detect:
+        targets = merge_targets(targets, detect_resolutions())
+
+    if not os.path.isdir(args.input):
+        print(f"错误：输入文件夹 '{args.input}' 不存在或不是一个文件夹。请检查路径配置。")
+        return 1
+
+    print(f"正在处理文件夹中的图片：{args.input}")
+    start = time.perf_counter()
+    manifest_file = manifest.manifest_path(output_base)
+    data = manifest.load_manifest(manifest_file)
+    sources = find_source_images(args.input, targets, manifest.recorded_outputs(data, output_base))
+    jobs, fingerprints, stale, up_to_date = plan_rebuild(sources, targets, output_base, data, args.force, args.optimize,
+                                                         args.resample, args.prune)
+    pending_count = sum(len(targets) for _, targets in jobs)
+    print(f"{up_to_date} 个输出已是最新，{pending_count} 个需要生成，{len(stale)} 项过期输出需要清理。")
+    kept = sum(1 for key, entry in data["sources"].items() for res_name in entry.get("outputs", {})
+               if res_name not in targets and (key, res_name) not in stale and (key, None) not in stale)
+    if kept:
+        print(f"保留 {kept} 个不在本次目标中的输出 (使用 --prune 删除)。")
+
+    if args.dry_run:
+        for path, pending in jobs:
+            print(f"将生成：{os.path.basename(path)} -> {', '.join(pending)}")
+        prune_stale(stale, data, output_base, dry_run=True)
+        return 0
+
+    prune_stale(stale, data, output_base)
+    processed_count = 0
+    failed_count = 0
+
+    for image_path, results in build_all(jobs, output_base, args.workers, args.optimize, args.strip_rows,
+                                         args.resample):
+        print(f"\n处理文件：{os.path.basename(image_path)}")
+        key = os.path.relpath(image_path, output_base)
+        entry = data["sources"].setdefault(key, {"outputs": {}})
+        if entry.get("sha256") != fingerprints[key]["sha256"]:
+            entry["outputs"] = {} # 源文件内容已变化，旧的记录全部作废
+        entry.update(fingerprints[key])
+        for res_name, output_path, error, report in results:
+            if error:
+                failed_count += 1
+                entry["outputs"].pop(res_name, None)
+                print(f"  处理图片 {os.path.basename(image_path)} 时发生错误：{error}")
+            else:
+                entry["outputs"][res_name] = {
+                    "path": os.path.relpath(output_path, output_base),
+                    "config": target_config(targets[res_name], args.optimize, args.resample),
+                }
+                print(f"  已保存：{output_path} ({os.path.getsize(output_path)} 字节{format_report(report)})")
+        processed_count += 1
+
+    # 未变化的源文件也更新 mtime，避免下次再计算哈希
+    for key, fingerprint in fingerprints.items():
+        if key in data["sources"] and data["sources"][key].get("sha256") == fingerprint["sha256"]:
+            data["sources"][key].update(fingerprint)
+    manifest.save_manifest(manifest_file, data)
 
     print("\n处理完成。")
-    print(f"共处理了 {processed_count} 个 PNG 文件。")
+    print(f"共处理了 {processed_count} 个 PNG 文件，用时 {time.perf_counter() - start:.3f} 秒。")
     if processed_count > 0:
-        print(f"转换后的图片保存在 '{output_base_folder}' 文件夹下的 '2k' 和 '4k' 子文件夹中。")
\ No newline at end of file
+        print(f"转换后的图片保存在 '{output_base}' 文件夹下的 {'、'.join(repr(n) for n in targets)} 子文件夹中。")
+    return 1 if failed_count else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())